@@ -1,8 +1,13 @@
 import logging
 import itertools
+import math
 import platform
 import serial
+import struct
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from serial.tools import list_ports
 
 # Check if running on Windows OS
@@ -10,9 +15,43 @@ if platform.system() == 'Windows':
     import winreg as winreg
 else:
     import glob
+    import termios
 
 log = logging.getLogger(__name__)
 
+# Order in which the "pwms" command of the sketch returns the PWM channels
+RC_CHANNELS = ('steering', 'throttle', 'mode', 'record', 'full_ai')
+
+# Stream periods without a sample after which the channel cache is stale, (e.g. the board
+# browned out and stopped streaming without any serial error)
+STREAM_STALE_PERIODS = 3
+
+# Protocol versions, negotiated through the "version" command
+ASCII_PROTOCOL = 1
+BINARY_PROTOCOL = 2
+
+# Command bytes of the binary protocol, these MUST match the ones in the Arduino sketch
+BINARY_COMMANDS = {'version': 0x01,
+                   'strg': 0x10,
+                   'thrtl': 0x11,
+                   'mode': 0x12,
+                   'rec': 0x13,
+                   'fullai': 0x14,
+                   'pwms': 0x15,
+                   'pi': 0x16,
+                   'strm': 0x17,
+                   'sva': 0x20,
+                   'svr': 0x21,
+                   'svw': 0x22,
+                   'svwm': 0x23,
+                   'svd': 0x24,
+                   'svw2': 0x25}
+
+# Arguments of the binary requests and values of their replies, the frames are sized to them,
+# (the commands not listed take no argument and reply with a single value, if any)
+BINARY_REQUEST_ARGS = {'pi': 1, 'strm': 1, 'sva': 3, 'svr': 1, 'svw': 2, 'svwm': 2, 'svd': 1, 'svw2': 4}
+BINARY_REPLY_VALUES = {'pwms': 5}
+
 """
   Description:
 
@@ -64,45 +103,481 @@ def build_cmd_str(cmd, args=None):
     return "@{cmd}%{args}$!".format(cmd=cmd, args=args).encode()
 
 
-def find_port(baud, timeout):
+class BinaryFrameEncoder(object):
     """
-    Find the first port that is connected to an arduino with a compatible
-    sketch installed.
+    Encodes commands into the request frames of the binary protocol:
+
+        header (0xA5) | command byte | N x little-endian int16 arguments | checksum
+
+    N is the number of arguments of the command, (see BINARY_REQUEST_ARGS), so that a
+    request is never longer than it needs to be, e.g. 3 bytes for "strg". The checksum is
+    the sum of all the preceding bytes of the frame, modulo 256.
+    """
+    HEADER = 0xA5
+    NUMBER_ARGS = 4
+
+    def __init__(self, commands: dict = None, request_args: dict = None):
+        self.commands = commands or BINARY_COMMANDS
+        request_args = BINARY_REQUEST_ARGS if request_args is None else request_args
+        # Number of arguments and frame layout per command byte
+        self.number_args = {value: request_args.get(key, 0) for key, value in self.commands.items()}
+        self.frames = {number: struct.Struct('<BB{0}h'.format(number)) for number in range(self.NUMBER_ARGS + 1)}
+
+    def frame_size(self, command_byte: int) -> int:
+        """
+        Size of the request frames of a command, checksum included, None if the command is unknown.
+        """
+        if command_byte not in self.number_args:
+            return None
+        return self.frames[self.number_args[command_byte]].size + 1
+
+    def unpack(self, frame: bytes) -> list:
+        """
+        Arguments of a complete request frame, (its checksum is not checked here).
+        """
+        return list(self.frames[self.number_args[frame[1]]].unpack(frame[:-1])[2:])
+
+    def encode(self, cmd: str, args=None) -> bytes:
+        """
+        Build a request frame that can be sent to the arduino.
+
+        Parameters
+        ----------
+        cmd: (str) the command to send to the arduino, must be a key of the command table
+        args: (iterable) up to four integer arguments, truncated like the sketch's atoi
+
+        Returns
+        -------
+        frame: (bytes) encoded request frame
+        """
+        command_byte = self.commands[cmd]
+        number_args = self.number_args[command_byte]
+        args = [int(arg) for arg in args] if args else []
+        if len(args) > number_args:
+            raise ValueError('Too many arguments for a binary frame: {0}'.format(cmd))
+        args += [0] * (number_args - len(args))
+        frame = self.frames[number_args].pack(self.HEADER, command_byte, *args)
+        return frame + bytes((sum(frame) & 0xFF,))
+
+
+class BinaryFrameDecoder(object):
+    """
+    Decodes the reply frames of the binary protocol:
+
+        header (0x5A) | command byte | N x little-endian int16 values | checksum
+
+    N is the number of values of the reply, (see BINARY_REPLY_VALUES): one for the single
+    value commands, (5 bytes, one less than the ASCII "1500" line), and the five channels in
+    the RC_CHANNELS order for "pwms", (13 bytes).
+    """
+    HEADER = 0x5A
+    # Header and command byte, enough to know the size of the frame
+    PREFIX_SIZE = 2
+    MAX_VALUES = 5
+
+    def __init__(self, commands: dict = None, reply_values: dict = None):
+        commands = commands or BINARY_COMMANDS
+        reply_values = BINARY_REPLY_VALUES if reply_values is None else reply_values
+        self.commands = commands
+        self.command_names = {value: key for key, value in commands.items()}
+        # Number of values per command byte
+        self.number_values = {value: reply_values.get(key, 1) for key, value in commands.items()}
+        self.frames = {number: struct.Struct('<BB{0}h'.format(number)) for number in range(1, self.MAX_VALUES + 1)}
+
+    def frame_size(self, command_byte: int) -> int:
+        """
+        Size of the reply frames of a command, checksum included, None if the command is unknown.
+        """
+        if command_byte not in self.number_values:
+            return None
+        return self.frames[self.number_values[command_byte]].size + 1
+
+    def encode(self, cmd: str, values) -> bytes:
+        """
+        Build the reply frame of a command, (what the sketch sends).
+
+        Parameters
+        ----------
+        cmd: (str) command the reply answers
+        values: (iterable) values of the reply, as many as the command returns
+
+        Returns
+        -------
+        frame: (bytes) encoded reply frame
+        """
+        command_byte = self.commands[cmd]
+        frame = self.frames[self.number_values[command_byte]].pack(self.HEADER, command_byte, *values)
+        return frame + bytes((sum(frame) & 0xFF,))
+
+    def decode(self, frame: bytes) -> tuple:
+        """
+        Parse a reply frame received from the arduino.
+
+        Parameters
+        ----------
+        frame: (bytes) raw reply frame
+
+        Returns
+        -------
+        cmd: (str) name of the command the reply answers
+        values: (list) the int16 values of the frame
+        """
+        if len(frame) < self.PREFIX_SIZE or frame[0] != self.HEADER or frame[1] not in self.command_names:
+            raise ValueError('Bad frame header')
+        if len(frame) != self.frame_size(frame[1]):
+            raise ValueError('Incomplete frame: {0} bytes'.format(len(frame)))
+        if (sum(frame[:-1]) & 0xFF) != frame[-1]:
+            raise ValueError('Bad frame checksum')
+        _, cmd, *values = self.frames[self.number_values[frame[1]]].unpack(frame[:-1])
+        return self.command_names[cmd], values
+
+
+class LatencyHistogram(object):
+    def __init__(self, min_latency: float = 1e-5, max_latency: float = 10.0, buckets_per_decade: int = 20):
+        """
+        Fixed memory latency histogram with logarithmic buckets, (5% wide with the
+        default 20 buckets per decade), from 'min_latency' to 'max_latency' seconds.
+
+        Parameters
+        ----------
+        min_latency: (float) upper edge of the first bucket, in seconds
+        max_latency: (float) upper edge of the last bucket, longer samples land in it too
+        buckets_per_decade: (int) resolution of the histogram
+        """
+        self.log_min = math.log10(min_latency)
+        self.buckets_per_decade = buckets_per_decade
+        number_buckets = int(round((math.log10(max_latency) - self.log_min) * buckets_per_decade)) + 1
+        self.counts = [0] * number_buckets
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, latency: float):
+        if latency > 0:
+            index = int(math.ceil((math.log10(latency) - self.log_min) * self.buckets_per_decade))
+            index = min(max(index, 0), len(self.counts) - 1)
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        if latency > self.max:
+            self.max = latency
+
+    def percentile(self, percent: float) -> float:
+        """
+        Returns
+        -------
+        latency: (float) upper edge of the bucket holding the given percentile, in seconds
+        """
+        if self.count == 0:
+            return 0.0
+        rank = percent / 100 * self.count
+        total = 0
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= rank:
+                return min(10 ** (self.log_min + index / self.buckets_per_decade), self.max)
+        return self.max
+
+
+class LinkStats(object):
+    def __init__(self):
+        """
+        Health of the serial link: one LatencyHistogram per command name plus counters
+        for the replies that never came (timeouts), the ones that could not be parsed
+        and the retries (e.g. Servos.attach).
+        """
+        self.histograms = {}
+        self.timeouts = 0
+        self.unparseable = 0
+        self.retries = 0
+
+    def record(self, name: str, latency: float):
+        if name not in self.histograms:
+            self.histograms[name] = LatencyHistogram()
+        self.histograms[name].record(latency)
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summary(self) -> dict:
+        """
+        Returns
+        -------
+        summary: (dict) count, p50, p95, p99 and max latency, (in seconds), per command name
+                 and the timeouts/unparseable/retries counters
+        """
+        commands = {}
+        for name, histogram in list(self.histograms.items()):
+            commands[name] = {'count': histogram.count,
+                              'p50': histogram.percentile(50),
+                              'p95': histogram.percentile(95),
+                              'p99': histogram.percentile(99),
+                              'max': histogram.max}
+        return {'commands': commands,
+                'timeouts': self.timeouts,
+                'unparseable': self.unparseable,
+                'retries': self.retries}
+
+    def compact_summary(self, number_commands: int = 2) -> str:
+        """
+        One line summary of the most used commands, p50/p99/max in milliseconds.
+        """
+        summary = self.summary()
+        busiest = sorted(summary['commands'].items(), key=lambda item: -item[1]['count'])[:number_commands]
+        text = ', '.join(f'{name} {stats["p50"] * 1000:.1f}/{stats["p99"] * 1000:.1f}/{stats["max"] * 1000:.1f}'
+                         for name, stats in busiest)
+        return f'Serial ms {text or "-"} | t/o {self.timeouts} bad {self.unparseable} retry {self.retries}'
+
+
+class ChannelCache(object):
+    def __init__(self):
+        """
+        Latest value cache of the PWM channels streamed by the sketch.
+
+        Each sample is stored as a single (values, timestamp) tuple and replaced by
+        rebinding one attribute, so readers never need a lock: they either see the
+        previous sample or the new one, never a mix of both.
+        """
+        self._sample = (dict.fromkeys(RC_CHANNELS, -1), None)
+        self.number_samples = 0
+
+    def update(self, values: list, timestamp: float):
+        self._sample = (dict(zip(RC_CHANNELS, values)), timestamp)
+        self.number_samples += 1
+
+    def get(self, channel: str) -> float:
+        return self._sample[0][channel]
+
+    def snapshot(self) -> tuple:
+        """
+        Returns
+        -------
+        channels: (dict) latest pulse length measurements keyed by the names in RC_CHANNELS
+        timestamp: (float) time.perf_counter() reception time of the sample, None if no sample yet
+        """
+        return self._sample
+
+    def age(self) -> float:
+        """
+        Returns
+        -------
+        age: (float) seconds elapsed since the latest sample was received, inf if none yet
+        """
+        timestamp = self._sample[1]
+        if timestamp is None:
+            return float('inf')
+        return time.perf_counter() - timestamp
+
+
+class TelemetryReader(threading.Thread):
+    def __init__(self, sr, cache: ChannelCache, decoder: BinaryFrameDecoder = None):
+        """
+        Background thread decoding the "pwms" frames pushed by the sketch in streaming
+        mode into a ChannelCache.
+
+        Parameters
+        ----------
+        sr: (serial.Serial) serial port the sketch streams on
+        cache: (ChannelCache) cache updated with every valid frame
+        decoder: (BinaryFrameDecoder) reply frame decoder
+        """
+        threading.Thread.__init__(self, name='TelemetryReader', daemon=True)
+        self.sr = sr
+        self.cache = cache
+        self.decoder = decoder or BinaryFrameDecoder()
+        self.running = True
+        self.bad_frames = 0
+        self.error = None
+
+    def run(self):
+        # The streamed "pwms" frames, other replies are sized by their command byte
+        frame_size = self.decoder.frame_size(BINARY_COMMANDS['pwms'])
+        header = bytes((self.decoder.HEADER,))
+        buffer = b''
+        while self.running:
+            try:
+                buffer += self.sr.read(max(frame_size - len(buffer), 1))
+            except serial.SerialException as e:
+                # The link dropped (e.g. USB cable), see Arduino.reconnect
+                log.debug(str(e))
+                self.error = e
+                return
+            # Re-synchronize on the frame header
+            start = buffer.find(header)
+            if start < 0:
+                buffer = b''
+                continue
+            buffer = buffer[start:]
+            if len(buffer) < self.decoder.PREFIX_SIZE:
+                continue
+            size = self.decoder.frame_size(buffer[1])
+            if size is not None and len(buffer) < size:
+                continue
+            try:
+                cmd, values = self.decoder.decode(buffer[:size or self.decoder.PREFIX_SIZE])
+            except ValueError:
+                # Not a frame boundary, skip the header byte and search again
+                self.bad_frames += 1
+                buffer = buffer[1:]
+                continue
+            buffer = buffer[size:]
+            if cmd == 'pwms':
+                self.cache.update(values, time.perf_counter())
+
+    def stop(self):
+        self.running = False
+        # Unblock a pending read so the thread can exit right away
+        self.sr.cancel_read()
+
+
+def candidate_ports():
+    """
+    Serial ports an arduino may be connected to on this system.
     """
     if platform.system() == 'Windows':
-        ports = enumerate_serial_ports()
+        return list(enumerate_serial_ports())
     elif platform.system() == 'Darwin':
-        ports = [i[0] for i in list_ports.comports()]
+        return [i[0] for i in list_ports.comports()]
     else:
-        ports = glob.glob("/dev/ttyUSB*") + glob.glob("/dev/ttyACM*")
-    for p in ports:
-        log.debug('Found {0}, testing...'.format(p))
+        return glob.glob("/dev/ttyUSB*") + glob.glob("/dev/ttyACM*")
+
+
+def wait_until_ready(sr, timeout: float, poll: float = 0.05, cancel: threading.Event = None) -> bool:
+    """
+    Poll the sketch with the "version" command until it answers, instead of sleeping
+    for the worst case boot time of the board after the port is opened.
+
+    Parameters
+    ----------
+    sr: (serial.Serial) open serial port
+    timeout: (float) seconds to wait for an answer
+    poll: (float) seconds to wait for each individual answer
+    cancel: (threading.Event) stops waiting as soon as it is set
+
+    Returns
+    -------
+    ready: (bool) True if the sketch answered
+    """
+    """
+        Note:
+        For some reason, if the Arduino MEGA gets interrupted by using the keyboard
+        then the get_version function will return a numerical string, as if the sketch
+        is still running.
+        If there is nothing connected on the serial port, then get_version returns an
+        empty string.  There to ensure that we are connected to an Arduino, simply
+        if there is an empty string or not.  This is probably less robust than checking
+        specifically for the keyword "version" that guarantees the right sketch is
+        running, but it is more robust in the sense to re-start an Arduino connection
+    """
+    read_timeout = sr.timeout
+    sr.timeout = poll
+    deadline = time.perf_counter() + timeout
+    try:
+        while time.perf_counter() < deadline:
+            if cancel is not None and cancel.is_set():
+                return False
+            if get_version(sr):
+                # Drop the answers to the earlier polls that came in late
+                time.sleep(poll)
+                sr.reset_input_buffer()
+                return True
+    finally:
+        sr.timeout = read_timeout
+    return False
+
+
+def open_port(port: str, baud: int, timeout: float):
+    """
+    Open a serial port and, on POSIX systems, clear HUPCL so that DTR stays up when the
+    port is closed: re-opening it later then does not reset the board, which is what
+    makes a reconnect fast.
+    """
+    sr = serial.Serial(port, baud, timeout=timeout)
+    if platform.system() != 'Windows':
         try:
-            sr = serial.Serial(p, baud, timeout=timeout)
-        except serial.serialutil.SerialException as e:
+            attributes = termios.tcgetattr(sr.fd)
+            attributes[2] &= ~termios.HUPCL
+            termios.tcsetattr(sr.fd, termios.TCSANOW, attributes)
+        except termios.error as e:
             log.debug(str(e))
-            continue
-        time.sleep(2)
-        version = get_version(sr).decode()
-        """
-            Note:
-            For some reason, if the Arduino MEGA gets interrupted by using the keyboard
-            then the get_version function will return a numerical string, as if the sketch
-            is still running.
-            If there is nothing connected on the serial port, then get_version returns an
-            empty string.  There to ensure that we are connected to an Arduino, simply
-            if there is an empty string or not.  This is probably less robust than checking
-            specifically for the keyword "version" that guarantees the right sketch is
-            running, but it is more robust in the sense to re-start an Arduino connection
-        """
-        if not version:
-            log.debug('Bad version {0}. This is not a Shrimp/Arduino!'.format(
-                version))
-            sr.close()
-            continue
-        log.info('Using port {0}.'.format(p))
+    return sr
+
+
+def probe_port(port: str, baud: int, timeout: float, found: threading.Event = None):
+    """
+    Test a single port for an arduino with a compatible sketch.
+
+    Returns
+    -------
+    sr: (serial.Serial) open port if an arduino answered, None otherwise
+    """
+    log.debug('Found {0}, testing...'.format(port))
+    try:
+        sr = open_port(port, baud, timeout)
+    except serial.SerialException as e:
+        log.debug(str(e))
+        return None
+    try:
+        ready = wait_until_ready(sr, timeout, cancel=found)
+    except (serial.SerialException, OSError) as e:
+        log.debug(str(e))
+        ready = False
+    if not ready:
+        log.debug('No answer on {0}. This is not a Shrimp/Arduino!'.format(port))
+        sr.close()
+        return None
+    return sr
+
+
+def find_port(baud, timeout, ports=None, preferred_port=None):
+    """
+    Find the first port that is connected to an arduino with a compatible
+    sketch installed. The candidate ports are enumerated from the system unless
+    a list is given, (e.g. the pseudo-terminal of a VirtualArduino).
+
+    The preferred port, (typically the last one that worked), is tried first on its
+    own, the other candidates are then probed concurrently.
+    """
+    if ports is None:
+        ports = candidate_ports()
+    if preferred_port:
+        sr = probe_port(preferred_port, baud, timeout)
         if sr:
+            log.info('Using port {0}.'.format(preferred_port))
             return sr
+    ports = [p for p in ports if p != preferred_port]
+    if not ports:
+        return None
+
+    found = threading.Event()
+    lock = threading.Lock()
+    winner = []
+
+    def probe(p):
+        sr = probe_port(p, baud, timeout, found)
+        if sr is None:
+            return
+        with lock:
+            if winner:
+                # Another port answered first
+                sr.close()
+                return
+            winner.append(sr)
+            found.set()
+
+    with ThreadPoolExecutor(max_workers=len(ports)) as executor:
+        for p in ports:
+            executor.submit(probe, p)
+        # Returns as soon as an arduino answers, the other probes abort on 'found'
+        found.wait(timeout + 1)
+    if winner:
+        log.info('Using port {0}.'.format(winner[0].port))
+        return winner[0]
     return None
 
 
@@ -117,48 +592,327 @@ def get_version(sr):
 
 
 class Arduino(object):
-    def __init__(self, baud=9600, port=None, timeout=2, sr=None):
+    def __init__(self, baud=9600, port=None, timeout=2, sr=None, protocol=ASCII_PROTOCOL, preferred_port=None):
         """
         Initializes serial communication with Arduino if no connection is
-        given. Attempts to self-select COM port, if not specified.
+        given. Attempts to self-select COM port, if not specified, starting
+        with the preferred port if one is given.
+
+        The binary protocol is only used if the sketch acknowledges it, otherwise
+        the board keeps talking ASCII command strings.
         """
         if not sr:
             if not port:
-                sr = find_port(baud, timeout)
+                sr = find_port(baud, timeout, preferred_port=preferred_port)
                 if not sr:
                     raise ValueError("Could not find port.")
             else:
-                sr = serial.Serial(port, baud, timeout=timeout)
+                sr = open_port(port, baud, timeout)
+                if not wait_until_ready(sr, timeout):
+                    # Same failure as when no port answers the scan
+                    sr.close()
+                    raise ValueError("No answer on port {0}.".format(port))
         sr.flush()
         self.sr = sr
+        self.baud = baud
+        self.timeout = timeout
+        self.link_error = None
+        self.protocol = ASCII_PROTOCOL
+        self.encoder = BinaryFrameEncoder()
+        self.decoder = BinaryFrameDecoder()
+        self.channel_cache = ChannelCache()
+        self.telemetry = None
+        self.stream_rate = 0
+        self.stats = LinkStats()
+        # Serializes the writes of the drive loop and of the servo output thread
+        self.write_lock = threading.RLock()
+        if protocol != ASCII_PROTOCOL:
+            self.negotiate_protocol(protocol)
         self.SoftwareSerial = SoftwareSerial(self)
         self.Servos = Servos(self)
 
     def version(self):
         return get_version(self.sr)
 
-    def process_command_string(self, command_string: str) -> float:
+    def link_stats(self) -> dict:
         """
-            Process a command string.
+        Latency percentiles per command and link health counters, see LinkStats.summary.
+        """
+        return self.stats.summary()
+
+    def link_summary(self) -> str:
+        return self.stats.compact_summary()
+
+    def command_name(self, command: bytes) -> str:
+        """
+        Name of the command held by an ASCII command string or a binary request frame.
+        """
+        if command[0] == self.encoder.HEADER:
+            return self.decoder.command_names.get(command[1], 'unknown')
+        return command[1:command.find(b'%')].decode(errors='replace')
+
+    @property
+    def port(self) -> str:
+        return self.sr.port
+
+    @property
+    def link_lost(self) -> bool:
+        """
+        True once a serial error was raised by the port, (e.g. USB cable unplugged), or
+        once the streamed channels are stale, (see telemetry_stale).
+        """
+        if self.telemetry is not None and self.telemetry.error is not None:
+            return True
+        return self.link_error is not None or self.telemetry_stale
+
+    @property
+    def telemetry_age(self) -> float:
+        """
+        Seconds since the latest streamed sample, 0 when the channels are polled.
+        """
+        if not self.streaming:
+            return 0.0
+        return self.channel_cache.age()
+
+    @property
+    def telemetry_stale(self) -> bool:
+        """
+        True when no sample was streamed for STREAM_STALE_PERIODS stream periods: the
+        cached channels must not be driven on, (e.g. board reset or a hung USB hub).
+        """
+        return self.streaming and self.telemetry_age > STREAM_STALE_PERIODS / self.stream_rate
+
+    def reconnect(self, timeout: float = 0.5) -> bool:
+        """
+        Re-open the current port after the link dropped. Since DTR is kept up, (see
+        open_port), the board is not reset and answers right away, the protocol and
+        the streaming mode in use are then restored.
 
         Parameters
         ----------
-        command_string: (str) raw command string
+        timeout: (float) seconds given to the sketch to answer
 
         Returns
         -------
-        parsed_command: (float) parsed command
+        connected: (bool) True if the link is back up
+        """
+        streaming = self.streaming
+        protocol = self.protocol
+        if streaming:
+            self.telemetry.stop()
+            self.telemetry.join()
+            self.telemetry = None
+        with self.write_lock:
+            try:
+                self.sr.close()
+            except serial.SerialException:
+                pass
+            try:
+                sr = open_port(self.sr.port, self.baud, self.timeout)
+            except serial.SerialException as e:
+                log.debug(str(e))
+                return False
+            if not wait_until_ready(sr, timeout):
+                sr.close()
+                return False
+            self.sr = sr
+            self.Servos.sr = sr
+            self.SoftwareSerial.sr = sr
+            self.link_error = None
+        self.protocol = ASCII_PROTOCOL
+        if protocol != ASCII_PROTOCOL:
+            self.negotiate_protocol(protocol)
+        if streaming:
+            self.start_streaming(self.stream_rate)
+        log.info('Reconnected to port {0}.'.format(sr.port))
+        return True
+
+    def send(self, command: bytes):
+        """
+        Write a command to the arduino, safe to call from several threads.
+
+        Parameters
+        ----------
+        command: (bytes) ASCII command string or binary request frame
+        """
+        with self.write_lock:
+            try:
+                self.sr.write(command)
+                self.sr.flush()
+            except ValueError:
+                pass
+            except serial.SerialException as e:
+                self.link_error = e
+
+    def negotiate_protocol(self, protocol: int = BINARY_PROTOCOL) -> int:
+        """
+        Asks the sketch, through the "version" command, if it understands the given
+        protocol version. The sketch echoes "version%<protocol>" if it does, while older
+        sketches simply reply "version", in which case the ASCII protocol is kept.
+
+        The sketch answers every request in the format it was sent in, so the ASCII
+        commands, (e.g. SoftwareSerial), keep working once the binary protocol is on.
+
+        Parameters
+        ----------
+        protocol: (int) requested protocol version
+
+        Returns
+        -------
+        protocol: (int) protocol version now in use
         """
         try:
-            self.sr.write(command_string)
+            self.sr.write(build_cmd_str('version', (protocol,)))
             self.sr.flush()
         except ValueError:
             pass
         rd = self.sr.readline().replace("\r\n".encode(), "".encode())
+        if rd == 'version%{0}'.format(protocol).encode():
+            self.protocol = protocol
+        else:
+            self.protocol = ASCII_PROTOCOL
+        log.info('Using protocol version {0}.'.format(self.protocol))
+        return self.protocol
+
+    @property
+    def streaming(self) -> bool:
+        return self.telemetry is not None
+
+    def start_streaming(self, rate: int = 100, timeout: float = 0.5) -> bool:
+        """
+        Switch the channel reads to push mode: the sketch emits the five PWM channels
+        "rate" times per second and a background thread keeps the latest ones in
+        'self.channel_cache'. The *_in methods and read_all_channels then return from
+        memory instead of waiting on the serial line.
+
+        While streaming, the commands that expect a reply, (e.g. Servos.attach/read), are
+        not available since the reader thread consumes everything coming from the board.
+
+        Parameters
+        ----------
+        rate: (int) number of samples per second requested from the sketch
+        timeout: (float) seconds to wait for the first sample before giving up
+
+        Returns
+        -------
+        streaming: (bool) True if samples are coming in, False if the sketch does not stream
+        """
+        if self.streaming:
+            return True
+        self.channel_cache = ChannelCache()
+        self.telemetry = TelemetryReader(self.sr, self.channel_cache, self.decoder)
+        self.stream_rate = rate
+        self.telemetry.start()
+        self.send(self.build_command('strm', (max(1, int(1000 / rate)),)))
+        deadline = time.perf_counter() + timeout
+        while self.channel_cache.number_samples == 0 and time.perf_counter() < deadline:
+            time.sleep(0.005)
+        if self.channel_cache.number_samples == 0:
+            log.info('No telemetry received, the sketch does not support streaming.')
+            self.stop_streaming()
+            return False
+        return True
+
+    def stop_streaming(self):
+        """
+        Stop the push mode telemetry and go back to request/response channel reads.
+        """
+        if not self.streaming:
+            return
+        self.send(self.build_command('strm', (0,)))
+        self.telemetry.stop()
+        self.telemetry.join()
+        self.telemetry = None
+        # Drop any frame that was in flight when the stream was stopped
+        time.sleep(0.05)
+        self.sr.reset_input_buffer()
+
+    def build_command(self, cmd: str, args=None) -> bytes:
+        """
+        Build a command in the protocol currently in use.
+
+        Parameters
+        ----------
+        cmd: (str) the command to send to the arduino
+        args: (iterable) the arguments to send to the command
+
+        Returns
+        -------
+        command: (bytes) ASCII command string or binary request frame
+        """
+        if self.protocol == BINARY_PROTOCOL:
+            return self.encoder.encode(cmd, args)
+        return build_cmd_str(cmd, args)
+
+    def read_values(self, command: bytes = None) -> list:
+        """
+        Read one reply from the arduino in the protocol currently in use.
+
+        Parameters
+        ----------
+        command: (bytes) command the reply answers, used to detect out of sync binary replies
+
+        Returns
+        -------
+        values: (list) numeric values of the reply, empty if it cannot be parsed
+        """
         try:
-            return float(rd)
+            if self.protocol == BINARY_PROTOCOL:
+                # The command byte gives the size of the rest of the frame
+                rd = self.sr.read(self.decoder.PREFIX_SIZE)
+                size = self.decoder.frame_size(rd[1]) if len(rd) == self.decoder.PREFIX_SIZE else None
+                if size is not None:
+                    rd += self.sr.read(size - len(rd))
+            else:
+                rd = self.sr.readline().replace("\r\n".encode(), "".encode())
+        except serial.SerialException as e:
+            self.link_error = e
+            return []
+        if not rd:
+            # Nothing came back before the read timeout
+            self.stats.timeouts += 1
+            return []
+        if self.protocol == BINARY_PROTOCOL:
+            try:
+                cmd, values = self.decoder.decode(rd)
+            except ValueError:
+                # Drop whatever is left of a corrupted frame so the next reply is aligned
+                self.stats.unparseable += 1
+                self.sr.reset_input_buffer()
+                return []
+            if command is not None and BINARY_COMMANDS[cmd] != command[1]:
+                self.stats.unparseable += 1
+                self.sr.reset_input_buffer()
+                return []
+            return values
+        try:
+            return [float(value) for value in rd.split(b',')]
         except ValueError:
+            self.stats.unparseable += 1
+            return []
+
+    def process_command_string(self, command_string: str) -> float:
+        """
+            Process a command string.
+
+        Parameters
+        ----------
+        command_string: (bytes) raw command string or binary request frame
+
+        Returns
+        -------
+        parsed_command: (float) parsed command
+        """
+        with self.write_lock, self.stats.timer(self.command_name(command_string)):
+            self.send(command_string)
+            values = self.read_values(command_string)
+        # ASCII replies hold a single value, binary replies carry it in the first slot
+        if not values:
+            return -1
+        if self.protocol == ASCII_PROTOCOL and len(values) != 1:
+            self.stats.unparseable += 1
             return -1
+        return float(values[0])
 
     def steer_in(self):
         """
@@ -167,7 +921,9 @@ class Arduino(object):
         returns:
            duration : pulse length measurement
         """
-        cmd_str = build_cmd_str("strg")
+        if self.streaming:
+            return self.channel_cache.get('steering')
+        cmd_str = self.build_command("strg")
         return self.process_command_string(cmd_str)
 
     def throttle_in(self):
@@ -177,7 +933,9 @@ class Arduino(object):
         returns:
            duration : pulse length measurement
         """
-        cmd_str = build_cmd_str("thrtl")
+        if self.streaming:
+            return self.channel_cache.get('throttle')
+        cmd_str = self.build_command("thrtl")
         return self.process_command_string(cmd_str)
 
     def mode_in(self):
@@ -194,7 +952,9 @@ class Arduino(object):
         returns:
            duration : pulse length measurement
         """
-        cmd_str = build_cmd_str("mode")
+        if self.streaming:
+            return self.channel_cache.get('mode')
+        cmd_str = self.build_command("mode")
         return self.process_command_string(cmd_str)
 
     def rec_in(self):
@@ -208,7 +968,9 @@ class Arduino(object):
         returns:
            duration : pulse length measurement
         """
-        cmd_str = build_cmd_str("rec")
+        if self.streaming:
+            return self.channel_cache.get('record')
+        cmd_str = self.build_command("rec")
         return self.process_command_string(cmd_str)
 
     def full_ai_in(self):
@@ -225,9 +987,37 @@ class Arduino(object):
         returns:
            duration : pulse length measurement
         """
-        cmd_str = build_cmd_str("fullai")
+        if self.streaming:
+            return self.channel_cache.get('full_ai')
+        cmd_str = self.build_command("fullai")
         return self.process_command_string(cmd_str)
 
+    def read_all_channels(self) -> dict:
+        """
+        Reads the pulses of all five channels in a single serial round trip instead of
+        one command per channel, (steering, throttle, mode, record and full AI; see
+        the individual *_in methods for the pins hard coded in the Arduino sketch)
+
+        returns:
+           channels : dict of pulse length measurements keyed by the names in RC_CHANNELS,
+                      every channel is set to -1 if the reply cannot be parsed
+                      (taken from the channel cache without any exchange when streaming)
+        """
+        if self.streaming:
+            if self.telemetry_stale:
+                # Never hand out channels the board stopped sending, see link_lost
+                return dict.fromkeys(RC_CHANNELS, -1)
+            return self.channel_cache.snapshot()[0]
+        cmd_str = self.build_command("pwms")
+        with self.write_lock, self.stats.timer('pwms'):
+            self.send(cmd_str)
+            values = self.read_values(cmd_str)
+        if values and len(values) != len(RC_CHANNELS):
+            self.stats.unparseable += 1
+        if len(values) != len(RC_CHANNELS):
+            values = [-1] * len(RC_CHANNELS)
+        return dict(zip(RC_CHANNELS, values))
+
     def pulse_in(self, pin, val):
         """
         Reads a pulse from a pin
@@ -241,10 +1031,11 @@ class Arduino(object):
             pin_ = -pin
         else:
             pin_ = pin
-        cmd_str = build_cmd_str("pi", (pin_,))
+        cmd_str = self.build_command("pi", (pin_,))
         self.process_command_string(cmd_str)
 
     def close(self):
+        self.stop_streaming()
         if self.sr.isOpen():
             self.sr.flush()
             self.sr.close()
@@ -260,70 +1051,150 @@ class Servos(object):
         self.sr = board.sr
         self.servo_pos = {}
 
-    def attach(self, pin, min=544, max=2400):
-        cmd_str = build_cmd_str("sva", (pin, min, max))
-        while True:
-            self.sr.write(cmd_str)
-            self.sr.flush()
-
-            rd = self.sr.readline().replace("\r\n".encode(), "".encode())
-            if rd.isdigit():
+    def attach(self, pin, min=544, max=2400, retries=5):
+        cmd_str = self.board.build_command("sva", (pin, min, max))
+        for _ in range(retries):
+            # The reply is read under the same lock as the command, (see Arduino.send)
+            with self.board.write_lock, self.board.stats.timer('sva'):
+                self.board.send(cmd_str)
+                rd = self.board.read_values(cmd_str)
+            if len(rd) and rd[0] >= 0:
                 break
             else:
+                self.board.stats.retries += 1
                 # When the Arduino Mega gets interrupted by the keyboard, it will then
                 # keep returning the "version" keyword instead of a number, so reset
-                # the Arduino!
-                self.sr.setDTR(False)
-                time.sleep(1)
-                self.sr.flushInput()
-                self.sr.setDTR(True)
+                # the Arduino and wait for the sketch to answer again!
+                with self.board.write_lock:
+                    self.sr.setDTR(False)
+                    time.sleep(0.05)
+                    self.sr.flushInput()
+                    self.sr.setDTR(True)
+                    wait_until_ready(self.sr, self.board.timeout)
                 log.debug("trying to attach servo to pin {0}".format(pin))
-        position = int(rd)
+        else:
+            raise ValueError("Could not attach servo to pin {0}.".format(pin))
+        position = int(rd[0])
         self.servo_pos[pin] = position
         return 1
 
     def detach(self, pin):
         position = self.servo_pos[pin]
-        cmd_str = build_cmd_str("svd", (position,))
-        try:
-            self.sr.write(cmd_str)
-            self.sr.flush()
-        except:
-            pass
+        cmd_str = self.board.build_command("svd", (position,))
+        with self.board.stats.timer('svd'):
+            self.board.send(cmd_str)
         del self.servo_pos[pin]
 
     def write(self, pin, angle):
         position = self.servo_pos[pin]
-        cmd_str = build_cmd_str("svw", (position, angle))
+        cmd_str = self.board.build_command("svw", (position, angle))
 
-        self.sr.write(cmd_str)
-        self.sr.flush()
+        with self.board.stats.timer('svw'):
+            self.board.send(cmd_str)
 
     def writeMicroseconds(self, pin, uS):
         position = self.servo_pos[pin]
-        cmd_str = build_cmd_str("svwm", (position, uS))
+        cmd_str = self.board.build_command("svwm", (position, uS))
 
-        self.sr.write(cmd_str)
-        self.sr.flush()
+        with self.board.stats.timer('svwm'):
+            self.board.send(cmd_str)
 
     def read(self, pin):
         if pin not in self.servo_pos.keys():
             self.attach(pin)
         position = self.servo_pos[pin]
-        cmd_str = build_cmd_str("svr", (position,))
+        cmd_str = self.board.build_command("svr", (position,))
+        with self.board.write_lock, self.board.stats.timer('svr'):
+            self.board.send(cmd_str)
+            rd = self.board.read_values(cmd_str)
         try:
-            self.sr.write(cmd_str)
-            self.sr.flush()
-        except:
-            pass
-        rd = self.sr.readline().replace("\r\n".encode(), "".encode())
-        try:
-            angle = int(rd)
+            angle = int(rd[0])
             return angle
         except:
             return None
 
 
+class ServoOutput(threading.Thread):
+    def __init__(self, board: Arduino, steering_pin: int, throttle_pin: int, deadband: int = 2):
+        """
+        Output stage for the steering and throttle servos.
+
+          1) Values within 'deadband' of the last ones handed to the board are skipped.
+          2) Steering and throttle go out together in a single "svw2" command.
+          3) The write itself happens in this thread, so the drive loop never waits on
+             the serial driver. Only the latest pair is kept: a pair that is replaced
+             before the thread could send it is dropped.
+
+        Parameters
+        ----------
+        board: (Arduino) board with both servos already attached
+        steering_pin: (int) steering servo pin
+        throttle_pin: (int) throttle servo pin
+        deadband: (int) smallest change, (in PWM units), that triggers a new write
+        """
+        threading.Thread.__init__(self, name='ServoOutput', daemon=True)
+        self.board = board
+        self.steering_position = board.Servos.servo_pos[steering_pin]
+        self.throttle_position = board.Servos.servo_pos[throttle_pin]
+        self.deadband = deadband
+        self.running = True
+        self.last_values = None
+        self.pending = None
+        self.condition = threading.Condition()
+
+        # Counters
+        self.writes_sent = 0
+        self.writes_suppressed = 0
+
+    def write(self, steering: int, throttle: int, force: bool = False):
+        """
+        Queue a new steering/throttle pair, returns immediately.
+
+        Parameters
+        ----------
+        steering: (int) steering PWM
+        throttle: (int) throttle PWM
+        force: (bool) send the pair even if it is within the deadband of the last one,
+               (e.g. the board may have missed it while the link was down)
+        """
+        values = (int(steering), int(throttle))
+        if not force and self.last_values is not None and \
+                abs(values[0] - self.last_values[0]) <= self.deadband and \
+                abs(values[1] - self.last_values[1]) <= self.deadband:
+            self.writes_suppressed += 1
+            return
+        self.last_values = values
+        with self.condition:
+            if self.pending is not None:
+                # The previous pair never made it out, the new one supersedes it
+                self.writes_suppressed += 1
+            self.pending = values
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                steering, throttle = self.pending
+                self.pending = None
+            with self.board.stats.timer('svw2'):
+                self.board.send(self.board.build_command('svw2', (self.steering_position, steering,
+                                                                  self.throttle_position, throttle)))
+            self.writes_sent += 1
+
+    def stop(self):
+        """
+        Send the last pending pair, if any, and stop the thread.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.join()
+
+
 class SoftwareSerial(object):
     """
     Class for Arduino software serial functionality
@@ -15,9 +15,44 @@ Servo servos[8];
 int servo_pins[] = {0, 0, 0, 0, 0, 0, 0, 0};
 boolean connected = false;
 
+// Binary protocol, see BinaryFrameEncoder/BinaryFrameDecoder in python_arduino.py
+//
+// request: header (0xA5) | command | N x little-endian int16 args | checksum   => 3 to 11 bytes
+// reply:   header (0x5A) | command | N x little-endian int16 values | checksum => 5 or 13 bytes
+//
+// The frames are sized by their command: N is the number of arguments of the request,
+// (see requestArgs, BINARY_REQUEST_ARGS in python_arduino.py), and the replies carry one
+// value, or the five channels for "pwms". The checksum is the sum of all the preceding
+// bytes of the frame, modulo 256.
+const int PROTOCOL_VERSION = 2;
+const byte REQUEST_HEADER = 0xA5;
+const byte REPLY_HEADER = 0x5A;
+const int MAX_REQUEST_FRAME_SIZE = 11;
+const int MAX_REPLY_FRAME_SIZE = 13;
+const byte CMD_VERSION = 0x01;
+const byte CMD_STEERING = 0x10;
+const byte CMD_THROTTLE = 0x11;
+const byte CMD_MODE = 0x12;
+const byte CMD_RECORD = 0x13;
+const byte CMD_FULLAI = 0x14;
+const byte CMD_ALL_PWM = 0x15;
+const byte CMD_PULSE_IN = 0x16;
+const byte CMD_STREAM = 0x17;
+const byte CMD_SERVO_ADD = 0x20;
+const byte CMD_SERVO_READ = 0x21;
+const byte CMD_SERVO_WRITE = 0x22;
+const byte CMD_SERVO_WRITE_MS = 0x23;
+const byte CMD_SERVO_REMOVE = 0x24;
+const byte CMD_SERVO_WRITE_PAIR = 0x25;
+
 // For reading PWM correctly using external interrupts
 // The Arduino Mega2560 has 6 interrupts as follow;
 //
+// Push mode telemetry: when the period is not zero, a "pwms" reply frame is emitted
+// every streamPeriod milliseconds without being asked (see "strm" command)
+unsigned long streamPeriod = 0;
+unsigned long streamPrevTime = 0;
+
 // interrupt 0 => pin 2, used for throttle
 byte PWM_THROTTLE = 0;
 volatile int thrtlPWM = 0;
@@ -117,6 +152,29 @@ void getFullAIPWM() {
   Serial.println(fullaiPWM);
 }
 
+void getAllPWM() {
+  // All five channels in one reply so the host only pays a single round trip per
+  // drive loop tick, order: steering, throttle, mode, record, full AI
+  Serial.print(steerPWM);
+  Serial.print(',');
+  Serial.print(thrtlPWM);
+  Serial.print(',');
+  Serial.print(modePWM);
+  Serial.print(',');
+  Serial.print(recordPWM);
+  Serial.print(',');
+  Serial.println(fullaiPWM);
+}
+
+void setStreamPeriod(int period) {
+  streamPeriod = (period > 0) ? period : 0;
+  streamPrevTime = millis();
+}
+
+void Stream_set(String data) {
+  setStreamPeriod(Str2int(data));
+}
+
 int Str2int (String Str_value)
 {
   char buffer[10]; //max length is three units
@@ -134,8 +192,15 @@ void split(String results[], int len, String input, char spChar) {
   }
 }
 
-void Version(){
-  Serial.println("version");
+void Version(String data){
+  // "version%<protocol>" acknowledges a supported protocol, a bare "version" otherwise
+  if (Str2int(data) == PROTOCOL_VERSION) {
+    Serial.print("version%");
+    Serial.println(PROTOCOL_VERSION);
+  }
+  else {
+    Serial.println("version");
+  }
 }
 
 void SS_set(String data){
@@ -163,52 +228,61 @@ void SS_read(String data) {
  Serial.println(c);
 }
 
-void pulseInHandler(String data){
-    int pin = Str2int(data);
-    long duration;
+long pulseInMeasure(int pin){
     if(pin <=0){
           pinMode(-pin, INPUT);
-          duration = pulseIn(-pin, LOW);
+          return pulseIn(-pin, LOW);
     }else{
           pinMode(pin, INPUT);
-          duration = pulseIn(pin, HIGH);
+          return pulseIn(pin, HIGH);
     }
-    Serial.println(duration);
 }
 
-void SV_add(String data) {
-    String sdata[3];
-    split(sdata,3,data,'%');
-    int pin = Str2int(sdata[0]);
-    int min = Str2int(sdata[1]);
-    int max = Str2int(sdata[2]);
+void pulseInHandler(String data){
+    int pin = Str2int(data);
+    Serial.println(pulseInMeasure(pin));
+}
+
+int servoAttach(int pin, int min, int max) {
     int pos = -1;
     for (int i = 0; i<8;i++) {
         if (servo_pins[i] == pin) { //reset in place
-            servos[pos].detach();
-            servos[pos].attach(pin, min, max);
-            servo_pins[pos] = pin;
-            Serial.println(pos);
-            return;
+            servos[i].detach();
+            servos[i].attach(pin, min, max);
+            return i;
             }
         }
     for (int i = 0; i<8;i++) {
         if (servo_pins[i] == 0) {pos = i;break;} // find spot in servo array
         }
-    if (pos == -1) {;} //no array position available!
-    else {
+    if (pos != -1) {
         servos[pos].attach(pin, min, max);
         servo_pins[pos] = pin;
+        }
+    return pos; // -1 => no array position available!
+}
+
+void SV_add(String data) {
+    String sdata[3];
+    split(sdata,3,data,'%');
+    int pin = Str2int(sdata[0]);
+    int min = Str2int(sdata[1]);
+    int max = Str2int(sdata[2]);
+    int pos = servoAttach(pin, min, max);
+    if (pos != -1) {
         Serial.println(pos);
         }
 }
 
-void SV_remove(String data) {
-    int pos = Str2int(data);
+void servoRemove(int pos) {
     servos[pos].detach();
     servo_pins[pos] = 0;
 }
 
+void SV_remove(String data) {
+    servoRemove(Str2int(data));
+}
+
 void SV_read(String data) {
     int pos = Str2int(data);
     int angle;
@@ -224,6 +298,14 @@ void SV_write(String data) {
     servos[pos].write(angle);
 }
 
+void SV_write_pair(String data) {
+    // Steering and throttle updated by a single command
+    String sdata[4];
+    split(sdata,4,data,'%');
+    servos[Str2int(sdata[0])].write(Str2int(sdata[1]));
+    servos[Str2int(sdata[2])].write(Str2int(sdata[3]));
+}
+
 void SV_write_ms(String data) {
     String sdata[2];
     split(sdata,2,data,'%');
@@ -265,6 +347,9 @@ void SerialParser(void) {
  else if (cmd == "svw") {
       SV_write(data);
   }
+ else if (cmd == "svw2") {
+      SV_write_pair(data);
+  }
  else if (cmd == "svwm") {
       SV_write_ms(data);
   }
@@ -272,7 +357,7 @@ void SerialParser(void) {
       SV_remove(data);
   }
   else if (cmd == "version") {
-      Version();
+      Version(data);
   }
   else if (cmd == "strg") {
       getSteeringPWM();
@@ -289,6 +374,146 @@ void SerialParser(void) {
   else if (cmd == "fullai"){
       getFullAIPWM();
   }
+  else if (cmd == "pwms"){
+      getAllPWM();
+  }
+  else if (cmd == "strm"){
+      Stream_set(data);
+  }
+}
+
+void sendReplyValues(byte cmd, int *values, int numberValues) {
+  byte frame[MAX_REPLY_FRAME_SIZE];
+  int frameSize = 3 + 2 * numberValues;
+  frame[0] = REPLY_HEADER;
+  frame[1] = cmd;
+  for (int i = 0; i < numberValues; i++) {
+    frame[2 + 2 * i] = lowByte(values[i]);
+    frame[3 + 2 * i] = highByte(values[i]);
+  }
+  byte checksum = 0;
+  for (int i = 0; i < frameSize - 1; i++) {
+    checksum += frame[i];
+  }
+  frame[frameSize - 1] = checksum;
+  Serial.write(frame, frameSize);
+}
+
+void sendReply(byte cmd, int v0, int v1, int v2, int v3, int v4) {
+  int values[5] = {v0, v1, v2, v3, v4};
+  sendReplyValues(cmd, values, 5);
+}
+
+void sendReply(byte cmd, int value) {
+  sendReplyValues(cmd, &value, 1);
+}
+
+// Number of int16 arguments of a binary request, -1 for an unknown command
+int requestArgs(byte cmd) {
+  switch (cmd) {
+    case CMD_VERSION:
+    case CMD_STEERING:
+    case CMD_THROTTLE:
+    case CMD_MODE:
+    case CMD_RECORD:
+    case CMD_FULLAI:
+    case CMD_ALL_PWM:
+      return 0;
+    case CMD_PULSE_IN:
+    case CMD_STREAM:
+    case CMD_SERVO_READ:
+    case CMD_SERVO_REMOVE:
+      return 1;
+    case CMD_SERVO_WRITE:
+    case CMD_SERVO_WRITE_MS:
+      return 2;
+    case CMD_SERVO_ADD:
+      return 3;
+    case CMD_SERVO_WRITE_PAIR:
+      return 4;
+  }
+  return -1;
+}
+
+void BinaryParser(void) {
+  byte frame[MAX_REQUEST_FRAME_SIZE];
+  // header and command first, the command gives the size of the rest of the frame
+  if (Serial.readBytes(frame, 2) != 2) {
+    return; // incomplete frame, dropped
+  }
+  int numberArgs = requestArgs(frame[1]);
+  if (numberArgs < 0) {
+    return; // unknown command, dropped
+  }
+  int frameSize = 3 + 2 * numberArgs;
+  if (Serial.readBytes(frame + 2, frameSize - 2) != frameSize - 2) {
+    return; // incomplete frame, dropped
+  }
+  byte checksum = 0;
+  for (int i = 0; i < frameSize - 1; i++) {
+    checksum += frame[i];
+  }
+  if (checksum != frame[frameSize - 1]) {
+    return; // corrupted frame, dropped
+  }
+  int args[4] = {0, 0, 0, 0};
+  for (int i = 0; i < numberArgs; i++) {
+    args[i] = (int)word(frame[3 + 2 * i], frame[2 + 2 * i]);
+  }
+
+  // determine command sent
+  int pos;
+  switch (frame[1]) {
+    case CMD_VERSION:
+      sendReply(CMD_VERSION, PROTOCOL_VERSION);
+      break;
+    case CMD_STEERING:
+      sendReply(CMD_STEERING, steerPWM);
+      break;
+    case CMD_THROTTLE:
+      sendReply(CMD_THROTTLE, thrtlPWM);
+      break;
+    case CMD_MODE:
+      sendReply(CMD_MODE, modePWM);
+      break;
+    case CMD_RECORD:
+      sendReply(CMD_RECORD, recordPWM);
+      break;
+    case CMD_FULLAI:
+      sendReply(CMD_FULLAI, fullaiPWM);
+      break;
+    case CMD_ALL_PWM:
+      sendReply(CMD_ALL_PWM, steerPWM, thrtlPWM, modePWM, recordPWM, fullaiPWM);
+      break;
+    case CMD_PULSE_IN:
+      sendReply(CMD_PULSE_IN, (int)pulseInMeasure(args[0]));
+      break;
+    case CMD_STREAM:
+      setStreamPeriod(args[0]);
+      break;
+    case CMD_SERVO_ADD:
+      pos = servoAttach(args[0], args[1], args[2]);
+      if (pos != -1) {
+        sendReply(CMD_SERVO_ADD, pos);
+      }
+      break;
+    case CMD_SERVO_READ:
+      sendReply(CMD_SERVO_READ, servos[args[0]].read());
+      break;
+    case CMD_SERVO_WRITE:
+      servos[args[0]].write(args[1]);
+      break;
+    case CMD_SERVO_WRITE_PAIR:
+      servos[args[0]].write(args[1]);
+      servos[args[2]].write(args[3]);
+      break;
+    case CMD_SERVO_WRITE_MS:
+      servos[args[0]].writeMicroseconds(args[1]);
+      break;
+    case CMD_SERVO_REMOVE:
+      servoRemove(args[0]);
+      break;
+  }
 }
 
 void setup()  {
@@ -304,5 +529,18 @@ void setup()  {
 }
 
 void loop() {
-   SerialParser();
+   // Every request is answered in the format it was sent in: binary frames start
+   // with the request header, anything else is an ASCII command string
+   if (Serial.available() > 0) {
+     if (Serial.peek() == REQUEST_HEADER) {
+       BinaryParser();
+     }
+     else {
+       SerialParser();
+     }
+   }
+   if (streamPeriod > 0 && millis() - streamPrevTime >= streamPeriod) {
+     streamPrevTime = millis();
+     sendReply(CMD_ALL_PWM, steerPWM, thrtlPWM, modePWM, recordPWM, fullaiPWM);
+   }
    }
@@ -0,0 +1,284 @@
+import logging
+import os
+import select
+import threading
+import time
+import tty
+
+from .python_arduino import BINARY_COMMANDS, BinaryFrameEncoder, BinaryFrameDecoder
+
+log = logging.getLogger(__name__)
+
+"""
+  Description:
+
+    Software stand-in for the Arduino Mega running "five_channel_sketch.ino".
+
+    The simulator opens a pseudo-terminal and answers on it exactly like the sketch does,
+    (ASCII command strings and binary frames, push mode telemetry included), so the
+    Python client in python_arduino.py can be exercised and benchmarked without any
+    hardware, e.g.
+
+        board = VirtualArduino(latency={'pwms': 0.0005}, traces={'strg': lambda t: 1500})
+        arduino = Arduino(115200, port=board.start())
+
+    Only available on POSIX systems, (pty module).
+"""
+
+# Binary command bytes back to the sketch command names
+COMMAND_NAMES = {value: key for key, value in BINARY_COMMANDS.items()}
+
+# Channels captured by interrupts in the sketch, in the order of the "pwms" reply
+PWM_COMMANDS = ('strg', 'thrtl', 'mode', 'rec', 'fullai')
+
+
+class VirtualArduino(object):
+    def __init__(self,
+                 latency: dict = None,
+                 traces: dict = None,
+                 baud: int = 115200,
+                 boot_delay: float = 0.0,
+                 trace_rate: float = 50):
+        """
+          Simulated Arduino Mega on a pseudo-terminal.
+
+        Parameters
+        ----------
+        latency: (dict) processing time in seconds per sketch command name, (e.g. 'strg',
+                 'sva', 'pwms'), the 'default' key applies to any command not listed
+        traces: (dict) PWM source per channel command name, ('strg', 'thrtl', 'mode', 'rec',
+                'fullai'): a number, a function of the time in seconds since start, or a
+                sequence of values played in a loop at 'trace_rate' samples per second
+        baud: (int) simulated serial rate used to delay every byte, None to disable
+        boot_delay: (float) seconds after start (or reset) during which input is discarded,
+                    like the bootloader of the real board
+        trace_rate: (float) sample rate of the sequence traces
+        """
+        self.latency = latency or {}
+        self.traces = {'strg': 1500, 'thrtl': 1500, 'mode': 1000, 'rec': 1000, 'fullai': 1000}
+        self.traces.update(traces or {})
+        self.byte_time = 10 / baud if baud else 0
+        self.boot_delay = boot_delay
+        self.trace_rate = trace_rate
+
+        # Sketch state
+        self.servo_pins = [0] * 8
+        self.servo_values = [0] * 8
+        self.stream_period = 0
+        self.stream_previous = 0
+
+        # Statistics
+        self.commands_received = {}
+        self.servo_writes = 0
+
+        self.port = None
+        self.master_fd = None
+        self.slave_fd = None
+        self.running = False
+        self.thread = None
+        self.start_time = 0
+        self.ready_time = 0
+        self.encoder = BinaryFrameEncoder()
+        self.decoder = BinaryFrameDecoder()
+
+    def start(self) -> str:
+        """
+        Open the pseudo-terminal and start answering commands.
+
+        Returns
+        -------
+        port: (str) device path to open with serial.Serial
+        """
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.master_fd)
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        self.start_time = time.perf_counter()
+        self.ready_time = self.start_time + self.boot_delay
+        self.running = True
+        self.thread = threading.Thread(name='VirtualArduino', target=self._serve, daemon=True)
+        self.thread.start()
+        log.debug('Virtual Arduino on {0}'.format(self.port))
+        return self.port
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        for fd in (self.master_fd, self.slave_fd):
+            if fd is not None:
+                os.close(fd)
+        self.master_fd = self.slave_fd = None
+
+    def reset(self):
+        """
+        Simulate a board reset, (e.g. DTR toggle): the sketch state is cleared and
+        input is discarded for 'boot_delay' seconds.
+        """
+        self.servo_pins = [0] * 8
+        self.servo_values = [0] * 8
+        self.stream_period = 0
+        self.ready_time = time.perf_counter() + self.boot_delay
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
+
+    def pwm(self, command: str) -> int:
+        """
+        Current value of a PWM channel according to its trace.
+
+        Parameters
+        ----------
+        command: (str) sketch command reading the channel, (e.g. 'strg')
+
+        Returns
+        -------
+        pwm: (int) pulse length
+        """
+        trace = self.traces[command]
+        elapsed = time.perf_counter() - self.start_time
+        if callable(trace):
+            return int(trace(elapsed))
+        if isinstance(trace, (int, float)):
+            return int(trace)
+        return int(trace[int(elapsed * self.trace_rate) % len(trace)])
+
+    def _serve(self):
+        buffer = b''
+        while self.running:
+            timeout = 0.01
+            if self.stream_period:
+                timeout = max(0.0, self.stream_previous + self.stream_period - time.perf_counter())
+            readable, _, _ = select.select([self.master_fd], [], [], timeout)
+            if readable:
+                data = os.read(self.master_fd, 1024)
+                if time.perf_counter() < self.ready_time:
+                    # Still booting, the bytes are lost
+                    continue
+                self._wait(len(data))
+                buffer += data
+                buffer = self._parse(buffer)
+            if self.stream_period and time.perf_counter() >= self.stream_previous + self.stream_period:
+                self.stream_previous = time.perf_counter()
+                self._reply_frame('pwms', [self.pwm(command) for command in PWM_COMMANDS])
+
+    def _parse(self, buffer: bytes) -> bytes:
+        """
+        Process every complete request in the buffer, returns what is left of it.
+        """
+        while buffer:
+            if buffer[0] == self.encoder.HEADER:
+                if len(buffer) < 2:
+                    break
+                # The frames are sized by their command byte
+                size = self.encoder.frame_size(buffer[1])
+                if size is None:
+                    # Unknown command, the header byte is dropped
+                    buffer = buffer[1:]
+                    continue
+                if len(buffer) < size:
+                    break
+                frame, buffer = buffer[:size], buffer[size:]
+                if (sum(frame[:-1]) & 0xFF) != frame[-1]:
+                    # Corrupted frame, dropped
+                    continue
+                self._execute(COMMAND_NAMES[frame[1]], self.encoder.unpack(frame), binary=True)
+            else:
+                end = buffer.find(b'!')
+                if end < 0:
+                    break
+                request, buffer = buffer[:end + 1].decode(errors='replace'), buffer[end + 1:]
+                start = request.find('@')
+                if start < 0:
+                    continue
+                request = request[start + 1:request.rfind('$')]
+                cmd, _, data = request.partition('%')
+                self._execute(cmd, data.split('%') if data else [], binary=False)
+        return buffer
+
+    def _execute(self, cmd: str, args: list, binary: bool):
+        self.commands_received[cmd] = self.commands_received.get(cmd, 0) + 1
+        delay = self.latency.get(cmd, self.latency.get('default', 0))
+        if delay:
+            time.sleep(delay)
+        args = [self._to_int(arg) for arg in args]
+
+        if cmd == 'version':
+            if binary:
+                self._reply_frame(cmd, [2])
+            elif args and args[0] == 2:
+                self._reply_line('version%2')
+            else:
+                self._reply_line('version')
+        elif cmd in PWM_COMMANDS:
+            self._reply(cmd, [self.pwm(cmd)], binary)
+        elif cmd == 'pwms':
+            values = [self.pwm(command) for command in PWM_COMMANDS]
+            if binary:
+                self._reply_frame(cmd, values)
+            else:
+                self._reply_line(','.join(map(str, values)))
+        elif cmd == 'strm':
+            period = args[0] if args else 0
+            self.stream_period = period / 1000 if period > 0 else 0
+            self.stream_previous = time.perf_counter()
+        elif cmd == 'sva':
+            pin = args[0]
+            if pin in self.servo_pins:
+                position = self.servo_pins.index(pin)
+            elif 0 in self.servo_pins:
+                position = self.servo_pins.index(0)
+                self.servo_pins[position] = pin
+            else:
+                return
+            self._reply(cmd, [position], binary)
+        elif cmd == 'svr':
+            self._reply(cmd, [self.servo_values[args[0]]], binary)
+        elif cmd in ('svw', 'svwm'):
+            self.servo_values[args[0]] = args[1]
+            self.servo_writes += 1
+        elif cmd == 'svw2':
+            self.servo_values[args[0]] = args[1]
+            self.servo_values[args[2]] = args[3]
+            self.servo_writes += 1
+        elif cmd == 'svd':
+            self.servo_pins[args[0]] = 0
+        elif cmd == 'pi':
+            self._reply(cmd, [0], binary)
+        elif cmd in ('ss', 'sw'):
+            self._reply_line('ss OK')
+        elif cmd == 'sr':
+            self._reply_line('')
+
+    def _reply(self, cmd: str, values: list, binary: bool):
+        if binary:
+            self._reply_frame(cmd, values)
+        else:
+            self._reply_line(str(values[0]))
+
+    def _reply_line(self, line: str):
+        self._write((line + '\r\n').encode())
+
+    def _reply_frame(self, cmd: str, values: list):
+        self._write(self.decoder.encode(cmd, values))
+
+    def _write(self, data: bytes):
+        self._wait(len(data))
+        os.write(self.master_fd, data)
+
+    def _wait(self, number_bytes: int):
+        if self.byte_time:
+            time.sleep(number_bytes * self.byte_time)
+
+    @staticmethod
+    def _to_int(value) -> int:
+        # Same truncation as the sketch's Str2int/atoi
+        try:
+            return int(float(value))
+        except ValueError:
+            return 0
@@ -0,0 +1,119 @@
+import argparse
+import time
+
+import numpy as np
+
+from arduino.python_arduino import Arduino, ServoOutput, find_port, ASCII_PROTOCOL, BINARY_PROTOCOL
+from arduino.virtual_arduino import VirtualArduino
+
+"""
+  Description:
+
+    Benchmark suite of the Python client of the Arduino link against a VirtualArduino
+    on a pseudo-terminal: port discovery, servo attach, command round-trip times and
+    throughput in both protocols, servo write throughput and streamed channel reads.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_arduino_link --iterations 500 --latency 0.0002
+"""
+
+SERVO_PIN = 9
+
+
+def summary(name: str, timings: list):
+    timings = np.asarray(timings) * 1000
+    total = timings.sum() / 1000
+    print(f'{name:>32}: p50 {np.percentile(timings, 50):7.3f} ms, p95 {np.percentile(timings, 95):7.3f} ms, '
+          f'p99 {np.percentile(timings, 99):7.3f} ms, {len(timings) / total:8.0f} /s')
+
+
+def time_calls(method, iterations: int, pause: float = 0) -> list:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        method()
+        timings.append(time.perf_counter() - start)
+        if pause:
+            time.sleep(pause)
+    return timings
+
+
+def bench_discovery(board: VirtualArduino, baud: int):
+    start = time.perf_counter()
+    sr = find_port(baud, 2, ports=[board.port])
+    print(f'{"find_port":>32}: {time.perf_counter() - start:7.3f} s')
+    sr.close()
+
+    start = time.perf_counter()
+    sr = find_port(baud, 2, ports=[board.port], preferred_port=board.port)
+    print(f'{"find_port (cached port)":>32}: {time.perf_counter() - start:7.3f} s')
+    sr.close()
+
+    arduino = Arduino(baud, port=board.port, protocol=BINARY_PROTOCOL)
+    arduino.start_streaming(100)
+    start = time.perf_counter()
+    arduino.reconnect()
+    print(f'{"reconnect (streaming)":>32}: {time.perf_counter() - start:7.3f} s')
+    arduino.close()
+
+
+def bench_protocol(board: VirtualArduino, baud: int, protocol: int, iterations: int):
+    arduino = Arduino(baud, port=board.port, protocol=protocol)
+    name = 'binary' if arduino.protocol == BINARY_PROTOCOL else 'ascii'
+
+    start = time.perf_counter()
+    arduino.Servos.attach(SERVO_PIN)
+    print(f'{name + " Servos.attach":>32}: {(time.perf_counter() - start) * 1000:7.3f} ms')
+
+    summary(f'{name} steer_in', time_calls(arduino.steer_in, iterations))
+    summary(f'{name} read_all_channels', time_calls(arduino.read_all_channels, iterations))
+    summary(f'{name} Servos.write', time_calls(lambda: arduino.Servos.write(SERVO_PIN, 1500), iterations))
+    arduino.Servos.detach(SERVO_PIN)
+    arduino.close()
+
+
+def bench_servo_output(board: VirtualArduino, baud: int, iterations: int):
+    arduino = Arduino(baud, port=board.port, protocol=BINARY_PROTOCOL)
+    arduino.Servos.attach(SERVO_PIN)
+    arduino.Servos.attach(SERVO_PIN + 1)
+    servo_output = ServoOutput(arduino, SERVO_PIN, SERVO_PIN + 1)
+    servo_output.start()
+    values = iter(range(iterations))
+    # Paced like a fast drive loop so that the sender thread gets to run in between
+    summary('ServoOutput.write (changing)', time_calls(lambda: servo_output.write(1000 + next(values) * 3, 1465),
+                                                       iterations, pause=0.002))
+    servo_output.stop()
+    print(f'{"ServoOutput counters":>32}: {servo_output.writes_sent} sent, '
+          f'{servo_output.writes_suppressed} suppressed')
+    arduino.close()
+
+
+def bench_streaming(board: VirtualArduino, baud: int, iterations: int):
+    arduino = Arduino(baud, port=board.port, protocol=BINARY_PROTOCOL)
+    if not arduino.start_streaming(100):
+        print('Streaming not available.')
+    else:
+        time.sleep(0.1)
+        summary('streamed steer_in', time_calls(arduino.steer_in, iterations))
+        print(f'{"cache age":>32}: {arduino.channel_cache.age() * 1000:7.3f} ms')
+    arduino.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the Arduino client against a virtual board.')
+    parser.add_argument('--iterations', type=int, default=500, help='calls per measurement')
+    parser.add_argument('--baud', type=int, default=115200, help='simulated serial rate')
+    parser.add_argument('--latency', type=float, default=0.0002, help='sketch processing time per command (s)')
+    parser.add_argument('--boot-delay', type=float, default=1.0, help='simulated bootloader time (s)')
+    parser.add_argument('--skip-discovery', action='store_true', help='do not time find_port')
+    args = parser.parse_args()
+
+    with VirtualArduino(latency={'default': args.latency}, baud=args.baud,
+                        boot_delay=args.boot_delay) as virtual_board:
+        if not args.skip_discovery:
+            bench_discovery(virtual_board, args.baud)
+        bench_protocol(virtual_board, args.baud, ASCII_PROTOCOL, args.iterations)
+        bench_protocol(virtual_board, args.baud, BINARY_PROTOCOL, args.iterations)
+        bench_servo_output(virtual_board, args.baud, args.iterations)
+        bench_streaming(virtual_board, args.baud, args.iterations)
+        print(f'{"commands received":>32}: {virtual_board.commands_received}')
@@ -0,0 +1,101 @@
+import argparse
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+"""
+  Description:
+
+    Micro-benchmark of the camera display path: the former 'process_image', (flipud followed by
+    a fancy-indexed BGR to RGB swap and a reshape for Texture.blit_buffer), against the current
+    one that hands the BGR camera buffer to a flipped 'bgr' texture as is.
+
+    Each path ends with the 'blit_buffer' upload to its Kivy texture, ('rgb' for the former
+    path, a flipped 'bgr' one for the current path, as in engine_ai.py). The upload needs an
+    OpenGL context, (a Kivy window), without one, (no Kivy or no display), only the CPU side
+    is measured and the report says so.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_display_path --iterations 200
+        python -m benchmarks.bench_display_path --cpu-only
+"""
+
+RESOLUTIONS = {'pi camera': (90, 120), 'webcam': (720, 1280)}
+
+
+def flip_and_swap(image: np.ndarray) -> np.ndarray:
+    image = np.flipud(image)
+    image = image[:, :, [2, 1, 0]]
+    return image.reshape(image.size)
+
+
+def zero_copy(image: np.ndarray) -> np.ndarray:
+    return image.reshape(image.size)
+
+
+def display_textures(height: int, width: int) -> tuple:
+    """
+      Textures of both display paths, created in a Kivy window.
+
+    Returns
+    -------
+    textures: (tuple) 'rgb' texture of the former path and flipped 'bgr' texture of the current
+              one, None if Kivy or an OpenGL context is not available
+    """
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    try:
+        # Importing the window creates the OpenGL context the textures live in
+        from kivy.core.window import Window
+        from kivy.graphics.texture import Texture
+    except Exception:
+        return None
+    if Window is None:
+        return None
+    rgb_texture = Texture.create(size=(width, height), colorfmt='rgb', bufferfmt='ubyte')
+    bgr_texture = Texture.create(size=(width, height), colorfmt='bgr', bufferfmt='ubyte')
+    bgr_texture.flip_vertical()
+    return rgb_texture, bgr_texture
+
+
+def with_upload(method, texture, colorfmt: str):
+    """ Display path followed by the upload of its buffer to the texture. """
+    def display(image: np.ndarray):
+        texture.blit_buffer(method(image), colorfmt=colorfmt, bufferfmt='ubyte')
+    return display
+
+
+def measure(method, image: np.ndarray, iterations: int) -> tuple:
+    timings = np.zeros(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        method(image)
+        timings[i] = time.perf_counter() - start
+    tracemalloc.start()
+    method(image)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the camera display paths.')
+    parser.add_argument('--iterations', type=int, default=200, help='frames per measurement')
+    parser.add_argument('--cpu-only', action='store_true', help='leave the texture upload out')
+    args = parser.parse_args()
+
+    for camera, (height, width) in RESOLUTIONS.items():
+        frame = np.random.randint(0, 255, (height, width, 3), np.uint8)
+        paths = [('flipud + channel swap', flip_and_swap), ('zero copy', zero_copy)]
+        textures = None if args.cpu_only else display_textures(height, width)
+        if textures is None:
+            print(f'{camera:>9} {width}x{height}: CPU side only, the texture upload, (GPU side), is not measured')
+        else:
+            paths = [(name + ' + upload', with_upload(method, texture, colorfmt))
+                     for (name, method), texture, colorfmt in zip(paths, textures, ('rgb', 'bgr'))]
+        for name, method in paths:
+            timings, peak = measure(method, frame, args.iterations)
+            timings *= 1000
+            print(f'{camera:>9} {width}x{height} {name:>31}: mean {timings.mean():7.3f} ms, '
+                  f'p99 {np.percentile(timings, 99):7.3f} ms, allocated {peak / 1e6:6.2f} MB per frame')
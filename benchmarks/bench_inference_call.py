@@ -0,0 +1,100 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import tensorflow as tf
+import tensorflow.keras as keras
+
+from utils.model_functions import compile_keras_model, compile_saved_model, load_tflite_model
+
+"""
+  Description:
+
+    Benchmark of the per-call latency of a single-sample inference on CPU, comparing the
+    former call paths of the drive loop, ('model.predict' and the raw 'serving_default'
+    signature), against the traced CompiledModel call path of utils/model_functions.py and
+    the TensorFlow Lite interpreter, (TFLiteModel).
+
+    A small convolutional model at the default network input size is used unless a
+    saved model is given with --model.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_inference_call --iterations 300
+        python -m benchmarks.bench_inference_call --model path/to/model
+"""
+
+
+def build_model(height: int, width: int, sequence_length: int) -> keras.Model:
+    """
+      Convolutional model of the size of the ones driving the car, with a recurrent head
+      when a sequence length greater than one is given.
+    """
+    cnn = keras.Sequential([keras.layers.Rescaling(1 / 255, input_shape=(height, width, 3)),
+                            keras.layers.Conv2D(24, 5, strides=2, activation='relu'),
+                            keras.layers.Conv2D(36, 5, strides=2, activation='relu'),
+                            keras.layers.Conv2D(48, 3, strides=2, activation='relu'),
+                            keras.layers.Conv2D(64, 3, activation='relu'),
+                            keras.layers.Flatten()])
+    if sequence_length == 1:
+        return keras.Sequential([cnn, keras.layers.Dense(50, activation='relu'), keras.layers.Dense(2)])
+    return keras.Sequential([keras.layers.TimeDistributed(cnn, input_shape=(sequence_length, height, width, 3)),
+                             keras.layers.LSTM(32, return_sequences=True),
+                             keras.layers.Dense(2)])
+
+
+def summary(name: str, timings: list):
+    timings = np.asarray(timings) * 1000
+    print(f'{name:>32}: p50 {np.percentile(timings, 50):7.3f} ms, p95 {np.percentile(timings, 95):7.3f} ms, '
+          f'p99 {np.percentile(timings, 99):7.3f} ms')
+
+
+def time_calls(method, input_array: np.ndarray, iterations: int) -> list:
+    # A few untimed calls first, tracing and memory allocations are not what is measured
+    for _ in range(3):
+        method(input_array)
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        method(input_array)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Per call latency of single-sample inference on CPU.')
+    parser.add_argument('--iterations', type=int, default=300, help='calls per measurement')
+    parser.add_argument('--height', type=int, default=90, help='network input height')
+    parser.add_argument('--width', type=int, default=120, help='network input width')
+    parser.add_argument('--sequence-length', type=int, default=1, help='image sequence length, 1 for no memory')
+    parser.add_argument('--threads', type=int, default=4, help='TFLite interpreter threads')
+    parser.add_argument('--model', default=None, help='Keras model file or folder to use instead')
+    args = parser.parse_args()
+
+    # Compared on CPU, where the per call overhead is not hidden by device transfers
+    tf.config.set_visible_devices([], 'GPU')
+
+    model = keras.models.load_model(args.model) if args.model else \
+        build_model(args.height, args.width, args.sequence_length)
+    input_array = np.random.uniform(0, 255, [1] + list(model.input.shape[1:])).astype(np.float32)
+
+    summary('keras model.predict', time_calls(lambda x: model.predict(x, verbose=0),
+                                              input_array, args.iterations))
+    compiled_model = compile_keras_model(model)
+    summary('keras CompiledModel', time_calls(compiled_model, input_array, args.iterations))
+
+    with tempfile.TemporaryDirectory() as folder:
+        saved_model_path = os.path.join(folder, 'model')
+        tf.saved_model.save(model, saved_model_path)
+        signature = tf.saved_model.load(saved_model_path).signatures['serving_default']
+        input_name = next(iter(signature.structured_input_signature[1]))
+        summary('saved model signature',
+                time_calls(lambda x: signature(**{input_name: tf.convert_to_tensor(x, dtype=tf.float32)}),
+                           input_array, args.iterations))
+        compiled_signature = compile_saved_model(signature)
+        summary('saved model CompiledModel', time_calls(compiled_signature, input_array, args.iterations))
+
+        tflite_model = load_tflite_model(saved_model_path, args.threads)
+        summary(f'TFLite ({args.threads} threads)', time_calls(tflite_model, input_array,
+                                                                args.iterations))
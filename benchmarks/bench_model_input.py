@@ -0,0 +1,74 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from utils.data_functions import DataUtils, ModelInputBuffer
+
+"""
+  Description:
+
+    Benchmark of the per frame cost of preparing the model input: the uint8 circular
+    buffer of DataUtils followed by the float32 conversion of the whole sequence, (what
+    'tf.convert_to_tensor(..., dtype=tf.float32)' does on the host), against the float32
+    ModelInputBuffer where only the new image is converted.
+
+    Time and memory allocated per frame, (tracemalloc), are reported.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_model_input --sequence-length 5 --frames 1000
+"""
+
+
+def legacy_input(data_utils: DataUtils, image: np.ndarray, has_sequence: bool) -> np.ndarray:
+    sequence = data_utils.get_buffer(image)
+    if has_sequence:
+        sequence = np.expand_dims(sequence, axis=0)
+    return np.asarray(sequence, dtype=np.float32)
+
+
+def measure(method, images: np.ndarray) -> tuple:
+    # Untimed first pass, buffers are allocated on the first calls
+    method(images[0])
+    timings = np.zeros(len(images))
+    for i, image in enumerate(images):
+        start = time.perf_counter()
+        method(image)
+        timings[i] = time.perf_counter() - start
+    # Traced apart from the timings, (tracemalloc slows every allocation down), a fresh start
+    # gives the peak of these frames only, (no 'reset_peak' before Python 3.9)
+    tracemalloc.start()
+    for image in images[:64]:
+        method(image)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings * 1000, peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Per frame cost of preparing the model input.')
+    parser.add_argument('--frames', type=int, default=1000, help='number of frames')
+    parser.add_argument('--height', type=int, default=90, help='network input height')
+    parser.add_argument('--width', type=int, default=120, help='network input width')
+    parser.add_argument('--sequence-length', type=int, default=5, help='image sequence length, 1 for no memory')
+    args = parser.parse_args()
+
+    image_shape = (args.height, args.width, 3)
+    has_sequence = args.sequence_length > 1
+    input_shape = (1, args.sequence_length) + image_shape if has_sequence else (1,) + image_shape
+    images = np.random.randint(0, 256, (64,) + image_shape, np.uint8)
+    images = images[np.arange(args.frames) % len(images)]
+
+    data_utils = DataUtils()
+    data_utils.create_circular_buffer(args.sequence_length, image_shape)
+    model_input = ModelInputBuffer(input_shape)
+
+    for name, method in (('uint8 ring + float32 convert', lambda x: legacy_input(data_utils, x, has_sequence)),
+                         ('float32 ModelInputBuffer', model_input.write)):
+        timings, peak = measure(method, images)
+        print(f'{name:>30}: mean {timings.mean():7.4f} ms, p99 {np.percentile(timings, 99):7.4f} ms, '
+              f'peak allocation {peak / 1024:8.1f} KiB')
+
+    # Same model input from both paths
+    assert np.array_equal(legacy_input(data_utils, images[0], has_sequence), model_input.write(images[0]))
@@ -0,0 +1,141 @@
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+
+from utils.data_functions import ModelInputBuffer
+from utils.image_functions import resize_images
+from utils.model_cache import ModelCache
+from utils.model_functions import load_inference_model, input_dimensions
+from utils.read_hdf5 import HDF5Recording
+
+"""
+  Description:
+
+    Headless inference latency benchmark of a driving model, outside of the Kivy app.
+
+    The model is loaded through any of the engine's backends, (load_inference_model, the same
+    call path and input shape detection as EngineApp.load_dnn), then frames replayed from a
+    recorded HDF5 session, or synthetic frames, go through the same float32 input buffer as
+    in the engine, one inference per frame.
+
+    With --cache, the model goes through the artifact cache, (see ModelCache), the load time
+    of a second run is the one of a cached model.
+
+    The load and warm-up times, the p50/p95/p99 latency, the throughput and the peak
+    resident memory are printed, and saved as JSON with --json so that runs can be compared
+    across model versions and boards.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_model_latency model.tflite --backend tflite --threads 4
+        python -m benchmarks.bench_model_latency model_dir --recording session.hdf5 --json run.json
+"""
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def frame_source(recording_path: str, image_shape: tuple, number_frames: int, seed: int = 0):
+    """
+      Frames of the model input size, replayed in a loop from a recording or synthetic.
+
+    Parameters
+    ----------
+    recording_path: (str) HDF5 recording, None for synthetic frames
+    image_shape: (tuple) model image shape, (height, width, channels)
+    number_frames: (int) number of frames
+    seed: (int) seed of the synthetic frames
+
+    Returns
+    -------
+    frames: (generator) uint8 images
+    """
+    if recording_path is None:
+        rng = np.random.default_rng(seed)
+        images = rng.integers(0, 256, (64,) + tuple(image_shape), np.uint8)
+        for index in range(number_frames):
+            yield images[index % len(images)]
+    else:
+        with HDF5Recording(recording_path) as recording:
+            for index in range(number_frames):
+                yield resize_images(recording.image(index % len(recording))[np.newaxis], image_shape)[0]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless inference latency benchmark of a driving model.')
+    parser.add_argument('model', help='SavedModel folder, Keras model file or .tflite file')
+    parser.add_argument('--backend', default='saved_model', choices=['saved_model', 'keras', 'tflite'],
+                        help='inference backend, (see EngineApp.dnn_backend)')
+    parser.add_argument('--threads', type=int, default=4, help='TFLite interpreter threads')
+    parser.add_argument('--recording', default=None, help='HDF5 recording to replay, synthetic frames if omitted')
+    parser.add_argument('--frames', type=int, default=500, help='number of frames')
+    parser.add_argument('--warmup', type=int, default=3, help='warm-up calls before timing')
+    parser.add_argument('--no-streaming', action='store_true', help='windowed inference for recurrent models')
+    parser.add_argument('--cache', default=None, help='model artifact cache folder, no cache if omitted')
+    parser.add_argument('--json', default=None, help='file to save the results to, - for stdout')
+    args = parser.parse_args()
+
+    cache = ModelCache(args.cache) if args.cache else None
+    start = time.perf_counter()
+    prediction, _ = load_inference_model(args.model, args.backend, args.threads, not args.no_streaming,
+                                         cache=cache)
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    prediction.warm_up(args.warmup)
+    warmup_time = time.perf_counter() - start
+
+    sequence_length, height, width = input_dimensions(prediction.input_shape)
+    model_input = ModelInputBuffer(prediction.input_shape)
+    timings = np.zeros(args.frames)
+    start = time.perf_counter()
+    for index, image in enumerate(frame_source(args.recording, prediction.input_shape[-3:], args.frames)):
+        model_input.write(image)
+        call_start = time.perf_counter()
+        prediction(model_input.sequence())
+        timings[index] = time.perf_counter() - call_start
+    total_time = time.perf_counter() - start
+    timings *= 1000
+
+    results = {'model': args.model,
+               'backend': args.backend,
+               'threads': args.threads if args.backend == 'tflite' else None,
+               'call_path': type(prediction).__name__,
+               'input_shape': [int(dimension) for dimension in prediction.input_shape],
+               'sequence_length': sequence_length,
+               'source': args.recording or 'synthetic',
+               'frames': args.frames,
+               'cache': None if cache is None else {'hit': cache.hits > 0, 'folder': cache.cache_dir},
+               'load_s': load_time,
+               'warmup_s': warmup_time,
+               'latency_ms': {'p50': float(np.percentile(timings, 50)),
+                              'p95': float(np.percentile(timings, 95)),
+                              'p99': float(np.percentile(timings, 99)),
+                              'mean': float(timings.mean()),
+                              'max': float(timings.max())},
+               # Frames per second, input conversion and frame reading included
+               'throughput_fps': args.frames / total_time,
+               'peak_rss_mb': peak_rss_mb(),
+               'platform': {'machine': platform.machine(),
+                            'system': platform.system(),
+                            'python': platform.python_version()}}
+
+    print(f'{"call path":>16}: {results["call_path"]}, input {results["input_shape"]}')
+    print(f'{"load":>16}: {load_time:8.3f} s, warm-up {warmup_time:8.3f} s')
+    latency = results['latency_ms']
+    print(f'{"latency":>16}: p50 {latency["p50"]:7.3f} ms, p95 {latency["p95"]:7.3f} ms, '
+          f'p99 {latency["p99"]:7.3f} ms')
+    print(f'{"throughput":>16}: {results["throughput_fps"]:8.1f} frames/s')
+    print(f'{"peak RSS":>16}: {results["peak_rss_mb"]:8.1f} MiB')
+    if args.json == '-':
+        print(json.dumps(results, indent=2))
+    elif args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
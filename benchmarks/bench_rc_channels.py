@@ -0,0 +1,55 @@
+import argparse
+import time
+
+import numpy as np
+
+from arduino.python_arduino import Arduino
+from arduino.virtual_arduino import VirtualArduino
+
+"""
+  Description:
+
+    Benchmark of the serial time spent per drive loop tick reading the RC channels,
+    comparing the five individual commands (mode, fullai, rec, strg, thrtl) against the
+    single "pwms" bulk read, with a VirtualArduino standing in for the board.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_rc_channels --ticks 300
+"""
+
+
+def per_channel_tick(board: Arduino):
+    board.mode_in()
+    board.full_ai_in()
+    board.rec_in()
+    board.steer_in()
+    board.throttle_in()
+
+
+def bulk_tick(board: Arduino):
+    board.read_all_channels()
+
+
+def time_ticks(tick, board: Arduino, ticks: int) -> np.ndarray:
+    timings = np.zeros(ticks)
+    for i in range(ticks):
+        start = time.perf_counter()
+        tick(board)
+        timings[i] = time.perf_counter() - start
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Per tick serial time of the RC channel reads.')
+    parser.add_argument('--ticks', type=int, default=300, help='number of simulated drive loop ticks')
+    parser.add_argument('--baud', type=int, default=115200, help='simulated serial rate')
+    parser.add_argument('--latency', type=float, default=0.0002, help='sketch processing time per command (s)')
+    args = parser.parse_args()
+
+    with VirtualArduino(latency={'default': args.latency}, baud=args.baud) as virtual_board:
+        arduino = Arduino(args.baud, port=virtual_board.port)
+        for name, method in (('five commands', per_channel_tick), ('pwms bulk read', bulk_tick)):
+            result = time_ticks(method, arduino, args.ticks) * 1000
+            print(f'{name:>15}: mean {result.mean():6.2f} ms, p50 {np.percentile(result, 50):6.2f} ms, '
+                  f'p99 {np.percentile(result, 99):6.2f} ms per tick')
+        arduino.close()
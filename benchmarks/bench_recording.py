@@ -0,0 +1,98 @@
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from utils.read_hdf5 import HDF5Recording
+from utils.write_hdf5 import StreamToHDF5, FILE_VERSIONS, QUEUE_POLICIES
+
+"""
+  Description:
+
+    Benchmark of the recording writer: frames are handed to StreamToHDF5 at the drive loop
+    rate, (as 'drive_loop' does), and the writer statistics are sampled once a second to
+    check that it keeps up, (the queue depth stays flat and every frame is written).
+
+    The time the drive loop spends queuing a frame, (including the image copy), is reported
+    along with the write time and latency, (queued to on disk), of the writer thread. The file
+    is then read back in batches, as for training, to compare the file formats.
+
+    With a queue budget the disk cannot keep up with, (e.g. --queue-mb 10 at 1280x720), the
+    frames dropped by the queue policy are checked against the 'droppedFrames' attribute.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_recording --rate 30 --seconds 20 --width 120 --height 90 --file-version 2.0
+        python -m benchmarks.bench_recording --width 1280 --height 720 --queue-mb 10 --policy drop-oldest
+"""
+
+
+def record_session(stream: StreamToHDF5, images: np.ndarray, rate: float, seconds: float) -> np.ndarray:
+    number_frames = int(rate * seconds)
+    queue_timings = np.zeros(number_frames)
+    start = time.perf_counter()
+    for i in range(number_frames):
+        # Pace the frames like the Kivy clock does
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        tick = time.perf_counter()
+        stream.record(rate, 1500, 1500, images[i % len(images)].copy())
+        queue_timings[i] = time.perf_counter() - tick
+        if i % int(rate) == 0:
+            print(f'  t = {i / rate:5.1f} s: {stream.summary()}')
+    return queue_timings
+
+
+def read_back(file_path: str, batch_size: int) -> float:
+    start = time.perf_counter()
+    with HDF5Recording(file_path) as recording:
+        for index in range(0, len(recording), batch_size):
+            recording.images(index, min(index + batch_size, len(recording)))
+        recording.steering
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sustained throughput of the recording writer.')
+    parser.add_argument('--rate', type=float, default=30, help='frames per second handed to the writer')
+    parser.add_argument('--seconds', type=float, default=20, help='duration of the recording')
+    parser.add_argument('--width', type=int, default=120, help='recorded image width')
+    parser.add_argument('--height', type=int, default=90, help='recorded image height')
+    parser.add_argument('--folder', default=None, help='folder the log file is written to, a temporary one if None')
+    parser.add_argument('--file-version', type=float, default=2.0, choices=list(FILE_VERSIONS), help='file format')
+    parser.add_argument('--batch-size', type=int, default=64, help='frames per read when reading the file back')
+    parser.add_argument('--queue-mb', type=float, default=256, help='memory budget of the writer queue, MiB')
+    parser.add_argument('--policy', default='decimate', choices=QUEUE_POLICIES, help='policy of the full queue')
+    args = parser.parse_args()
+
+    images = np.random.randint(0, 256, (16, args.height, args.width, 3), np.uint8)
+    with tempfile.TemporaryDirectory(dir=args.folder) as folder:
+        stream = StreamToHDF5(args.width, args.height, 2000, 1000, 1500, 1600, 1400, args.file_version,
+                              queue_budget=int(args.queue_mb * 2 ** 20), queue_policy=args.policy)
+        stream.user_data_folder = folder
+        stream.start()
+
+        timings = record_session(stream, images, args.rate, args.seconds) * 1000
+        stop_start = time.perf_counter()
+        stream.close_log_file()
+        stream.stop()
+        drain_time = time.perf_counter() - stop_start
+
+        print(f'Recorded {len(timings)} frames, written {stream.frames_written}, dropped {stream.dropped_frames}, '
+              f'drained and closed in {drain_time:4.2f} s after the last frame')
+        print(f'Drive loop side: mean {timings.mean():6.3f} ms, p99 {np.percentile(timings, 99):6.3f} ms, '
+              f'max {timings.max():6.3f} ms per frame')
+        print(f'Writer side: mean write {stream.write_time * 1000:6.3f} ms, '
+              f'max write {stream.max_write_time * 1000:6.3f} ms, '
+              f'last latency {stream.write_latency * 1000:6.1f} ms')
+        assert stream.frames_written + stream.dropped_frames == len(timings), 'the writer lost frames'
+
+        file_path = glob.glob(os.path.join(folder, '*.hdf5'))[0]
+        with HDF5Recording(file_path) as recording:
+            assert recording.dropped_frames == stream.dropped_frames, 'dropped frames missing from the file'
+        read_time = read_back(file_path, args.batch_size)
+        print(f'{FILE_VERSIONS[args.file_version]}: {os.path.getsize(file_path) / 2 ** 20:7.1f} MiB, '
+              f'read back in {read_time:5.2f} s, ({len(timings) / read_time:7.0f} frames/s)')
@@ -0,0 +1,133 @@
+import argparse
+import io
+import tempfile
+import time
+
+import h5py
+import numpy as np
+
+from utils.write_hdf5 import StreamToHDF5
+
+"""
+  Description:
+
+    Benchmark of the sustained rate, (frames per second), at which the recording writer
+    saves frames, one frame per write against batches of frames written as single slabs,
+    (see StreamToHDF5), for the pi camera and webcam image sizes.
+
+    Frames are queued as fast as the writer takes them, (the queue is kept under a few
+    batches), so the rate is the one of the writer, not the one of the drive loop.
+
+    Every case runs on local disk, (or '--folder'), and on a slow storage stand-in: a file
+    object that holds every write back to a given bandwidth and adds a fixed latency per
+    write, (an SD card under load). To measure real slow storage instead, point '--folder'
+    at it, (e.g. a tmpfs mounted in a cgroup with an io.max limit, or a FUSE loop mount).
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_recording_batches --seconds 5 --batch-size 32 --slow-mbps 20
+"""
+
+IMAGE_SIZES = {'pi camera': (90, 120), 'webcam': (720, 1280)}
+
+
+class ThrottledFile(io.RawIOBase):
+    def __init__(self, file_path: str, bandwidth: float, latency: float):
+        """
+          File object that writes no faster than 'bandwidth' bytes per second and waits
+          'latency' seconds on every write.
+        """
+        io.RawIOBase.__init__(self)
+        self.file = open(file_path, 'w+b')
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.busy_until = time.perf_counter()
+
+    def write(self, data) -> int:
+        now = time.perf_counter()
+        self.busy_until = max(self.busy_until, now) + self.latency + len(data) / self.bandwidth
+        time.sleep(max(0.0, self.busy_until - now))
+        return self.file.write(data)
+
+    def readinto(self, buffer) -> int:
+        return self.file.readinto(buffer)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self.file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.file.tell()
+
+    def truncate(self, size: int = None) -> int:
+        return self.file.truncate(size)
+
+    def flush(self):
+        self.file.flush()
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def close(self):
+        self.file.close()
+        io.RawIOBase.close(self)
+
+
+class ThrottledStreamToHDF5(StreamToHDF5):
+    def __init__(self, *args, bandwidth: float, latency: float, **kwargs):
+        StreamToHDF5.__init__(self, *args, **kwargs)
+        self.bandwidth = bandwidth
+        self.latency = latency
+
+    def open_log_file(self, file_path: str, **kwargs) -> h5py.File:
+        # The file object is closed along with the HDF5 file, when it is garbage collected
+        return h5py.File(ThrottledFile(file_path, self.bandwidth, self.latency), 'w', **kwargs)
+
+
+def sustained_rate(stream: StreamToHDF5, images: np.ndarray, seconds: float, max_queued: int) -> float:
+    stream.start()
+    start = time.perf_counter()
+    i = 0
+    while time.perf_counter() - start < seconds:
+        if stream.queue_depth >= max_queued:
+            time.sleep(0.001)
+            continue
+        stream.record(30, 1500, 1500, images[i % len(images)])
+        i += 1
+    stream.close_log_file()
+    stream.stop()
+    elapsed = time.perf_counter() - start
+    assert stream.frames_written == i, 'the writer lost frames'
+    return stream.frames_written / elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sustained frames per second of the recording writer.')
+    parser.add_argument('--seconds', type=float, default=5, help='duration of each case')
+    parser.add_argument('--batch-size', type=int, default=32, help='frames per batch of the batched writer')
+    parser.add_argument('--folder', default=None, help='folder the log files are written to, a temporary one if None')
+    parser.add_argument('--slow-mbps', type=float, default=20, help='bandwidth of the slow storage stand-in, MB/s')
+    parser.add_argument('--slow-latency-ms', type=float, default=1, help='latency per write of the slow storage, ms')
+    args = parser.parse_args()
+
+    for size_name, (height, width) in IMAGE_SIZES.items():
+        images = np.random.randint(0, 256, (8, height, width, 3), np.uint8)
+        frame_mb = images[0].nbytes / 1e6
+        for storage in ('local', 'slow'):
+            for batch_size in (1, args.batch_size):
+                with tempfile.TemporaryDirectory(dir=args.folder) as folder:
+                    stream_args = (width, height, 2000, 1000, 1500, 1600, 1400, 2.0)
+                    if storage == 'local':
+                        stream = StreamToHDF5(*stream_args, batch_size=batch_size, queue_policy='block')
+                    else:
+                        stream = ThrottledStreamToHDF5(*stream_args, batch_size=batch_size, queue_policy='block',
+                                                       bandwidth=args.slow_mbps * 1e6,
+                                                       latency=args.slow_latency_ms / 1000)
+                    stream.user_data_folder = folder
+                    rate = sustained_rate(stream, images, args.seconds, 4 * args.batch_size)
+                print(f'{size_name:>10} {width}x{height}, {storage:>5} storage, batch {batch_size:3d}: '
+                      f'{rate:8.1f} frames/s, ({rate * frame_mb:6.1f} MB/s)')
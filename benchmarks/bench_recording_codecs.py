@@ -0,0 +1,75 @@
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from utils.read_hdf5 import HDF5Recording
+from utils.write_hdf5 import StreamToHDF5, available_image_codecs
+
+"""
+  Description:
+
+    Benchmark of the image codecs of the recordings, (see IMAGE_CODECS in utils/write_hdf5.py),
+    on a sample of frames from one of our own recordings: real camera frames compress very
+    differently from random ones.
+
+    The sample is recorded with each codec through StreamToHDF5, (the compression runs on its
+    writer thread), then read back in batches, as for training. The compression ratio, the
+    write and read-back rates, (in MB/s of raw images), are reported for each codec.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_recording_codecs session.hdf5 --frames 1000
+        python -m benchmarks.bench_recording_codecs session.hdf5 --codecs none lzf gzip-1 blosc-lz4
+"""
+
+
+def write_sample(stream: StreamToHDF5, images: np.ndarray, max_queued: int) -> float:
+    stream.start()
+    start = time.perf_counter()
+    for image in images:
+        while stream.queue_depth >= max_queued:
+            time.sleep(0.001)
+        stream.record(30, 1500, 1500, image)
+    stream.close_log_file()
+    stream.stop()
+    assert stream.frames_written == len(images), 'the writer lost frames'
+    return time.perf_counter() - start
+
+
+def read_sample(file_path: str, batch_size: int) -> float:
+    start = time.perf_counter()
+    with HDF5Recording(file_path) as recording:
+        for index in range(0, len(recording), batch_size):
+            recording.images(index, min(index + batch_size, len(recording)))
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compression ratio and throughput of the recording codecs.')
+    parser.add_argument('recording', help='HDF5 recording the sample of frames is taken from')
+    parser.add_argument('--frames', type=int, default=1000, help='frames of the sample, from the start of the recording')
+    parser.add_argument('--codecs', nargs='+', default=None, help='codecs to compare, all the available ones if omitted')
+    parser.add_argument('--batch-size', type=int, default=32, help='frames per batch, written and read')
+    parser.add_argument('--folder', default=None, help='folder the log files are written to, a temporary one if None')
+    args = parser.parse_args()
+
+    with HDF5Recording(args.recording) as recording:
+        images = recording.images(0, min(args.frames, len(recording)))
+    height, width = images.shape[1:3]
+    raw_mb = images.nbytes / 1e6
+    print(f'{len(images)} frames of {width}x{height} from {args.recording}, {raw_mb:.1f} MB raw')
+
+    for codec in args.codecs or available_image_codecs():
+        with tempfile.TemporaryDirectory(dir=args.folder) as folder:
+            stream = StreamToHDF5(width, height, 2000, 1000, 1500, 1600, 1400, 2.0,
+                                  batch_size=args.batch_size, image_codec=codec, queue_policy='block')
+            stream.user_data_folder = folder
+            write_time = write_sample(stream, images, 4 * args.batch_size)
+            file_path = glob.glob(os.path.join(folder, '*.hdf5'))[0]
+            file_mb = os.path.getsize(file_path) / 1e6
+            read_time = read_sample(file_path, args.batch_size)
+        print(f'{codec:>10}: ratio {raw_mb / file_mb:5.2f}, {file_mb:7.1f} MB, '
+              f'write {raw_mb / write_time:7.1f} MB/s, read back {raw_mb / read_time:7.1f} MB/s')
@@ -0,0 +1,82 @@
+import argparse
+import time
+
+import numpy as np
+import tensorflow as tf
+import tensorflow.keras as keras
+
+from benchmarks.bench_inference_call import build_model
+from utils.data_functions import ModelInputBuffer
+from utils.model_functions import compile_keras_model, compile_streaming_model, streaming_error
+
+"""
+  Description:
+
+    Benchmark and equivalence check of the incremental inference of recurrent models,
+    (StreamingSequenceModel), against the windowed call path running the whole sequence
+    at every frame.
+
+    Frames go through the ModelInputBuffer like in the engine. Every output of the
+    incremental path is compared with the windowed one, (frames are skipped at random so
+    that partial recomputation is exercised too), and the run fails if they differ by more
+    than the tolerance.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_streaming_inference --sequence-length 5 --frames 300
+"""
+
+
+def summary(name: str, timings: list):
+    timings = np.asarray(timings) * 1000
+    print(f'{name:>24}: p50 {np.percentile(timings, 50):7.3f} ms, p95 {np.percentile(timings, 95):7.3f} ms, '
+          f'p99 {np.percentile(timings, 99):7.3f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Incremental against windowed inference of recurrent models.')
+    parser.add_argument('--frames', type=int, default=300, help='number of frames')
+    parser.add_argument('--height', type=int, default=90, help='network input height')
+    parser.add_argument('--width', type=int, default=120, help='network input width')
+    parser.add_argument('--sequence-length', type=int, default=5, help='image sequence length')
+    parser.add_argument('--skip-rate', type=float, default=0.1, help='fraction of frames the model does not see')
+    parser.add_argument('--tolerance', type=float, default=1e-2, help='largest accepted output difference')
+    parser.add_argument('--model', default=None, help='Keras model file to use instead')
+    args = parser.parse_args()
+
+    tf.config.set_visible_devices([], 'GPU')
+    model = keras.models.load_model(args.model) if args.model else \
+        build_model(args.height, args.width, args.sequence_length)
+    windowed_model = compile_keras_model(model, np.float32)
+    streaming_model = compile_streaming_model(model)
+    if streaming_model is None:
+        parser.error('the model has no TimeDistributed front-end to split')
+    windowed_model.warm_up()
+    streaming_model.warm_up()
+    print(f'{"load time check":>24}: largest difference {streaming_error(streaming_model, windowed_model):.3g}')
+
+    streaming_model.images_computed = streaming_model.calls = 0
+
+    rng = np.random.default_rng(0)
+    model_input = ModelInputBuffer(windowed_model.input_shape)
+    windowed_timings, streaming_timings, error = [], [], 0.0
+    for index in range(args.frames):
+        model_input.write(rng.integers(0, 256, windowed_model.input_shape[2:], np.uint8))
+        if index < model_input.sequence_length or rng.random() < args.skip_rate:
+            continue
+        sequence = model_input.sequence()
+
+        start = time.perf_counter()
+        windowed_output = windowed_model(sequence)
+        windowed_timings.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        streaming_output = streaming_model(sequence)
+        streaming_timings.append(time.perf_counter() - start)
+        error = max(error, float(np.abs(streaming_output - windowed_output).max()))
+
+    summary('windowed', windowed_timings)
+    summary('incremental', streaming_timings)
+    print(f'{"front-end runs per call":>24}: '
+          f'{streaming_model.images_computed / streaming_model.calls:.2f}, (windowed: {args.sequence_length})')
+    print(f'{"largest difference":>24}: {error:.3g}')
+    assert error <= args.tolerance, 'Incremental and windowed outputs differ'
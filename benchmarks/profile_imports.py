@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+"""
+  Description:
+
+    Import-time profile of the engine and of its utility modules.
+
+    Every module is imported in a fresh interpreter with 'python -X importtime', (Python 3.7
+    and later, on Python 3.6, e.g. JetPack 4.6, the probe times the imports itself). The report
+    gives the total import time of the module, the slowest imports it pulls in and which
+    of the heavy stacks, (TensorFlow, Kivy, OpenCV, Tk, h5py), end up loaded. Utilities such
+    as DataUtils and StreamToHDF5 are expected to load none of the GUI or ML stacks.
+
+    Usage (from the repository root):
+        python -m benchmarks.profile_imports
+        python -m benchmarks.profile_imports --module engine_ai --top 25
+"""
+
+MODULES = ('utils.data_functions',
+           'utils.folder_functions',
+           'utils.write_hdf5',
+           'utils.read_hdf5',
+           'utils.camera_functions',
+           'utils.inference_functions',
+           'utils.image_functions',
+           'utils.model_cache',
+           'utils.model_functions',
+           'arduino.python_arduino',
+           'engine_ai')
+
+HEAVY_STACKS = ('tensorflow', 'kivy', 'cv2', 'tkinter', 'tkfilebrowser', 'h5py')
+
+# Prints the heavy stacks loaded by the import, on the last line of stdout, (no other import
+# than the module's own so that the times are only its own)
+PROBE = 'import sys, {module}; print(\',\'.join(name for name in {stacks} if name in sys.modules))'
+
+# Python 3.6 has no '-X importtime', this is run before the probe to time the imports through
+# '__import__' instead and report them in the same format, (modules already imported by the
+# interpreter startup are not timed, as with '-X importtime')
+TIMED_IMPORTS = '''
+import builtins, sys, time
+_import = builtins.__import__
+_children = [0.0]
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level:
+        package = (globals or {}).get('__package__') or ''
+        name_imported = package + '.' + name if name else package
+    else:
+        name_imported = name
+    if name_imported in sys.modules:
+        return _import(name, globals, locals, fromlist, level)
+    _children.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _import(name, globals, locals, fromlist, level)
+    finally:
+        cumulative = time.perf_counter() - start
+        children = _children.pop()
+        _children[-1] += cumulative
+        sys.stderr.write('import time: {0:9d} | {1:10d} |{2}{3}\\n'.format(
+            int((cumulative - children) * 1e6), int(cumulative * 1e6), ' ' * (2 * len(_children) - 1), name_imported))
+builtins.__import__ = _timed_import
+'''
+
+
+def profile_module(module: str, importtime: bool = None) -> dict:
+    """
+      Import a module in a fresh interpreter and collect its import times.
+
+    Parameters
+    ----------
+    module: (str) dotted module name, relative to the repository root
+    importtime: (bool) use '-X importtime', (Python 3.7 and later), the default on the versions
+                that have it, or else time the imports in the probe, (see TIMED_IMPORTS)
+
+    Returns
+    -------
+    profile: (dict) 'total_ms', 'imports' (list of (cumulative ms, self ms, name)), 'stacks'
+             (heavy stacks loaded), 'error' (last line of the error if the import failed)
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if importtime is None:
+        importtime = sys.version_info >= (3, 7)
+    probe = PROBE.format(module=module, stacks=HEAVY_STACKS)
+    command = [sys.executable, '-X', 'importtime', '-c', probe] if importtime else \
+        [sys.executable, '-c', TIMED_IMPORTS + probe]
+    # No 'capture_output' nor 'text' on Python 3.6
+    process = subprocess.run(command, cwd=root, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             universal_newlines=True)
+    imports = []
+    other_lines = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            other_lines.append(line)
+            continue
+        self_time, cumulative_time, name = line[len('import time:'):].split('|')
+        imports.append((int(cumulative_time) / 1000, int(self_time) / 1000, name.rstrip()))
+
+    # Top level imports of the module's package, (the interpreter startup imports are left out)
+    package = module.split('.')[0]
+    top_level = [entry for entry in imports if entry[2].strip().split('.')[0] == package and
+                 len(entry[2]) - len(entry[2].lstrip()) == 1]
+    profile = {'module': module,
+               'total_ms': sum(entry[0] for entry in top_level),
+               'imports': sorted(imports, reverse=True),
+               'stacks': None,
+               'error': None}
+    if process.returncode == 0:
+        last_line = process.stdout.splitlines()[-1] if process.stdout.strip() else ''
+        profile['stacks'] = [name for name in last_line.split(',') if name]
+    else:
+        profile['error'] = other_lines[-1] if other_lines else f'exit code {process.returncode}'
+    return profile
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import-time profile of the engine modules.')
+    parser.add_argument('--module', nargs='+', default=list(MODULES), help='modules to profile')
+    parser.add_argument('--top', type=int, default=10, help='slowest imports listed per module')
+    parser.add_argument('--json', default=None, help='file to save the profiles to')
+    args = parser.parse_args()
+
+    profiles = [profile_module(module) for module in args.module]
+    for profile in profiles:
+        stacks = 'import failed: ' + profile['error'] if profile['error'] else \
+            'heavy stacks: ' + (', '.join(profile['stacks']) or 'none')
+        print(f'{profile["module"]:>26}: {profile["total_ms"]:9.1f} ms, {stacks}')
+        for cumulative_time, self_time, name in profile['imports'][:args.top]:
+            print(f'{"":>28}{cumulative_time:9.1f} ms cumulative, {self_time:8.1f} ms self  {name.strip()}')
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(profiles, json_file, indent=2)
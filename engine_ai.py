@@ -1,40 +1,49 @@
 from kivy.app import App
 from kivy.lang import Builder
-from kivy.core.window import Window
 from kivy.uix.gridlayout import GridLayout
 from kivy.properties import ObjectProperty
 from kivy.clock import Clock
 from kivy.graphics.texture import Texture
-import cv2
+from functools import partial
+import threading
+import time
 import numpy as np
-import tensorflow.keras as keras
-import tensorflow as tf
 
 # Custom module for miscellaneous utility classes to support a GUI.
 from utils.folder_functions import UserPath
-from utils.write_hdf5 import StreamToHDF5
-from utils.data_functions import DataUtils
-from arduino.python_arduino import Arduino
+from utils.write_hdf5 import StreamToHDF5, available_image_codecs
+from utils.data_functions import DataUtils, ModelInputBuffer
+from utils.camera_functions import CameraStream
+from utils.inference_functions import InferenceWorker, ModelLoader
+from arduino.python_arduino import Arduino, ServoOutput, BINARY_PROTOCOL
+"""
+    Please note:
+    TensorFlow, (utils/model_functions.py), is only imported when a model is loaded and
+    OpenCV, (cv2 and utils/image_functions.py), when the drive system is turned on, so
+    that the window shows up without waiting for either of them. Run
+    'python -m benchmarks.profile_imports' to see where the import time goes.
+"""
 
 # Servo Pin Numbers
 STEERING_SERVO = 9
 THROTTLE_SERVO = 10
 
-# Using TensorRT?
+# Inference backends, (name shown in the UI)
 """
-    For now, this is decided without exposure to the user since the Jetson Nano is 
-    virtually useless without TensorRT parsing. We may decide to incorporate this
-    into the UI.
+    Please note:
+    'saved_model' is the default since the Jetson Nano is virtually useless without
+    TensorRT parsing, 'tflite' is the fastest option on boards without a usable GPU.
+    The backend is selected from the UI and saved in the app configuration.
 """
-USE_TRT = True
+DNN_BACKENDS = {'saved_model': 'SavedModel', 'keras': 'Keras', 'tflite': 'TFLite'}
 
-# Layout files for GUI sub-panels
-Builder.load_file('kvSubPanels/camctrls.kv')
-Builder.load_file('kvSubPanels/vehiclestatus.kv')
-Builder.load_file('kvSubPanels/pwmsettings.kv')
-Builder.load_file('kvSubPanels/powerctrls.kv')
-Builder.load_file('kvSubPanels/filediag.kv')
-Builder.load_file('kvSubPanels/statusbar.kv')
+# Layout files for GUI sub-panels, (loaded in 'build')
+KV_SUB_PANELS = ('kvSubPanels/camctrls.kv',
+                 'kvSubPanels/vehiclestatus.kv',
+                 'kvSubPanels/pwmsettings.kv',
+                 'kvSubPanels/powerctrls.kv',
+                 'kvSubPanels/filediag.kv',
+                 'kvSubPanels/statusbar.kv')
 
 
 class EngineApp(App):
@@ -50,17 +59,25 @@ class EngineApp(App):
 
         # Parameters
         self.rc_mode = None
+        self.rc_channels = None
         self.drive_loop_buffer_fps = None
-        self.inference_loop_buffer_fps = None
-        self.camera_buffer_fps = None
         self.arduino_board = None
+        self.servo_output = None
+        self.reconnect_thread = None
+        self.reconnect_time = 0
         self.file_IO = None
         self.stream_to_file = None
         self.model = None
-        self.image_buffer = None
+        self.model_input = None
         self.prediction = None
         self.inference_method = None
-        self.get_frame = None
+        self.camera_stream = None
+        self.resize_pipeline = None
+        self.inference_worker = None
+        self.model_loader = None
+        self.incoming_dnn = None
+        self.frame_sequence = 0
+        self.frame_timestamp = 0
         self.car_name = "miniAutonomous"
         self.drive_mode = 'Manual'
         self.data_utils = DataUtils()
@@ -71,6 +88,7 @@ class EngineApp(App):
         self.nn_image_width = 0
         self.nn_image_height = 0
         self.sequence_length = 0
+        self.tick_count = 0
 
         """
             Current options are a webcam or a Raspberry Pi CM 2 module
@@ -110,6 +128,22 @@ class EngineApp(App):
         """
         # Set the desired rate of the drive loop
         self.drive_loop_rate = 30
+        # Rate at which the Arduino streams the RC channels, (samples per second)
+        self.telemetry_rate = 100
+        # Smallest servo PWM change that is actually sent to the Arduino
+        self.servo_deadband = 2
+        # Seconds between two attempts at bringing a lost Arduino link back up
+        self.reconnect_period = 1.0
+        # Most frames the recording writer saves at once, and compression of the recorded
+        # images, (see StreamToHDF5)
+        self.recording_batch_size = 32
+        self.recording_codec = 'none'
+        # Format of the recordings, columnar since 2.0, (see FILE_VERSIONS in utils/write_hdf5.py)
+        self.recording_file_version = 2.0
+        # Memory the queued recording frames may take, and what to do with the frames past it,
+        # (see QUEUE_POLICIES in utils/write_hdf5.py)
+        self.recording_queue_mb = 256
+        self.recording_queue_policy = 'decimate'
         # Number of channels of input image
         self.color_depth = 3
         # Length of buffer reel (i.e. how many values are used in moving avg)
@@ -119,22 +153,37 @@ class EngineApp(App):
         self.recording_image_height = 90
         # For RNNs, define the sequence length
         self.sequence_length = 5
+        # Inference backend, (see DNN_BACKENDS), and CPU threads of the TFLite interpreter
+        self.dnn_backend = 'saved_model'
+        self.tflite_threads = 4
+        # Cache of the prepared models, (TFLite conversions, traced Keras models), keyed by the
+        # model content, None for the default folder, (see utils/model_cache.py)
+        self.model_cache_dir = None
+        self.model_cache_size_mb = 2048
+        self.model_cache = None
+        # Run the front-end of recurrent Keras models only on new images, (see StreamingSequenceModel),
+        # provided the outputs stay within this tolerance of the windowed ones
+        self.streaming_inference = True
+        self.streaming_tolerance = 1e-2
+        # Normalization of the pixel values fed to the model, (value * scale + offset), the
+        # models are trained on raw pixel values
+        self.input_scale = 1.0
+        self.input_offset = 0.0
+        # Oldest inference (s) the full autonomous throttle is allowed to act on
+        self.max_inference_age = 0.5
 
         # Creation of buffer arrays
         """
             Please Note:
-            These two buffers help provide a moving average of the frame rate
-            at which the overall framework operates, (input image -> inference -> output command),
-            and that at which the camera is operating, (basic FPS of camera). 
+            This buffer helps provide a moving average of the frame rate
+            at which the overall framework operates, (input image -> inference -> output command).
+            The camera and inference rates are measured by their own threads, (see CameraStream
+            and InferenceWorker).
             These are important to determine if the vehicles drive system is operating
             at an optimal rate, which should be close to realtime, (~30 fps).
         """
         self.drive_loop_buffer_fps = np.full(self.moving_avg_length,
                                              1 * int(self.drive_loop_rate))
-        self.inference_loop_buffer_fps = np.full(self.moving_avg_length,
-                                                 1 * int(self.drive_loop_rate))
-        self.camera_buffer_fps = np.full(self.moving_avg_length,
-                                         1 * int(self.drive_loop_rate))
 
     def build(self):
         """
@@ -151,18 +200,49 @@ class EngineApp(App):
         self.title = 'EngineAppGUI'
         self.icon = 'img/logoTitleBarV2_32x32.png'
         self.file_IO = UserPath('EngineApp.py')
+        for kv_file in KV_SUB_PANELS:
+            Builder.load_file(kv_file)
         self.ui = EngineAppGUI(self)                                                                                    # noqa
 
+        # Inference backend used last time
+        self.dnn_backend = self.file_IO.apps_get_default('dnnBackend') or self.dnn_backend
+        self.tflite_threads = self.file_IO.apps_get_default('tfliteThreads') or self.tflite_threads
+        self.ui.fileDiag.dnnBackend.text = DNN_BACKENDS[self.dnn_backend]
+        self.model_cache_dir = self.file_IO.apps_get_default('modelCacheDir') or self.model_cache_dir
+        self.model_cache_size_mb = self.file_IO.apps_get_default('modelCacheSize') or self.model_cache_size_mb
+
         # Stream file object to record data
+        self.recording_queue_mb = self.file_IO.apps_get_default('recordingQueueMB') or self.recording_queue_mb
+        self.recording_queue_policy = self.file_IO.apps_get_default('recordingQueuePolicy') or \
+            self.recording_queue_policy
         self.stream_to_file = StreamToHDF5(self.recording_image_width,
                                            self.recording_image_height,
                                            self.ui.steering_max,
                                            self.ui.steering_min,
                                            self.ui.throttle_neutral,
                                            self.ui.throttle_max,
-                                           self.ui.throttle_min)
+                                           self.ui.throttle_min,
+                                           self.recording_file_version,
+                                           batch_size=self.recording_batch_size,
+                                           queue_budget=int(self.recording_queue_mb * 2 ** 20),
+                                           queue_policy=self.recording_queue_policy)
+        # Image compression used last time, if still available
+        codecs = available_image_codecs()
+        self.ui.fileDiag.recordingCodec.values = codecs
+        recording_codec = self.file_IO.apps_get_default('recordingCodec') or self.recording_codec
+        self.ui.fileDiag.recordingCodec.text = recording_codec if recording_codec in codecs else 'none'
+        # The writer thread runs for the whole session, recordings only queue frames to it
+        self.stream_to_file.start()
         return self.ui
 
+    def on_stop(self):
+        """
+            Kivy calls this when the app closes: the frames still queued are written and the
+            log file closed.
+        """
+        if self.stream_to_file is not None:
+            self.stream_to_file.stop()
+
     def drive_loop(self, dt: int):
         """
           Main loop that drives the AI framework, from here forwards
@@ -179,14 +259,34 @@ class EngineApp(App):
         self.drive_loop_buffer_fps, fp_avg =\
             self.data_utils.moving_avg(self.drive_loop_buffer_fps, 1 / dt)
 
+        # Bring the Arduino link back up if it dropped, (e.g. loose USB cable), the drive loop
+        # skips its ticks until it is
+        if self.arduino_board.link_lost or self.reconnecting:
+            telemetry_age = self.arduino_board.telemetry_age
+            self.reconnect_arduino()
+            self.root.statusBar.lblStatusBar.text = f'Arduino link lost, (telemetry age ' \
+                                                    f'{telemetry_age * 1000:.0f} ms), reconnecting...'
+            return
+
         # Create a message stream to inform the user of current status/performance
         self.root.vehStatus.loopFps.text = f'Primary Loop (FPS): {fp_avg:3.0f}'
 
-        # Run the camera
-        self.run_camera()
-
-        # Display camera fps
-        self.root.vehStatus.camFps.text = f'Camera Loop (FPS): {self.camera_real_rate:3.0f}'
+        # Run the camera, nothing to drive on until it delivered its first frame
+        if not self.run_camera():
+            self.root.statusBar.lblStatusBar.text = 'Waiting for the camera...'
+            self.camera_stream.release()
+            return
+
+        # Display camera fps, along with the frames the drive loop missed or picked up twice
+        self.root.vehStatus.camFps.text = f'Camera Loop (FPS): {self.camera_real_rate:3.0f}, ' \
+                                          f'drop {self.camera_stream.dropped_frames}, ' \
+                                          f'dup {self.camera_stream.duplicated_frames}'
+
+        # Display the serial link latency, (p50/p99/max), about once a second
+        self.tick_count += 1
+        if self.tick_count % self.drive_loop_rate == 0:
+            self.root.vehStatus.serialStats.text = f'{self.arduino_board.link_summary()} | ' \
+                                                   f'age {self.arduino_board.telemetry_age * 1000:.0f} ms'
         """
             Now that the camera is running, the image it produces is available
             to all methods via 'self.ui.primary_image'.
@@ -197,10 +297,13 @@ class EngineApp(App):
 
         # Check the desired mode
         """
-            We are using the five channel options (TQi4ch)
+            We are using the five channel options (TQi4ch). All of the channels are
+            read in a single exchange with the Arduino, the drive methods pick up
+            the steering and throttle values they need from 'self.rc_channels'.
         """
-        mode_pwm = self.arduino_board.mode_in()
-        full_ai_pwm = self.arduino_board.full_ai_in()
+        self.rc_channels = self.arduino_board.read_all_channels()
+        mode_pwm = self.rc_channels['mode']
+        full_ai_pwm = self.rc_channels['full_ai']
 
         # Set the vehicle to manual or autonomous
         if mode_pwm < 1500:
@@ -225,7 +328,7 @@ class EngineApp(App):
             data, (manual driving), or you can record to show the vehicle
             driving itself from the perspective of the vehicle.
         """
-        record_pwm = self.arduino_board.rec_in()
+        record_pwm = self.rc_channels['record']
         if record_pwm < 1500:
             self.record_on = False
         else:
@@ -233,6 +336,23 @@ class EngineApp(App):
         # Display record option
         ui_messages += f', Record Mode: {self.record_on}={record_pwm:3.0f}'
 
+        # Resize the camera image once for the recording and the network
+        """
+            Please note:
+            Both images are buffers reused at every tick. The network image is converted
+            once, into the float32 model input buffer.
+        """
+        recording = self.record_on and self.log_folder_selected
+        # A model loaded in the background takes over right away in manual mode, (see feed_incoming_dnn)
+        if self.incoming_dnn is not None and self.drive_mode == 'Manual':
+            self.swap_dnn()
+        inferring = self.drive_mode != 'Manual' and self.net_loaded
+        record_image, nn_image = self.resize_pipeline.run(self.ui.primary_image, record=recording, infer=inferring)
+        if nn_image is not None:
+            self.model_input.write(nn_image)
+        if self.incoming_dnn is not None:
+            self.feed_incoming_dnn()
+
         # Drive the car
         if self.drive_mode == 'Manual':
             steering_output, throttle_output = self.drive_manual()
@@ -243,41 +363,42 @@ class EngineApp(App):
             if self.net_loaded:
                 steering_output, throttle_output = self.drive_autonomous()
                 ui_messages += f', Steering: {steering_output}, Throttle: {throttle_output}'
+                if self.inference_worker.error is not None:
+                    ui_messages += f', Inference failed: {self.inference_worker.error}'
             else:
                 ui_messages = f'You need to load a network before driving autonomously!'
                 steering_output, throttle_output = self.drive_manual()
 
         # Record data
-        if self.record_on and self.log_folder_selected:
-            # Initiate a thread for writing to a data file
-            self.stream_to_file.initiate_stream()
-
-            # Resize the image to be saved for training
-            record_image = cv2.resize(self.ui.primary_image,
-                                      (self.recording_image_width, self.recording_image_height))
-            self.stream_to_file.log_queue.put((self.stream_to_file.frame_index,
-                                               fp_avg,
-                                               steering_output,
-                                               throttle_output,
-                                               record_image))
-            self.stream_to_file.frame_index += 1
+        if recording:
+            # Hand the frame over to the writer thread, the queue keeps the image beyond this
+            # tick, so it gets its own copy
+            self.stream_to_file.record(fp_avg, steering_output, throttle_output, record_image.copy())
             # The vehicle is now recording
             self.previously_recording = True
+            ui_messages += f', Writer: {self.stream_to_file.summary()}'
 
-            # Update the UI
-            self.root.powerCtrls.recording.bgnColor = [0, 1, 0, 1]
+            # Update the UI, red if the writer failed, orange once frames of this recording were dropped
+            if self.stream_to_file.error is not None:
+                self.root.powerCtrls.recording.bgnColor = [1, 0, 0, 1]
+            elif self.stream_to_file.recording_dropped_frames > 0:
+                self.root.powerCtrls.recording.bgnColor = [1, 0.6, 0, 1]
+            else:
+                self.root.powerCtrls.recording.bgnColor = [0, 1, 0, 1]
         elif not self.record_on and self.previously_recording is True:
-            # Close a file stream if one was open and the user requested it be closed
+            # Close a file stream if one was open and the user requested it be closed, (the
+            # writer thread closes it once the queued frames are written)
             self.stream_to_file.close_log_file()
             self.previously_recording = False
-            # Reset the frame index to zero in case the user wants to restart recording
-            self.stream_to_file.frame_index = 0
             # Update the UI
             self.root.powerCtrls.recording.bgnColor = [0.7, 0.7, 0.7, 1]
 
         # Send the message stream to the UI
         self.root.statusBar.lblStatusBar.text = ui_messages
 
+        # Done with the current frame, the capture thread may now reuse its buffer
+        self.camera_stream.release()
+
     def drive_manual(self):
         """
             Manual driving option.
@@ -288,19 +409,20 @@ class EngineApp(App):
         throttle_output: (int) desired throttle output
         """
         # Steering
-        steering_output = self.arduino_board.steer_in()
+        steering_output = self.rc_channels['steering']
         # Clip to range if required
         steering_output = self.data_utils.chop_value(steering_output,
                                                      self.ui.steering_min,
                                                      self.ui.steering_max)
-        self.arduino_board.Servos.write(STEERING_SERVO, steering_output)
 
         # Throttle
-        throttle_output = self.arduino_board.throttle_in()
+        throttle_output = self.rc_channels['throttle']
         throttle_output = self.data_utils.chop_value(throttle_output,
                                                      self.ui.throttle_min,
                                                      self.ui.throttle_max)
-        self.arduino_board.Servos.write(THROTTLE_SERVO, throttle_output)
+
+        # Both servos are updated by a single, non-blocking write
+        self.servo_output.write(steering_output, throttle_output)
 
         # Update UI
         self.root.powerCtrls.manual.bgnColor = [0, 1, 0, 1]
@@ -318,19 +440,25 @@ class EngineApp(App):
         steering_output: (int) inference-based steering output
         throttle_output: (int) inference or driver-based throttle output
         """
-        # Resize the image to be compatible with neural network
-        new_image = cv2.resize(self.ui.primary_image, (self.nn_image_width, self.nn_image_height))
+        # Hand the sequence over to the inference worker, (the new image is already in the model input)
+        self.inference_worker.submit(self.model_input.sequence(), self.frame_sequence, self.frame_timestamp)
 
-        # Perform inference
-        drive_inference = self.inference_method(new_image)
-
-        # Get the inference rate
-        delta_inference_fps = self.data_utils.get_timer()
-        self.inference_loop_buffer_fps, fps_avg = self.data_utils.moving_avg(self.inference_loop_buffer_fps,
-                                                                             1 / delta_inference_fps)
-        self.inference_real_rate = round(fps_avg, 1)
-        # Post the timing to the UI
-        self.root.vehStatus.inferenceFps.text = f'Inference Loop (FPS): {self.inference_real_rate:3.0f}'
+        # Drive on the most recent inference, the drive loop never waits for the model
+        """
+            Please note:
+            The result trails the camera by the inference time, its age is the time since
+            the frame it was computed from was captured. Until the first result is in, the
+            steering is held at the center.
+        """
+        result = self.inference_worker.latest()
+        drive_inference = [0] if result is None else result[0]
+        inference_age = self.inference_worker.age()
+
+        # Post the inference rate and age to the UI
+        self.inference_real_rate = round(self.inference_worker.inference_fps, 1)
+        age_text = '-' if result is None else f'{inference_age * 1000:3.0f}'
+        self.root.vehStatus.inferenceFps.text = f'Inference Loop (FPS): {self.inference_real_rate:3.0f}, ' \
+                                                f'age {age_text} ms'
         """
             Model produces inferences from -100 to 100 for steering and 0 to 100 for throttle,
             so we need to rescale these to the current PWM ranges.
@@ -339,16 +467,14 @@ class EngineApp(App):
                                                          [-100, 100,
                                                          self.ui.steering_min,
                                                          self.ui.steering_max])
-        self.arduino_board.Servos.write(STEERING_SERVO, rescaled_steering)
 
         # Now determine the throttle
         if self.drive_mode == 'Steering Autonomous':
             # Throttle is manual
-            throttle_output = self.arduino_board.throttle_in()
+            throttle_output = self.rc_channels['throttle']
             rescaled_throttle = self.data_utils.chop_value(throttle_output,
                                                            self.ui.throttle_min,
                                                            self.ui.throttle_max)
-            self.arduino_board.Servos.write(THROTTLE_SERVO, throttle_output)
 
             # Update UI
             self.root.powerCtrls.manual.bgnColor = [0.7, 0.7, 0.7, 1]
@@ -371,13 +497,18 @@ class EngineApp(App):
                 it is.
             """
             rescaled_throttle = 1465
-            self.arduino_board.Servos.write(THROTTLE_SERVO, rescaled_throttle)
+            # Never drive on a stale inference, (e.g. the model stalled)
+            if inference_age > self.max_inference_age:
+                rescaled_throttle = self.ui.throttle_neutral
 
             # Update UI
             self.root.powerCtrls.manual.bgnColor = [0.7, 0.7, 0.7, 1]
             self.root.powerCtrls.ai_steering.bgnColor = [0.7, 0.7, 0.7, 1]
             self.root.powerCtrls.ai_full.bgnColor = [0, 1, 0, 1]
 
+        # Both servos are updated by a single, non-blocking write
+        self.servo_output.write(rescaled_steering, rescaled_throttle)
+
         return int(rescaled_steering), int(rescaled_throttle)
 
     def start_drive(self):
@@ -389,8 +520,14 @@ class EngineApp(App):
             # Set scheduling
             Clock.unschedule(self.drive_loop)
             self.root.powerCtrls.power.text = 'Power OFF'
+            # Nothing is driving anymore, a model waiting to take over can do so now
+            if self.incoming_dnn is not None:
+                self.swap_dnn()
 
             # Camera shut off
+            if self.camera_stream is not None:
+                self.camera_stream.stop()
+                self.camera_stream = None
             if self.use_webcam:
                 try:
                     self.webcam_feed.release()
@@ -409,8 +546,9 @@ class EngineApp(App):
                 self.stop_arduino()
 
             # Close the log file if you are recording
-            if self.record_on and self.log_folder_selected:
+            if self.previously_recording:
                 self.stream_to_file.close_log_file()
+                self.previously_recording = False
 
             # Turn the vehicle status light to off
             self.root.vehStatus.statusLight.bgnColor = [0.7, 0.7, 0.7, 1]
@@ -421,13 +559,20 @@ class EngineApp(App):
 
         # Turn things ON
         else:
+            import cv2
+            from utils.image_functions import ResizePipeline
+
+            # Recording only preprocessing until a model is loaded, (see load_dnn)
+            if self.resize_pipeline is None:
+                self.resize_pipeline = ResizePipeline((self.recording_image_width, self.recording_image_height),
+                                                      color_depth=self.color_depth)
+
             # Camera
             if self.use_webcam:
                 self.webcam_feed = cv2.VideoCapture(0)
                 self.webcam_feed.set(cv2.CAP_PROP_FRAME_WIDTH, self.ui.image_width)
                 self.webcam_feed.set(cv2.CAP_PROP_FRAME_HEIGHT, self.ui.image_height)
                 self.webcam_feed.set(cv2.CAP_PROP_FPS, int(self.ui.prescribed_rs_rate))
-                self.get_frame = self.get_frame_from_webcam
                 # Get initial frame and confirm result
                 if self.webcam_feed.isOpened():
                     self.webcam_on, _ = self.webcam_feed.read()
@@ -449,13 +594,18 @@ class EngineApp(App):
                                        f" height=(int){self.ui.image_height}," \
                                        f"format=(string)BGRx ! videoconvert ! video/x-raw, format=(string)BGR ! appsink"
                 self.pi_cam_feed = cv2.VideoCapture(gstream_command_line, cv2.CAP_GSTREAMER)
-                self.get_frame = self.get_frame_from_pi
                 # Get the initial frame from the pi camera and confirm result
                 if self.pi_cam_feed.isOpened():
                     self.pi_cam_on, _ = self.pi_cam_feed.read()
                 else:
                     self.pi_cam_on = False
 
+            # Frames are captured from a dedicated thread, the drive loop picks up the newest
+            if self.pi_cam_on or self.webcam_on:
+                self.camera_stream = CameraStream(self.webcam_feed if self.use_webcam else self.pi_cam_feed,
+                                                  (self.ui.image_height, self.ui.image_width, self.color_depth))
+                self.camera_stream.start()
+
             # Start the Arduino
             if not self.board_available:
                 self.start_arduino()
@@ -479,9 +629,15 @@ class EngineApp(App):
         """
             Help the user select the model HDF5 or the directory to which to store data.
         """
-        if USE_TRT:
+        if self.dnn_backend == 'saved_model':
             # Load a directory with the TensorRT parsed model
             self.file_IO.path_select(path_tag='DNNDir', path_type='dir_select')
+        elif self.dnn_backend == 'tflite':
+            # TFLite model files, or models converted at load, (a SavedModel through its .pb file)
+            self.file_IO.file_type = [('TFLite Model File', '.tflite'),
+                                      ('Keras Model File', '.h5'),
+                                      ('SavedModel File', '.pb')]
+            self.file_IO.path_select(path_tag='TFLiteDir')
         else:
             # Filter for Keras-based HDF5 model files
             self.file_IO.file_type = [('Keras Model File', '.h5')]
@@ -494,128 +650,258 @@ class EngineApp(App):
             # The user selected an HDF5 file
             self.root.statusBar.lblStatusBar.text = ' File loaded !'
             self.root.fileDiag.lblDnnPath.text = self.file_IO.current_paths[0]
-            self.root.fileDiag.selectDNN.text = 'Selected File'
-            self.net_loaded = True
 
-            # Load the network model now that it has been selected
+            # Load the network model now that it has been selected, (in the background)
             self.load_dnn()
 
-    def load_dnn(self):
+    def select_dnn_backend(self, backend_text: str):
+        """
+            Select the inference backend used for the next model loaded.
+
+        Parameters
+        ----------
+        backend_text: (str) backend name shown in the UI, (see DNN_BACKENDS)
         """
-            Load the Keras DNN model
+        backend = next(key for key, value in DNN_BACKENDS.items() if value == backend_text)
+        if backend == self.dnn_backend:
+            return
+        self.dnn_backend = backend
+        self.file_IO.app_config['dnnBackend'] = backend
+        self.file_IO.write_default_value()
+        if self.net_loaded:
+            self.root.statusBar.lblStatusBar.text = f' Select the model again to run it with {backend_text}'
+
+    def select_recording_codec(self, codec: str):
+        """
+            Select the compression of the recorded images, used from the next log file on,
+            (the images are compressed by the writer thread, see StreamToHDF5).
 
+        Parameters
+        ----------
+        codec: (str) image codec, (see IMAGE_CODECS in utils/write_hdf5.py)
         """
-        try:
-            if USE_TRT:
-                self.model = tf.saved_model.load(self.file_IO.current_paths[0])
-                self.prediction = self.model.signatures['serving_default']
-                # We have a model with state memory (i.e. contains an LSTM, GRU, etc.)
-                if len(self.prediction.inputs[0].shape) == 5:
-                    # Define the network input image dimensions from the model's input tensor
-                    self.sequence_length = self.prediction.inputs[0].shape[1]
-                    self.nn_image_height = self.prediction.inputs[0].shape[2]
-                    self.nn_image_width = self.prediction.inputs[0].shape[3]
-                    self.inference_method = self.inference_with_sequences_tensor_rt
-                else:
-                    # Model requires no sequence
-                    self.sequence_length = 1
-                    self.nn_image_height = self.prediction.inputs[0].shape[1]
-                    self.nn_image_width = self.prediction.inputs[0].shape[2]
-                    self.inference_method = self.inference_stateless_tensor_rt
-            else:
-                self.model = keras.models.load_model(self.file_IO.current_paths[0])
-                self.model.summary()
-                # We have a model with state memory (i.e. contains an LSTM, GRU, etc.)
-                if len(self.model.input.shape) == 5:
-                    # Define the network input image dimensions from the model's input tensor
-                    self.sequence_length = self.model.input.shape[1]
-                    self.nn_image_height = self.model.input.shape[2]
-                    self.nn_image_width = self.model.input.shape[3]
-                    self.inference_method = self.inference_with_sequences_keras
-                else:
-                    # Model requires no sequence
-                    self.sequence_length = 1
-                    self.nn_image_height = self.model.input.shape[1]
-                    self.nn_image_width = self.model.input.shape[2]
-                    self.inference_method = self.inference_stateless_keras
-
-            # Create circular buffer for RNN network feed
-            self.image_buffer = \
-                self.data_utils.create_circular_buffer(self.sequence_length,
-                                                       (self.nn_image_height,
-                                                        self.nn_image_width,
-                                                        self.color_depth))
-
-            # Perform a dummy inference here to sync with the Arduino
-            _, _ = self.drive_autonomous()
+        if self.stream_to_file is None or codec == self.stream_to_file.image_codec:
+            return
+        self.stream_to_file.set_image_codec(codec)
+        self.recording_codec = codec
+        self.file_IO.app_config['recordingCodec'] = codec
+        self.file_IO.write_default_value()
+        if self.previously_recording:
+            self.root.statusBar.lblStatusBar.text = f' Recording codec {codec} used from the next log file on'
 
-        except ValueError:
-            print('Selected file is not compatible with Keras load.')
+    def load_dnn(self):
+        """
+            Load the selected model in the background. The drive loop keeps running on the
+            current model, (or on manual control), until the new one is loaded, warmed up and
+            swapped in, (see check_dnn_loader and swap_dnn).
 
-    def inference_stateless_keras(self, new_image: np.ndarray) -> np.ndarray:
         """
-            Perform inference with a model that has no memory. (i.e no LSTM, GRU, etc.)
+        if self.model_loader is not None and not self.model_loader.done:
+            self.root.statusBar.lblStatusBar.text = ' Wait for the model being loaded first'
+            return
+        model_path = self.file_IO.current_paths[0]
+        backend = self.dnn_backend
+        self.model_loader = ModelLoader(lambda progress: self.prepare_dnn(model_path, backend, progress))
+        self.model_loader.start()
+        self.root.fileDiag.selectDNN.text = 'Loading...'
+        Clock.schedule_interval(self.check_dnn_loader, 0.1)
+
+    def prepare_dnn(self, model_path: str, backend: str, progress) -> dict:
+        """
+            Load, warm up and start a model, (runs on the ModelLoader thread, nothing the
+            drive loop uses is touched here).
 
         Parameters
         ----------
-        new_image: (np.ndarray) new image taken from camera
+        model_path: (str) selected model file or folder
+        backend: (str) inference backend, (see DNN_BACKENDS)
+        progress: (callable) reports the current stage of the load to the UI
 
         Returns
         -------
-        drive_inference: (np.ndarray) output of model prediction
+        dnn: (dict) model, call path, input buffer, preprocessing and running inference worker
         """
-        input_tensor = self.data_utils.get_buffer(new_image)
-        drive_inference = self.model.predict(input_tensor)[0]
-        return drive_inference
-
-    def inference_stateless_tensor_rt(self, new_image: np.ndarray) -> np.ndarray:
+        progress('Importing TensorFlow')
+        from utils.image_functions import ResizePipeline
+        from utils.model_cache import ModelCache
+        from utils.model_functions import load_inference_model, input_dimensions
+
+        if self.model_cache is None:
+            self.model_cache = ModelCache(self.model_cache_dir, self.model_cache_size_mb)
+
+        # Traced or TFLite call path of the model, (see utils/model_functions.py), prepared
+        # once and then loaded from the cache
+        progress('Loading')
+        prediction, model = load_inference_model(model_path,
+                                                 backend,
+                                                 self.tflite_threads,
+                                                 self.streaming_inference,
+                                                 self.streaming_tolerance,
+                                                 self.model_cache)
+        # Models loaded from the cache are traced functions, without the Keras layers
+        if backend == 'keras' and hasattr(model, 'summary'):
+            model.summary()
+
+        # Define the network input image dimensions from the model's input tensor
+        sequence_length, nn_image_height, nn_image_width = input_dimensions(prediction.input_shape)
+        if len(prediction.input_shape) == 5:
+            # We have a model with state memory (i.e. contains an LSTM, GRU, etc.)
+            inference_method = partial(self.inference_with_sequences, prediction=prediction)
+        else:
+            inference_method = partial(self.inference_stateless, prediction=prediction)
+
+        # Create the float32 circular buffer for the network feed, in the model input layout
+        model_input = ModelInputBuffer(prediction.input_shape, self.input_scale, self.input_offset)
+        # Preprocessing for this model's input size
+        resize_pipeline = ResizePipeline((self.recording_image_width, self.recording_image_height),
+                                         (nn_image_width, nn_image_height),
+                                         self.color_depth)
+
+        # Perform dummy inferences here, the first calls are by far the slowest ones
+        progress('Warming up')
+        prediction.warm_up()
+        inference_method(model_input.sequence())
+
+        # The model runs on its own thread, idle until the drive loop submits frames to it
+        inference_worker = InferenceWorker(inference_method, model_input.input_shape, np.float32)
+        inference_worker.start()
+        return {'model_path': model_path,
+                'model': model,
+                'prediction': prediction,
+                'inference_method': inference_method,
+                'sequence_length': sequence_length,
+                'nn_image_height': nn_image_height,
+                'nn_image_width': nn_image_width,
+                'model_input': model_input,
+                'resize_pipeline': resize_pipeline,
+                'inference_worker': inference_worker,
+                'frames': 0}
+
+    def check_dnn_loader(self, dt: float) -> bool:
         """
-            Perform inference with a model that has no memory. (i.e no LSTM, GRU, etc.)
+            Show the progress of the model load, then hand the loaded model over to the drive
+            loop, (scheduled by load_dnn until the load is done).
 
         Parameters
         ----------
-        new_image: (np.ndarray) new image taken from camera
+        dt: (float) time since the last check
 
         Returns
         -------
-        drive_inference: (np.ndarray) output of model prediction
+        keep_scheduled: (bool) False once the load is done, which unschedules the check
         """
-        input_tensor = self.data_utils.get_buffer(new_image)
-        drive_inference = self.prediction(tf.convert_to_tensor(input_tensor, dtype=tf.float32))
-        drive_inference = drive_inference['dense'][0].numpy()
-        return drive_inference
+        loader = self.model_loader
+        if not loader.done:
+            self.root.fileDiag.lblDnnPath.text = f'{loader.stage} ({loader.elapsed:3.1f} s)...'
+            return True
+
+        if loader.error is not None:
+            print(f'Selected model could not be loaded: {loader.error}')
+            self.root.fileDiag.lblDnnPath.text = f'Load failed: {loader.error}'
+            self.root.statusBar.lblStatusBar.text = f' Model load failed: {loader.error}'
+            self.root.fileDiag.selectDNN.text = 'Selected File' if self.net_loaded else 'Network Model ...'
+            return False
 
-    def inference_with_sequences_keras(self, new_image: np.ndarray) -> np.ndarray:
         """
-            Perform inference with a model that has memory. (i.e has an LSTM, GRU, etc.)
+            Please note:
+            While a model drives the car, the new one only takes over once it has computed
+            its first output from the live frames, (see feed_incoming_dnn), so that the servos
+            get an inference-based command at every tick of the swap.
+        """
+        # A model loaded earlier and still waiting for the swap is replaced by this one
+        if self.incoming_dnn is not None:
+            self.incoming_dnn['inference_worker'].stop(wait=False)
+        self.incoming_dnn = loader.result
+        self.root.fileDiag.lblDnnPath.text = f'Loaded in {loader.elapsed:3.1f} s, waiting for the swap...'
+        powered = self.root.powerCtrls.power.text == '[color=00ff00]Power ON[/color]'
+        if not powered or self.drive_mode == 'Manual':
+            self.swap_dnn()
+        return False
+
+    def feed_incoming_dnn(self):
+        """
+            Run the model waiting to take over on the live frames, alongside the current one,
+            and swap it in as soon as its first output is in.
+        """
+        dnn = self.incoming_dnn
+        error = dnn['inference_worker'].error
+        if error is not None:
+            # The model would never produce its first output, the current one keeps driving
+            dnn['inference_worker'].stop(wait=False)
+            self.incoming_dnn = None
+            print(f'Model {dnn["model_path"]} failed on the live frames: {error}')
+            self.root.fileDiag.lblDnnPath.text = f'Inference failed: {error}'
+            self.root.fileDiag.selectDNN.text = 'Selected File' if self.net_loaded else 'Network Model ...'
+            self.root.statusBar.lblStatusBar.text = f' New model not swapped in, inference failed: {error}'
+            return
+        _, nn_image = dnn['resize_pipeline'].run(self.ui.primary_image, infer=True)
+        dnn['model_input'].write(nn_image)
+        dnn['frames'] += 1
+        if dnn['inference_worker'].latest() is not None:
+            self.swap_dnn()
+        elif dnn['frames'] >= dnn['model_input'].sequence_length:
+            # Only full sequences, the first output is then a valid one
+            dnn['inference_worker'].submit(dnn['model_input'].sequence(), self.frame_sequence, self.frame_timestamp)
+
+    def swap_dnn(self):
+        """
+            Swap the loaded model in, (between two ticks of the drive loop).
+        """
+        dnn = self.incoming_dnn
+        self.incoming_dnn = None
+        previous_worker = self.inference_worker
+
+        self.model = dnn['model']
+        self.prediction = dnn['prediction']
+        self.inference_method = dnn['inference_method']
+        self.sequence_length = dnn['sequence_length']
+        self.nn_image_height = dnn['nn_image_height']
+        self.nn_image_width = dnn['nn_image_width']
+        self.model_input = dnn['model_input']
+        self.resize_pipeline = dnn['resize_pipeline']
+        self.inference_worker = dnn['inference_worker']
+        self.net_loaded = True
+
+        # The previous model finishes its last inference on its own thread, no waiting here
+        if previous_worker is not None:
+            previous_worker.stop(wait=False)
+
+        self.root.fileDiag.lblDnnPath.text = f'{dnn["model_path"]}, swapped in at frame {self.frame_sequence}'
+        self.root.fileDiag.selectDNN.text = 'Selected File'
+        print(f'Model {dnn["model_path"]} swapped in at frame {self.frame_sequence}.')
+
+    def inference_stateless(self, model_input: np.ndarray, prediction=None) -> np.ndarray:
+        """
+            Perform inference with a model that has no memory. (i.e no LSTM, GRU, etc.)
 
         Parameters
         ----------
-        new_image: (np.ndarray) new image taken from camera
+        model_input: (np.ndarray) model input from the circular buffer, (see ModelInputBuffer)
+        prediction: (callable) call path of the model, the current one if None
 
         Returns
         -------
         drive_inference: (np.ndarray) output of model prediction
         """
-        input_tensor = np.expand_dims(self.data_utils.get_buffer(new_image), axis=0)
-        drive_inference = self.model.predict(input_tensor)[0]
-        return drive_inference[-1]
+        prediction = self.prediction if prediction is None else prediction
+        drive_inference = prediction(model_input)[0]
+        return drive_inference
 
-    def inference_with_sequences_tensor_rt(self, new_image: np.ndarray) -> np.ndarray:
+    def inference_with_sequences(self, model_input: np.ndarray, prediction=None) -> np.ndarray:
         """
             Perform inference with a model that has memory. (i.e has an LSTM, GRU, etc.)
 
         Parameters
         ----------
-        new_image: (np.ndarray) new image taken from camera
+        model_input: (np.ndarray) model input from the circular buffer, (see ModelInputBuffer)
+        prediction: (callable) call path of the model, the current one if None
 
         Returns
         -------
         drive_inference: (np.ndarray) output of model prediction
         """
-        input_tensor = np.expand_dims(self.data_utils.get_buffer(new_image), axis=0)
-        drive_inference = self.prediction(tf.convert_to_tensor(input_tensor, dtype=tf.float32))
-        drive_inference = drive_inference['dense'][0].numpy()
+        prediction = self.prediction if prediction is None else prediction
+        drive_inference = prediction(model_input)[0]
         return drive_inference[-1]
 
     def select_log_folder(self):
@@ -629,72 +915,44 @@ class EngineApp(App):
         self.ui.fileDiag.lblLogFolderPath.text = '  ' + self.stream_to_file.user_data_folder
         self.log_folder_selected = True
 
-    def get_frame_from_webcam(self):
-        """
-            Get the image frame from the webcam
-
-        Returns
-        -------
-        image: (np.ndarray) numpy array from webcam
-        """
-        self.webcam_on, image = self.webcam_feed.read()
-        if image is None:
-            self.webcam_on = False
-            return None
-        else:
-            # Take the image and make it visible in the UI and accessible to all methods
-            return self.process_image(image)
-
-    def get_frame_from_pi(self):
-        """
-            Get the image from the RealSense camera
-
-        Returns
-        ---
-        image: (np.ndarray) numpy array from the RealSense
-        """
-        self.pi_cam_on, image = self.pi_cam_feed.read()
-        if image is None:
-            self.pi_cam_on = False
-            return None
-        else:
-            # Take the image and make it visible in the UI and accessible to all methods
-            return self.process_image(image)
-
     def process_image(self, image: np.ndarray) -> np.ndarray:
         """
-            Take the image and flip it and switch from BGR to RGB
+            Make the image available to the UI and all methods.
+
+            No pixel is touched here: the UI texture is created flipped and in the 'bgr'
+            color format, (see EngineAppGUI), so the camera buffer is displayed as is.
 
-                Parameters
+        Parameters
         ----------
         image: (np.ndarray) raw image taken from camera sensor
 
         Returns
         -------
-        image: (np.ndarray) process image ready for UI rendition
+        image: (np.ndarray) image ready for UI rendition, (same buffer)
         """
         # Take the image and make it visible in the UI and accessible to all methods
         self.ui.primary_image = image
-
-        # Process from openCV to np image rendering format
-        image = np.flipud(image)
-        # Switch from BGR to RGB
-        image = image[:, :, [2, 1, 0]]
         return image
 
-    def run_camera(self):
-        """
-            Capture an image from a Intel Real Sense Camera
+    def run_camera(self) -> bool:
         """
-        self.data_utils.initiate_time()
+            Pick up the newest frame captured by the camera thread, (the frame is held
+            until the end of the drive loop tick, see CameraStream).
 
-        # Process a frame
-        display_image = self.get_frame()
+        Returns
+        -------
+        frame_available: (bool) False if the camera has not captured any frame yet
+        """
+        # Process a frame, its sequence number and capture time follow it to the inference
+        image, self.frame_timestamp, self.frame_sequence = self.camera_stream.acquire()
+        display_image = None if image is None else self.process_image(image)
 
         # Update the UI texture to display the image to the user
         if display_image is not None:
+            # Reshaping the contiguous camera buffer is a view, not a copy
             self.ui.image_texture.blit_buffer(display_image.reshape(self.ui.image_number_pixels *
                                                                     self.ui.image_width_factor),
+                                              colorfmt='bgr',
                                               bufferfmt='ubyte')
             """
                 This next command is required ot have the image refreshed and it refers to the
@@ -702,36 +960,87 @@ class EngineApp(App):
             """
             self.ui.canvas.ask_update()
 
-        # Compute the camera actual frame rate
-        delta_fps = self.data_utils.get_timer()
-        if delta_fps == 0:
-            print('rsIntelDaq method: Imaged dropped')
-            # Default is set to 30 in case of a frame drop
-            delta_fps = 1 / 30
-        self.camera_buffer_fps, fps_avg = self.data_utils.moving_avg(self.camera_buffer_fps,
-                                                                     1 / delta_fps)
-        self.camera_real_rate = round(fps_avg, 1)
+        # The actual frame rate is the one the sensor delivers, measured by the capture thread
+        self.camera_real_rate = round(self.camera_stream.sensor_fps, 1)
+        return image is not None
 
     def start_arduino(self):
         try:
-            # Set the serial rate
-            self.arduino_board = Arduino(115200)
+            # Set the serial rate and use the compact binary frames if the sketch supports them,
+            # the port that worked last time is tried first
+            self.arduino_board = Arduino(115200,
+                                         protocol=BINARY_PROTOCOL,
+                                         preferred_port=self.file_IO.apps_get_default('arduinoPort'))
+            self.arduino_board.Servos.attach(STEERING_SERVO,
+                                             min=self.ui.steering_min,
+                                             max=self.ui.steering_max)
+            self.arduino_board.Servos.attach(THROTTLE_SERVO,
+                                             min=self.ui.throttle_min,
+                                             max=self.ui.throttle_max)
             self.board_available = True
         except ValueError:
             print('Issues connecting with the Arduino Mega. Please check.')
+            if self.arduino_board is not None:
+                self.arduino_board.close()
             self.board_available = False
             self.arduino_board = None
 
         if self.board_available:
-            self.arduino_board.Servos.attach(STEERING_SERVO,
-                                             min=self.ui.steering_min,
-                                             max=self.ui.steering_max)
-            self.arduino_board.Servos.attach(THROTTLE_SERVO,
-                                             min=self.ui.throttle_min,
-                                             max=self.ui.throttle_max)
+            # Remember the port for the next start
+            self.file_IO.app_config['arduinoPort'] = self.arduino_board.port
+            self.file_IO.write_default_value()
+            """
+                Please note:
+                Once the servos are attached, the Arduino pushes the RC channels on its own
+                and the drive loop reads them from memory. Sketches that cannot stream are
+                simply polled as before.
+            """
+            self.arduino_board.start_streaming(self.telemetry_rate)
+
+            # Servo commands are sent from a background thread
+            self.servo_output = ServoOutput(self.arduino_board,
+                                            STEERING_SERVO,
+                                            THROTTLE_SERVO,
+                                            deadband=self.servo_deadband)
+            self.servo_output.start()
+
+    @property
+    def reconnecting(self) -> bool:
+        return self.reconnect_thread is not None and self.reconnect_thread.is_alive()
+
+    def reconnect_arduino(self):
+        """
+            Try to bring the Arduino link back up, off the Kivy thread, (re-opening the port
+            waits for the sketch to answer), and at most once every 'reconnect_period' seconds.
+
+        """
+        if self.reconnecting or time.perf_counter() - self.reconnect_time < self.reconnect_period:
+            return
+        self.reconnect_time = time.perf_counter()
+        self.reconnect_thread = threading.Thread(name='ArduinoReconnect', target=self.run_reconnect, daemon=True)
+        self.reconnect_thread.start()
+
+    def run_reconnect(self):
+        """
+            Reconnect to the Arduino, (runs on its own thread, see reconnect_arduino). The
+            last command sent before the link dropped may have been lost, the servos are
+            set to neutral until the drive loop commands them again.
+
+        """
+        if self.arduino_board.reconnect() and self.servo_output is not None:
+            self.servo_output.write(self.ui.steering_neutral, self.ui.throttle_neutral, force=True)
+            print('Arduino link back up, servos set to neutral.')
 
     def stop_arduino(self):
+        # A reconnection in progress is over before the port is closed
+        if self.reconnect_thread is not None:
+            self.reconnect_thread.join()
+            self.reconnect_thread = None
         if self.board_available:
+            self.servo_output.stop()
+            print(f'Servo writes sent: {self.servo_output.writes_sent}, '
+                  f'suppressed: {self.servo_output.writes_suppressed}')
+            self.servo_output = None
             self.arduino_board.Servos.detach(STEERING_SERVO)
             self.arduino_board.Servos.detach(THROTTLE_SERVO)
             self.arduino_board.close()
@@ -757,6 +1066,8 @@ class EngineAppGUI(GridLayout):
 
         # Property to access the App properties easily
         self.app = main_app_ref
+        # Importing the Kivy window creates it, so it is only done along with the GUI
+        from kivy.core.window import Window
         self.ui_window = Window
         self.ui_window.borderless = False
 
@@ -823,10 +1134,17 @@ class EngineAppGUI(GridLayout):
             self.ui_window.size = (1000, 500)
 
         # Create the original texture to display the image when the software is started.
+        """
+            Please note:
+            OpenCV images are BGR and stored top row first, while Kivy textures are drawn bottom
+            row first. Rather than flipping and swapping the channels of every frame on the CPU,
+            the texture takes BGR data and has its texture coordinates flipped once here.
+        """
         self.image_texture = Texture.create(size=(self.image_width * self.image_width_factor,
                                                   self.image_height),
-                                            colorfmt='rgb',
+                                            colorfmt='bgr',
                                             bufferfmt='ubyte')
+        self.image_texture.flip_vertical()
         self.image_number_pixels = self.image_width * self.image_height * self.app.color_depth
 
     def ui_close_window(self, _):
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from utils import model_cache
+from utils.model_cache import ModelCache
+
+"""
+  Description:
+
+    Cache keys of the prepared models, (see utils/model_cache.py): a retrained model never
+    hits the entry of the previous one, and an unchanged model is not hashed again.
+
+    Usage (from the repository root):
+        python -m pytest tests/test_model_cache.py
+"""
+
+
+def write_file(file_path: str, data: bytes, mtime_ns: int = None):
+    with open(file_path, 'wb') as model_file:
+        model_file.write(data)
+    if mtime_ns is not None:
+        os.utime(file_path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def saved_model(tmp_path) -> str:
+    model_path = tmp_path / 'sm'
+    (model_path / 'variables').mkdir(parents=True)
+    write_file(str(model_path / 'saved_model.pb'), b'graph')
+    write_file(str(model_path / 'variables' / 'variables.data-00000-of-00001'), b'weights 1')
+    write_file(str(model_path / 'variables' / 'variables.index'), b'index')
+    return str(model_path)
+
+
+@pytest.fixture
+def cache(tmp_path) -> ModelCache:
+    return ModelCache(str(tmp_path / 'cache'))
+
+
+def test_saved_model_file_is_the_folder(cache, saved_model):
+    graph_path = os.path.join(saved_model, 'saved_model.pb')
+    assert cache.key(graph_path, backend='tflite') == cache.key(saved_model, backend='tflite')
+
+
+def test_retrained_weights_change_the_key(cache, saved_model):
+    graph_path = os.path.join(saved_model, 'saved_model.pb')
+    key = cache.key(graph_path, backend='tflite')
+    # Same graph and same size of weights, as after a retraining
+    weights_path = os.path.join(saved_model, 'variables', 'variables.data-00000-of-00001')
+    write_file(weights_path, b'weights 2', os.stat(weights_path).st_mtime_ns + 10 ** 9)
+    assert cache.key(graph_path, backend='tflite') != key
+
+
+def test_options_change_the_key(cache, saved_model):
+    assert cache.key(saved_model, backend='tflite') != cache.key(saved_model, backend='keras')
+
+
+def test_touched_model_keeps_the_key(cache, saved_model):
+    key = cache.key(saved_model, backend='tflite')
+    graph_path = os.path.join(saved_model, 'saved_model.pb')
+    os.utime(graph_path, ns=(0, os.stat(graph_path).st_mtime_ns + 10 ** 9))
+    assert cache.key(saved_model, backend='tflite') == key
+    assert cache.files_hashed == 2
+
+
+def test_unchanged_model_is_hashed_once(cache, saved_model, monkeypatch):
+    key = cache.key(saved_model, backend='tflite')
+
+    def hash_model_files(model_path):
+        raise AssertionError('unchanged model hashed again')
+    monkeypatch.setattr(model_cache, 'hash_model_files', hash_model_files)
+    assert cache.key(saved_model, backend='tflite') == key
+    # The digests are kept in the cache folder, for the next sessions
+    assert ModelCache(cache.cache_dir).key(saved_model, backend='tflite') == key
+
+
+def test_digests_are_not_entries(cache, saved_model):
+    cache.key(saved_model, backend='tflite')
+    assert cache.entries() == []
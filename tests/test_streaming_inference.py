@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+keras = tf.keras
+
+from utils.model_functions import compile_streaming_model  # noqa: E402
+
+"""
+  Description:
+
+    Equivalence of the incremental inference of recurrent models, (StreamingSequenceModel),
+    with the full-window model running the whole sequence at every frame.
+
+    Usage (from the repository root):
+        python -m pytest tests/test_streaming_inference.py
+"""
+
+SEQUENCE_LENGTH = 4
+IMAGE_SHAPE = (12, 16, 3)
+
+
+@pytest.fixture(scope='module')
+def model() -> keras.Model:
+    tf.random.set_seed(0)
+    return keras.Sequential([
+        keras.layers.InputLayer(input_shape=(SEQUENCE_LENGTH,) + IMAGE_SHAPE),
+        keras.layers.TimeDistributed(keras.layers.Rescaling(1 / 255)),
+        keras.layers.TimeDistributed(keras.layers.Conv2D(4, 3, strides=2, activation='relu')),
+        keras.layers.TimeDistributed(keras.layers.Flatten()),
+        keras.layers.TimeDistributed(keras.layers.Dense(8, activation='relu')),
+        keras.layers.LSTM(6),
+        keras.layers.Dense(2)])
+
+
+@pytest.fixture
+def images() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.uniform(0, 255, (4 * SEQUENCE_LENGTH,) + IMAGE_SHAPE).astype(np.float32)
+
+
+def full_window(model: keras.Model, sequence: np.ndarray) -> np.ndarray:
+    return model(tf.constant(sequence), training=False).numpy()
+
+
+def test_split(model):
+    streaming_model = compile_streaming_model(model)
+    assert streaming_model is not None
+    assert streaming_model.input_shape == (1, SEQUENCE_LENGTH) + IMAGE_SHAPE
+
+
+def test_not_recurrent():
+    model = keras.Sequential([keras.layers.Flatten(input_shape=IMAGE_SHAPE), keras.layers.Dense(2)])
+    assert compile_streaming_model(model) is None
+
+
+def test_shifting_sequence(model, images):
+    streaming_model = compile_streaming_model(model)
+    for end in range(SEQUENCE_LENGTH, len(images) + 1):
+        sequence = images[end - SEQUENCE_LENGTH:end][np.newaxis]
+        np.testing.assert_allclose(streaming_model(sequence), full_window(model, sequence), rtol=1e-4, atol=1e-5)
+    # The front-end ran on the whole first sequence, then on one new image per call
+    assert streaming_model.images_computed == SEQUENCE_LENGTH + len(images) - SEQUENCE_LENGTH
+
+
+def test_skipped_frames(model, images):
+    streaming_model = compile_streaming_model(model)
+    # Same sequence twice, then one and two images skipped, then a sequence with no image in common
+    ends = [SEQUENCE_LENGTH, SEQUENCE_LENGTH, SEQUENCE_LENGTH + 2, SEQUENCE_LENGTH + 5, len(images)]
+    new_images = [SEQUENCE_LENGTH, 0, 2, 3, SEQUENCE_LENGTH]
+    for end, expected in zip(ends, new_images):
+        sequence = images[end - SEQUENCE_LENGTH:end][np.newaxis]
+        computed = streaming_model.images_computed
+        np.testing.assert_allclose(streaming_model(sequence), full_window(model, sequence), rtol=1e-4, atol=1e-5)
+        assert streaming_model.images_computed - computed == expected
+
+
+def test_dropped_frame(model, images):
+    streaming_model = compile_streaming_model(model)
+    streaming_model(images[:SEQUENCE_LENGTH][np.newaxis])
+    # A frame missing from the middle of the window: the shifted match fails, everything is recomputed
+    sequence = np.delete(images[1:SEQUENCE_LENGTH + 2], 1, axis=0)[np.newaxis]
+    np.testing.assert_allclose(streaming_model(sequence), full_window(model, sequence), rtol=1e-4, atol=1e-5)
+
+
+def test_reset(model, images):
+    streaming_model = compile_streaming_model(model)
+    sequence = images[:SEQUENCE_LENGTH][np.newaxis]
+    streaming_model(sequence)
+    streaming_model.reset()
+    computed = streaming_model.images_computed
+    np.testing.assert_allclose(streaming_model(sequence), full_window(model, sequence), rtol=1e-4, atol=1e-5)
+    assert streaming_model.images_computed - computed == SEQUENCE_LENGTH
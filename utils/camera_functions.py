@@ -0,0 +1,119 @@
+import threading
+import time
+
+import numpy as np
+
+
+class CameraStream(threading.Thread):
+    def __init__(self, capture, frame_shape: tuple, name: str = 'CameraStream'):
+        """
+          Thread that continuously grabs frames from an OpenCV capture into a pair of
+          preallocated buffers, so that the drive loop picks up the newest frame without
+          ever waiting on the sensor.
+
+          The capture thread fills the "back" buffer while the drive loop holds the
+          "front" one: when a frame is complete the two are swapped. The thread only
+          waits if the buffer it is about to fill is still held by the drive loop, (see
+          acquire/release), so a held frame is never overwritten.
+
+        Parameters
+        ----------
+        capture: (cv2.VideoCapture) opened capture device
+        frame_shape: (tuple) shape of the frames, (height, width, channels)
+        name: (str) thread name
+        """
+        threading.Thread.__init__(self, name=name, daemon=True)
+        self.capture = capture
+        self.buffers = [np.zeros(frame_shape, np.uint8), np.zeros(frame_shape, np.uint8)]
+        self.condition = threading.Condition()
+        self.running = True
+
+        # Index of the newest complete frame, -1 until the first frame is in
+        self.front = -1
+        # Index of the buffer held by the drive loop, -1 if none
+        self.held = -1
+        # Capture time and sequence number of the newest complete frame
+        self.timestamp = 0
+        self.sequence = 0
+
+        # Sensor statistics
+        self.sensor_fps = 0
+        self.read_failures = 0
+        # Consumer statistics, frames never picked up and frames picked up more than once
+        self.last_sequence = 0
+        self.dropped_frames = 0
+        self.duplicated_frames = 0
+
+    def run(self):
+        back = 0
+        previous_timestamp = None
+        while self.running:
+            with self.condition:
+                # Never write into the frame the drive loop is working with
+                while self.running and self.held == back:
+                    self.condition.wait()
+            if not self.running:
+                break
+
+            ok, frame = self.capture.read(self.buffers[back])
+            timestamp = time.perf_counter()
+            if not ok or frame is None:
+                self.read_failures += 1
+                time.sleep(0.01)
+                continue
+            if frame is not self.buffers[back]:
+                # The backend did not decode in place, (e.g. a different frame size)
+                self.buffers[back] = frame
+
+            if previous_timestamp is not None:
+                # Smoothed rate at which the sensor delivers frames
+                rate = 1 / max(timestamp - previous_timestamp, 1e-6)
+                self.sensor_fps = rate if self.sensor_fps == 0 else 0.9 * self.sensor_fps + 0.1 * rate
+            previous_timestamp = timestamp
+
+            with self.condition:
+                self.front = back
+                self.timestamp = timestamp
+                self.sequence += 1
+            back = 1 - back
+
+    def acquire(self) -> tuple:
+        """
+            Hold the newest complete frame until release is called, (a frame still held
+            from a previous call is released first).
+
+        Returns
+        -------
+        frame: (np.ndarray) newest BGR frame, None if no frame has been captured yet
+        timestamp: (float) time.perf_counter() capture time of the frame
+        sequence: (int) sequence number of the frame, starting at 1
+        """
+        with self.condition:
+            if self.front < 0:
+                self.held = -1
+                self.condition.notify()
+                return None, 0, 0
+            self.held = self.front
+            frame, timestamp, sequence = self.buffers[self.front], self.timestamp, self.sequence
+            self.condition.notify()
+
+        if sequence == self.last_sequence:
+            self.duplicated_frames += 1
+        elif sequence > self.last_sequence + 1:
+            self.dropped_frames += sequence - self.last_sequence - 1
+        self.last_sequence = sequence
+        return frame, timestamp, sequence
+
+    def release(self):
+        """
+            Hand the held frame back to the capture thread.
+        """
+        with self.condition:
+            self.held = -1
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.join()
@@ -117,3 +117,66 @@ class DataUtils:
         elif input_value > max_value:
             input_value = max_value
         return input_value
+
+
+class ModelInputBuffer:
+    def __init__(self, input_shape: tuple, scale: float = 1.0, offset: float = 0.0):
+        """
+          Circular buffer of images kept as float32 in the layout of the model input, (batch
+          of one, then the sequence dimension for recurrent models), so the whole sequence
+          is handed to the model as a view.
+
+          Like DataUtils' circular buffer, it is twice the sequence length with every image
+          written at two positions, so the sequence is always a contiguous slice. Each new
+          image is converted and normalized once, (value * scale + offset), straight into
+          its slot.
+
+        Parameters
+        ----------
+        input_shape: (tuple) model input shape, (1, height, width, channels) or
+                     (1, sequence_length, height, width, channels)
+        scale: (float) normalization factor applied to the pixel values
+        offset: (float) normalization offset added after the scaling
+        """
+        self.input_shape = tuple(int(dimension) for dimension in input_shape)
+        self.has_sequence = len(self.input_shape) == 5
+        self.sequence_length = self.input_shape[1] if self.has_sequence else 1
+        self.image_shape = self.input_shape[-3:]
+        self.scale = scale
+        self.offset = offset
+        self.buffer = np.zeros((2 * self.sequence_length,) + self.image_shape, np.float32)
+        self.index = 0
+
+    def write(self, image: np.ndarray) -> np.ndarray:
+        """
+          Convert a new image into the buffer.
+
+        Parameters
+        ----------
+        image: (np.ndarray) uint8 image of the model input size
+
+        Returns
+        -------
+        model_input: (np.ndarray) view of the updated sequence, (see sequence)
+        """
+        slot = self.index % self.sequence_length
+        if self.scale == 1 and self.offset == 0:
+            np.copyto(self.buffer[slot], image)
+        else:
+            # Conversion and scaling in a single pass into the slot
+            np.multiply(image, np.float32(self.scale), out=self.buffer[slot])
+            if self.offset:
+                self.buffer[slot] += np.float32(self.offset)
+        self.buffer[slot + self.sequence_length] = self.buffer[slot]
+        self.index += 1
+        return self.sequence()
+
+    def sequence(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        model_input: (np.ndarray) view of the last 'sequence_length' images, oldest first, in
+                     the shape of the model input
+        """
+        slot = self.index % self.sequence_length
+        return self.buffer[slot:slot + self.sequence_length].reshape(self.input_shape)
@@ -2,9 +2,6 @@ import os
 import platform
 import json
 import glob
-import tkinter
-import tkinter.filedialog as file_dialog
-from tkfilebrowser import askopendirnames as multi_directories
 
 
 class UserPath(object):
@@ -187,6 +184,11 @@ class UserPath(object):
         # rename or delete or move.
         self.select_user_data_folder(init_dir)
         init_dir = self.user_data_folder
+
+        # The Tk dialogs are only loaded when a path picker opens
+        import tkinter
+        import tkinter.filedialog as file_dialog
+
         diag_options = {'title': self.file_prompt, 'initialdir': init_dir}
         window = tkinter.Tk()
         window.wm_withdraw()
@@ -209,6 +211,7 @@ class UserPath(object):
         elif path_type.lower() == 'dir_select':
             # save the single path in a list directly to be consistent/compatible
             if self.file_multi_select:
+                from tkfilebrowser import askopendirnames as multi_directories
                 self.current_paths = multi_directories(**diag_options)
             else:
                 self.current_paths = [file_dialog.askdirectory(**diag_options)]
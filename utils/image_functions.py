@@ -0,0 +1,88 @@
+import cv2
+import numpy as np
+
+
+class ResizePipeline:
+    def __init__(self, record_size: tuple, nn_size: tuple = None, color_depth: int = 3):
+        """
+          Resizes the camera frame for the recording and for the network in a single pass
+          per tick, into destination buffers allocated once.
+
+          When both sizes are the same the frame is resized only once. Otherwise the larger
+          of the two is resized from the frame and the smaller one is derived from it, so the
+          full resolution frame is never read twice.
+
+        Parameters
+        ----------
+        record_size: (tuple) recorded image size, (width, height)
+        nn_size: (tuple) network input image size, (width, height), None if no model is loaded
+        color_depth: (int) number of color channels
+        """
+        self.record_size = tuple(record_size)
+        self.nn_size = None if nn_size is None else tuple(nn_size)
+        self.record_image = np.zeros((self.record_size[1], self.record_size[0], color_depth), np.uint8)
+        self.nn_image = None
+        if self.same_size:
+            # A single resize serves both
+            self.nn_image = self.record_image
+        elif self.nn_size is not None:
+            self.nn_image = np.zeros((self.nn_size[1], self.nn_size[0], color_depth), np.uint8)
+        # Resize order: the smaller image is derived from the larger one
+        self.record_first = self.nn_size is None or \
+            self.record_size[0] * self.record_size[1] >= self.nn_size[0] * self.nn_size[1]
+
+    @property
+    def same_size(self) -> bool:
+        return self.record_size == self.nn_size
+
+    def run(self, frame: np.ndarray, record: bool = False, infer: bool = False) -> tuple:
+        """
+          Resize the frame for the outputs requested in this tick.
+
+        Parameters
+        ----------
+        frame: (np.ndarray) camera frame
+        record: (bool) the recording image is needed, (written into 'record_image')
+        infer: (bool) the network input is needed, (written into 'nn_image')
+
+        Returns
+        -------
+        record_image: (np.ndarray) recording image, None if not requested
+        nn_image: (np.ndarray) network input image, None if not requested or no model is loaded
+
+        Please note that these are buffers reused at every tick, copy them if they must
+        outlive the tick.
+        """
+        infer = infer and self.nn_size is not None
+        if not record and not infer:
+            return None, None
+
+        if not infer:
+            cv2.resize(frame, self.record_size, dst=self.record_image)
+        elif not record or self.same_size:
+            cv2.resize(frame, self.nn_size, dst=self.nn_image)
+        elif self.record_first:
+            cv2.resize(frame, self.record_size, dst=self.record_image)
+            cv2.resize(self.record_image, self.nn_size, dst=self.nn_image)
+        else:
+            cv2.resize(frame, self.nn_size, dst=self.nn_image)
+            cv2.resize(self.nn_image, self.record_size, dst=self.record_image)
+        return self.record_image if record else None, self.nn_image if infer else None
+
+
+def resize_images(images: np.ndarray, image_shape: tuple) -> np.ndarray:
+    """
+      Resize stacked images, (e.g. read from a recording), to the model input size if needed.
+
+    Parameters
+    ----------
+    images: (np.ndarray) stacked images
+    image_shape: (tuple) model image shape, (height, width, channels)
+
+    Returns
+    -------
+    images: (np.ndarray) stacked images of the model input size, the input itself if it already is
+    """
+    if images.shape[1:] == tuple(image_shape):
+        return images
+    return np.stack([cv2.resize(image, (int(image_shape[1]), int(image_shape[0]))) for image in images])
@@ -0,0 +1,175 @@
+import threading
+import time
+
+import numpy as np
+
+
+class InferenceWorker(threading.Thread):
+    def __init__(self, inference_method, input_shape: tuple, input_dtype=np.uint8, name: str = 'InferenceWorker'):
+        """
+          Thread that runs the model on the newest submitted input, so that the drive loop
+          never waits on an inference.
+
+          The input slot has a depth of one: an input that was not picked up yet is
+          overwritten by the next one, ("latest frame wins"). Every result is published
+          with the sequence number and capture time of the frame it was computed from.
+
+        Parameters
+        ----------
+        inference_method: (callable) takes an input of 'input_shape' and returns the model output
+        input_shape: (tuple) shape of the model input, (e.g. the image sequence)
+        input_dtype: (np.dtype) data type of the model input
+        name: (str) thread name
+        """
+        threading.Thread.__init__(self, name=name, daemon=True)
+        self.inference_method = inference_method
+        # Input waiting to be picked up and input the model is working on, swapped on pickup
+        self.pending = np.zeros(input_shape, input_dtype)
+        self.working = np.zeros(input_shape, input_dtype)
+        self.pending_frame = None
+        self.condition = threading.Condition()
+        self.running = True
+
+        # Newest result, (output, frame sequence, frame timestamp), None until the first one
+        self.result = None
+        # Error of the last inference, cleared by the next successful one
+        self.error = None
+
+        # Statistics
+        self.inference_fps = 0
+        self.inference_time = 0
+        self.submitted = 0
+        self.overwritten = 0
+        self.completed = 0
+
+    def submit(self, model_input: np.ndarray, sequence: int = 0, timestamp: float = None):
+        """
+          Hand a new input over to the worker, (replaces the previous one if still pending).
+
+        Parameters
+        ----------
+        model_input: (np.ndarray) model input, copied so the caller can reuse its buffer
+        sequence: (int) sequence number of the frame the input comes from
+        timestamp: (float) time.perf_counter() capture time of the frame
+        """
+        with self.condition:
+            np.copyto(self.pending, model_input)
+            if self.pending_frame is not None:
+                self.overwritten += 1
+            self.pending_frame = (sequence, time.perf_counter() if timestamp is None else timestamp)
+            self.submitted += 1
+            self.condition.notify()
+
+    def latest(self) -> tuple:
+        """
+        Returns
+        -------
+        result: (tuple) newest (output, frame sequence, frame timestamp), None if there is none yet
+        """
+        return self.result
+
+    def age(self) -> float:
+        """
+        Returns
+        -------
+        age: (float) seconds since the frame behind the newest result was captured, inf if none
+        """
+        result = self.result
+        if result is None:
+            return float('inf')
+        return time.perf_counter() - result[2]
+
+    def run(self):
+        previous_time = None
+        while True:
+            with self.condition:
+                while self.running and self.pending_frame is None:
+                    self.condition.wait()
+                if not self.running:
+                    break
+                self.pending, self.working = self.working, self.pending
+                sequence, timestamp = self.pending_frame
+                self.pending_frame = None
+
+            start = time.perf_counter()
+            try:
+                output = self.inference_method(self.working)
+            except Exception as error:
+                # Surface the failure to the drive loop instead of dying silently
+                self.error = error
+                continue
+            end = time.perf_counter()
+
+            # Single rebind, the drive loop always reads a complete result
+            self.result = (output, sequence, timestamp)
+            # The failure, if any, was a transient one
+            self.error = None
+            self.completed += 1
+            self.inference_time = end - start
+            if previous_time is not None:
+                rate = 1 / max(end - previous_time, 1e-6)
+                self.inference_fps = rate if self.inference_fps == 0 else 0.9 * self.inference_fps + 0.1 * rate
+            previous_time = end
+
+    def stop(self, wait: bool = True):
+        """
+        Parameters
+        ----------
+        wait: (bool) wait for the inference in progress, if any, to finish
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if wait:
+            self.join()
+
+
+class ModelLoader(threading.Thread):
+    def __init__(self, load_function, name: str = 'ModelLoader'):
+        """
+          Thread that loads and warms up a model while the drive loop keeps running on the
+          current one, (or on manual control).
+
+          The drive loop polls 'done' and picks up 'result' once the model is ready, the
+          swap itself happens on the drive loop thread, (between two ticks).
+
+        Parameters
+        ----------
+        load_function: (callable) takes a 'progress(stage)' callback and returns the loaded model,
+                       (any object), the exceptions it raises end up in 'error'
+        name: (str) thread name
+        """
+        threading.Thread.__init__(self, name=name, daemon=True)
+        self.load_function = load_function
+        self.result = None
+        self.error = None
+        # Current stage of the load, for the UI
+        self.stage = 'Waiting'
+        # Statistics
+        self.start_time = None
+        self.load_time = None
+
+    def progress(self, stage: str):
+        self.stage = stage
+
+    @property
+    def done(self) -> bool:
+        return self.load_time is not None
+
+    @property
+    def elapsed(self) -> float:
+        """ Seconds since the load started, (the load time once done). """
+        if self.start_time is None:
+            return 0.0
+        return self.load_time if self.done else time.perf_counter() - self.start_time
+
+    def run(self):
+        self.start_time = time.perf_counter()
+        try:
+            self.result = self.load_function(self.progress)
+            self.stage = 'Ready'
+        except Exception as error:
+            self.error = error
+            self.stage = 'Failed'
+        # Set last, 'done' means that the result or the error is there
+        self.load_time = time.perf_counter() - self.start_time
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+"""
+  Description:
+
+    On-disk cache of the prepared model artifacts, (TFLite conversions, traced call paths),
+    and of the input metadata detected when the model was first loaded.
+
+    Entries are keyed by the SHA-256 of the source model files, (file names and content, so
+    that a copied or touched model still hits the cache and an edited one never does),
+    together with the options that change the artifact, (backend, streaming, etc.). The
+    digests are kept along with the size and modification time of the files they were
+    computed from, so an unchanged model is only hashed once.
+
+    Every entry is a folder holding the artifacts and a 'metadata.json' file. An entry is
+    written in a staging folder and renamed into place once complete, an interrupted write
+    never leaves a partial entry behind. The least recently used entries are removed once
+    the cache grows past its size limit.
+"""
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'engine_ai', 'models')
+
+METADATA_FILE = 'metadata.json'
+# Digests of the model files already hashed, (see ModelCache.model_digest)
+DIGESTS_FILE = 'digests.json'
+STAGING_PREFIX = '.staging_'
+
+
+def folder_size(path: str) -> int:
+    """
+    Parameters
+    ----------
+    path: (str) file or folder
+
+    Returns
+    -------
+    size: (int) size in bytes of the file, or of all the files in the folder
+    """
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(folder, file_name))
+               for folder, _, file_names in os.walk(path) for file_name in file_names)
+
+
+def model_source_path(model_path: str) -> str:
+    """
+    Parameters
+    ----------
+    model_path: (str) model file or folder, or the 'saved_model.pb' file of a SavedModel
+
+    Returns
+    -------
+    source_path: (str) normalized path, the SavedModel folder for a 'saved_model.pb' file, (so
+                 that its 'variables' are part of the model)
+    """
+    model_path = os.path.normpath(model_path)
+    if os.path.basename(model_path) == 'saved_model.pb':
+        model_path = os.path.dirname(model_path)
+    return model_path
+
+
+def model_files(model_path: str) -> list:
+    """
+    Parameters
+    ----------
+    model_path: (str) model file or folder, (see model_source_path)
+
+    Returns
+    -------
+    file_paths: (list) the model file, or all the files of the model folder, sorted
+    """
+    model_path = model_source_path(model_path)
+    if os.path.isdir(model_path):
+        return sorted(os.path.join(folder, file_name)
+                      for folder, _, file_names in os.walk(model_path) for file_name in file_names)
+    return [model_path]
+
+
+def model_stamp(model_path: str) -> list:
+    """
+    Parameters
+    ----------
+    model_path: (str) model file or folder, (see model_source_path)
+
+    Returns
+    -------
+    stamp: (list) relative name, size and modification time of every model file
+    """
+    model_path = model_source_path(model_path)
+    stamp = []
+    for file_path in model_files(model_path):
+        status = os.stat(file_path)
+        stamp.append([os.path.relpath(file_path, model_path), status.st_size, status.st_mtime_ns])
+    return stamp
+
+
+def hash_model_files(model_path: str, chunk_size: int = 2 ** 20) -> str:
+    """
+      Content hash of a model file, or of all the files of a model folder, (SavedModel).
+
+    Parameters
+    ----------
+    model_path: (str) model file or folder, (see model_source_path)
+    chunk_size: (int) bytes read at a time
+
+    Returns
+    -------
+    digest: (str) hexadecimal SHA-256 digest
+    """
+    model_path = model_source_path(model_path)
+    digest = hashlib.sha256()
+    for file_path in model_files(model_path):
+        # Relative names, the same model in another folder gives the same digest
+        digest.update(os.path.relpath(file_path, model_path).encode() + b'\0')
+        with open(file_path, 'rb') as model_file:
+            for chunk in iter(lambda: model_file.read(chunk_size), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelCache:
+    def __init__(self, cache_dir: str = None, max_size_mb: float = 2048):
+        """
+          Size-bounded, least recently used cache of prepared model artifacts.
+
+        Parameters
+        ----------
+        cache_dir: (str) cache folder, created if needed, DEFAULT_CACHE_DIR if None
+        max_size_mb: (float) size limit of the cache in MiB
+        """
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_size = int(max_size_mb * 2 ** 20)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Digest and stamp of the model files already hashed, by absolute path
+        try:
+            with open(os.path.join(self.cache_dir, DIGESTS_FILE)) as digests_file:
+                self.digests = json.load(digests_file)
+        except (OSError, ValueError):
+            self.digests = {}
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.files_hashed = 0
+
+    def model_digest(self, model_path: str) -> str:
+        """
+          Content hash of the model files, (see hash_model_files), computed again only if the
+          size or the modification time of one of the files changed.
+
+        Parameters
+        ----------
+        model_path: (str) model file or folder, (see model_source_path)
+
+        Returns
+        -------
+        digest: (str) hexadecimal SHA-256 digest
+        """
+        model_path = os.path.abspath(model_source_path(model_path))
+        stamp = model_stamp(model_path)
+        known = self.digests.get(model_path)
+        if known is not None and known['stamp'] == stamp:
+            return known['digest']
+
+        digest = hash_model_files(model_path)
+        self.files_hashed += 1
+        # The models that no longer exist are forgotten
+        self.digests = {path: known for path, known in self.digests.items() if os.path.exists(path)}
+        self.digests[model_path] = {'stamp': stamp, 'digest': digest}
+        file_handle, staging_path = tempfile.mkstemp(prefix=STAGING_PREFIX, dir=self.cache_dir)
+        try:
+            with os.fdopen(file_handle, 'w') as digests_file:
+                json.dump(self.digests, digests_file)
+            os.replace(staging_path, os.path.join(self.cache_dir, DIGESTS_FILE))
+        except OSError:
+            # Hashed again at the next session, nothing else is lost
+            if os.path.exists(staging_path):
+                os.remove(staging_path)
+        return digest
+
+    def key(self, model_path: str, **options) -> str:
+        """
+        Parameters
+        ----------
+        model_path: (str) model file or folder, (see model_source_path)
+        options: options the artifacts depend on, (JSON serializable values)
+
+        Returns
+        -------
+        key: (str) cache key of the model and options
+        """
+        digest = hashlib.sha256(self.model_digest(model_path).encode())
+        digest.update(json.dumps(options, sort_keys=True).encode())
+        return digest.hexdigest()[:32]
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str) -> tuple:
+        """
+          Look up an entry, and mark it as the most recently used one.
+
+        Parameters
+        ----------
+        key: (str) cache key, (see ModelCache.key)
+
+        Returns
+        -------
+        entry_path: (str) folder of the entry artifacts, None if not cached
+        metadata: (dict) metadata saved with the entry, None if not cached
+        """
+        entry_path = self.entry_path(key)
+        try:
+            with open(os.path.join(entry_path, METADATA_FILE)) as metadata_file:
+                metadata = json.load(metadata_file)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None, None
+        # The folder modification time is the last use time of the entry
+        os.utime(entry_path)
+        self.hits += 1
+        return entry_path, metadata
+
+    def put(self, key: str, write_function) -> tuple:
+        """
+          Create an entry, (replacing any entry of the same key), then evict the least
+          recently used entries beyond the size limit.
+
+        Parameters
+        ----------
+        key: (str) cache key, (see ModelCache.key)
+        write_function: (callable) called with the folder to write the artifacts to, returns
+                        the metadata dictionary of the entry, (JSON serializable)
+
+        Returns
+        -------
+        entry_path: (str) folder of the entry artifacts
+        metadata: (dict) metadata saved with the entry
+        """
+        staging_path = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=self.cache_dir)
+        try:
+            metadata = dict(write_function(staging_path))
+            metadata['created'] = time.time()
+            with open(os.path.join(staging_path, METADATA_FILE), 'w') as metadata_file:
+                json.dump(metadata, metadata_file, indent=2)
+            entry_path = self.entry_path(key)
+            if os.path.isdir(entry_path):
+                shutil.rmtree(entry_path)
+            os.replace(staging_path, entry_path)
+        except BaseException:
+            shutil.rmtree(staging_path, ignore_errors=True)
+            raise
+        self.evict(keep=key)
+        return entry_path, metadata
+
+    def entries(self) -> list:
+        """
+        Returns
+        -------
+        entries: (list) (last use time, size in bytes, key) of every entry, most recent first
+        """
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry_path = self.entry_path(key)
+            if key.startswith(STAGING_PREFIX) or not os.path.isdir(entry_path):
+                continue
+            entries.append((os.path.getmtime(entry_path), folder_size(entry_path), key))
+        return sorted(entries, reverse=True)
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep: str = None):
+        """
+          Remove the least recently used entries until the cache fits in its size limit.
+
+        Parameters
+        ----------
+        keep: (str) key of an entry never removed, (the one just created)
+        """
+        total_size = 0
+        for _, size, key in self.entries():
+            total_size += size
+            if total_size > self.max_size and key != keep:
+                shutil.rmtree(self.entry_path(key), ignore_errors=True)
+                total_size -= size
+                self.evictions += 1
+
+    def clear(self):
+        for _, _, key in self.entries():
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
@@ -0,0 +1,656 @@
+import os
+
+import numpy as np
+import tensorflow as tf
+import tensorflow.keras as keras
+
+from .model_cache import ModelCache, model_source_path
+
+"""
+  Description:
+
+    Single-sample inference call path for the drive loop.
+
+    'model.predict' builds a data adapter and runs the batching machinery at every call,
+    which costs milliseconds at batch size 1. The functions below instead trace the model
+    once for a fixed input signature, (batch of one, float32), and return a
+    CompiledModel that calls the resulting concrete function directly. The input is the
+    float32 image sequence built by ModelInputBuffer, (the camera frames are converted once
+    when they are pushed), so no cast runs in the traced graph for a float32 model.
+
+    TFLiteModel offers the same call path through the TensorFlow Lite interpreter, (XNNPACK
+    for the float operators on CPU), for the boards without a usable GPU.
+
+    With a ModelCache, the TFLite conversions and the traced Keras call paths are prepared
+    once per model content and options, then loaded from the cache, (see load_cached_model).
+"""
+
+
+class CompiledModel:
+    def __init__(self, function, input_shape: tuple, input_dtype=np.float32):
+        """
+          Traced, fixed signature inference function.
+
+        Parameters
+        ----------
+        function: (tf.types.experimental.ConcreteFunction) traced function returning the model output
+        input_shape: (tuple) full input shape, batch dimension included
+        input_dtype: (np.dtype) data type of the input arrays
+        """
+        self.function = function
+        self.input_shape = tuple(input_shape)
+        self.input_dtype = np.dtype(input_dtype)
+
+    def __call__(self, input_array: np.ndarray) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        input_array: (np.ndarray) model input of 'input_shape' and 'input_dtype'
+
+        Returns
+        -------
+        output: (np.ndarray) model output, batch dimension included
+        """
+        return self.function(tf.constant(input_array)).numpy()
+
+    def warm_up(self, iterations: int = 3):
+        """
+          Run the function on a blank input so that the first real frame does not pay for
+          the graph optimizations and memory allocations.
+
+        Parameters
+        ----------
+        iterations: (int) number of calls
+        """
+        blank_input = np.zeros(self.input_shape, self.input_dtype)
+        for _ in range(iterations):
+            self(blank_input)
+
+
+def _single_sample_shape(shape) -> list:
+    # Batch of one, whatever batch size the model was saved with
+    return [1] + [int(dimension) for dimension in shape[1:]]
+
+
+def compile_keras_model(model, input_dtype=np.float32) -> CompiledModel:
+    """
+      Trace a Keras model for single-sample inference.
+
+    Parameters
+    ----------
+    model: (tf.keras.Model) loaded model
+    input_dtype: (np.dtype) data type of the arrays the model is called with
+
+    Returns
+    -------
+    compiled_model: (CompiledModel) traced call path
+    """
+    input_shape = _single_sample_shape(model.input.shape)
+    model_dtype = model.input.dtype
+
+    @tf.function(input_signature=[tf.TensorSpec(input_shape, tf.as_dtype(input_dtype))])
+    def serve(input_tensor):
+        return model(tf.cast(input_tensor, model_dtype), training=False)
+
+    return CompiledModel(serve.get_concrete_function(), input_shape, input_dtype)
+
+
+def compile_saved_model(signature, input_dtype=np.float32, output_name: str = 'dense') -> CompiledModel:
+    """
+      Trace the 'serving_default' signature of a SavedModel, (e.g. TensorRT converted), for
+      single-sample inference.
+
+    Parameters
+    ----------
+    signature: (ConcreteFunction) signature of the loaded SavedModel
+    input_dtype: (np.dtype) data type of the arrays the model is called with
+    output_name: (str) output of the signature to return, the first one if it does not exist
+
+    Returns
+    -------
+    compiled_model: (CompiledModel) traced call path
+    """
+    input_name, input_spec = next(iter(signature.structured_input_signature[1].items()))
+    if output_name not in signature.structured_outputs:
+        output_name = next(iter(signature.structured_outputs))
+    input_shape = _single_sample_shape(input_spec.shape)
+
+    @tf.function(input_signature=[tf.TensorSpec(input_shape, tf.as_dtype(input_dtype))])
+    def serve(input_tensor):
+        return signature(**{input_name: tf.cast(input_tensor, input_spec.dtype)})[output_name]
+
+    return CompiledModel(serve.get_concrete_function(), input_shape, input_dtype)
+
+
+class TFLiteModel:
+    def __init__(self, model_path: str, num_threads: int = None):
+        """
+          TensorFlow Lite model with the CompiledModel interface.
+
+        Parameters
+        ----------
+        model_path: (str) path to the .tflite file
+        num_threads: (int) number of CPU threads used by the interpreter, None for its default
+        """
+        self.interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        input_details = self.interpreter.get_input_details()[0]
+        if input_details['shape'][0] != 1:
+            # Batch of one, whatever batch size the model was converted with
+            self.interpreter.resize_tensor_input(input_details['index'], [1] + list(input_details['shape'][1:]))
+        self.interpreter.allocate_tensors()
+
+        input_details = self.interpreter.get_input_details()[0]
+        self.input_index = input_details['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.input_shape = tuple(input_details['shape'])
+        self.input_dtype = np.dtype(input_details['dtype'])
+
+    def __call__(self, input_array: np.ndarray) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        input_array: (np.ndarray) model input of 'input_shape' and 'input_dtype'
+
+        Returns
+        -------
+        output: (np.ndarray) model output, batch dimension included
+        """
+        self.interpreter.set_tensor(self.input_index, input_array)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index)
+
+    def warm_up(self, iterations: int = 3):
+        """
+          Run the interpreter on a blank input, (see CompiledModel.warm_up).
+
+        Parameters
+        ----------
+        iterations: (int) number of calls
+        """
+        blank_input = np.zeros(self.input_shape, self.input_dtype)
+        for _ in range(iterations):
+            self(blank_input)
+
+
+def compile_model_file(model_path: str, input_dtype=np.float32) -> CompiledModel:
+    """
+      Load a Keras model file or a SavedModel folder and trace it, (see compile_keras_model
+      and compile_saved_model).
+
+    Parameters
+    ----------
+    model_path: (str) Keras model file, SavedModel folder or its 'saved_model.pb' file
+    input_dtype: (np.dtype) data type of the arrays the model is called with
+
+    Returns
+    -------
+    compiled_model: (CompiledModel) traced call path
+    """
+    model_path = model_source_path(model_path)
+    if os.path.isdir(model_path):
+        return compile_saved_model(tf.saved_model.load(model_path).signatures['serving_default'], input_dtype)
+    return compile_keras_model(keras.models.load_model(model_path), input_dtype)
+
+
+def convert_to_tflite(model_path: str, tflite_path: str = None, representative_dataset=None) -> str:
+    """
+      Convert a Keras model file or a SavedModel folder to a TensorFlow Lite model for a
+      batch of one, float32 input. The conversion is skipped if the converted file is more
+      recent than the model.
+
+      With a representative dataset, the model is quantized to int8, (all operators,
+      weights and activations), the input and output stay float32 so that the quantized
+      model is a drop-in replacement for the float one.
+
+      Please note: a SavedModel already converted with TensorRT cannot be converted, the
+      original SavedModel must be used instead.
+
+    Parameters
+    ----------
+    model_path: (str) Keras model file, SavedModel folder or its 'saved_model.pb' file
+    tflite_path: (str) converted file, next to the model with the .tflite extension if None
+    representative_dataset: (callable) generator function of lists of model inputs, (float32
+                            arrays of the model input shape), used to calibrate the int8
+                            quantization, None for a float model
+
+    Returns
+    -------
+    tflite_path: (str) path to the .tflite file
+    """
+    model_path = model_source_path(model_path)
+    if tflite_path is None:
+        tflite_path = os.path.splitext(model_path)[0] + '.tflite'
+    if representative_dataset is None and os.path.isfile(tflite_path) and \
+            os.path.getmtime(tflite_path) >= os.path.getmtime(model_path):
+        return tflite_path
+
+    # Converting the traced single-sample function fixes the batch size to one
+    compiled_model = compile_model_file(model_path, np.float32)
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([compiled_model.function])
+    if representative_dataset is None:
+        # Operators without a TFLite kernel, (e.g. some recurrent layers), run as TensorFlow ops
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+    else:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(tflite_path, 'wb') as tflite_file:
+        tflite_file.write(converter.convert())
+    return tflite_path
+
+
+def load_tflite_model(model_path: str, num_threads: int = None) -> TFLiteModel:
+    """
+      Load a TensorFlow Lite model, converting a Keras or SavedModel model first if needed.
+
+    Parameters
+    ----------
+    model_path: (str) .tflite file, Keras model file or SavedModel folder
+    num_threads: (int) number of CPU threads used by the interpreter
+
+    Returns
+    -------
+    tflite_model: (TFLiteModel) loaded model
+    """
+    if not model_path.endswith('.tflite'):
+        model_path = convert_to_tflite(model_path)
+    return TFLiteModel(model_path, num_threads)
+
+
+class StreamingSequenceModel:
+    def __init__(self, feature_function, head_function, input_shape: tuple, feature_shape: tuple):
+        """
+          Incremental inference of a recurrent model whose convolutional front-end is applied
+          to every image of the sequence independently, (TimeDistributed layers).
+
+          The features of the images of the previous sequence are kept: every call only
+          runs the front-end on the images that were not in the previous sequence, (one in
+          the steady state), then the recurrent head on the cached features. The output is
+          the one of the full model on the whole sequence.
+
+          Same interface as CompiledModel, (see compile_streaming_model).
+
+        Parameters
+        ----------
+        feature_function: (callable) front-end, float32 images (n, height, width, channels) to features
+        head_function: (callable) recurrent head, features (1, sequence_length, ...) to the model output
+        input_shape: (tuple) model input shape, (1, sequence_length, height, width, channels)
+        feature_shape: (tuple) shape of the features of one image
+        """
+        self.feature_function = feature_function
+        self.head_function = head_function
+        self.input_shape = tuple(input_shape)
+        self.input_dtype = np.dtype(np.float32)
+        self.sequence_length = self.input_shape[1]
+        # Previous sequence and the features of its images
+        self.images = np.zeros(self.input_shape[1:], np.float32)
+        self.feature_shape = tuple(int(dimension) for dimension in feature_shape)
+        self.features = np.zeros((self.sequence_length,) + self.feature_shape, np.float32)
+        self.valid = False
+        # Statistics, images that went through the front-end and calls
+        self.images_computed = 0
+        self.calls = 0
+
+    def reset(self):
+        self.valid = False
+
+    def __call__(self, input_array: np.ndarray) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        input_array: (np.ndarray) model input of 'input_shape'
+
+        Returns
+        -------
+        output: (np.ndarray) model output, batch dimension included
+        """
+        sequence = input_array[0]
+        length = self.sequence_length
+        # Number of images new to this sequence, by matching it shifted against the previous one
+        new_images = length
+        if self.valid:
+            for shift in (1, 0) + tuple(range(2, length)):
+                if np.array_equal(sequence[:length - shift], self.images[shift:]):
+                    new_images = shift
+                    break
+
+        if new_images < length:
+            self.features[:length - new_images] = self.features[new_images:]
+        if new_images:
+            self.features[length - new_images:] = \
+                self.feature_function(tf.constant(sequence[length - new_images:])).numpy()
+        np.copyto(self.images, sequence)
+        self.valid = True
+        self.images_computed += new_images
+        self.calls += 1
+        return self.head_function(tf.constant(self.features[np.newaxis])).numpy()
+
+    def warm_up(self, iterations: int = 3):
+        """
+          Run the model on blank inputs, (see CompiledModel.warm_up), both the full and the
+          incremental paths are exercised.
+
+        Parameters
+        ----------
+        iterations: (int) number of calls
+        """
+        blank_input = np.zeros(self.input_shape, self.input_dtype)
+        for _ in range(iterations):
+            self.reset()
+            self(blank_input)
+            self(blank_input)
+        self.reset()
+
+
+def compile_streaming_model(model) -> StreamingSequenceModel:
+    """
+      Split a Keras recurrent model into its TimeDistributed front-end and its head, and trace
+      both for incremental inference.
+
+    Parameters
+    ----------
+    model: (tf.keras.Model) loaded model with a 5-D input, its layers must form a single chain
+
+    Returns
+    -------
+    streaming_model: (StreamingSequenceModel) incremental call path, None if the model does not
+                     start with TimeDistributed layers
+    """
+    if len(model.input.shape) != 5:
+        return None
+    layers = [layer for layer in model.layers if not isinstance(layer, keras.layers.InputLayer)]
+    number_frame_layers = 0
+    while number_frame_layers < len(layers) and isinstance(layers[number_frame_layers], keras.layers.TimeDistributed):
+        number_frame_layers += 1
+    if number_frame_layers == 0 or number_frame_layers == len(layers):
+        return None
+    frame_layers = [layer.layer for layer in layers[:number_frame_layers]]
+    head_layers = layers[number_frame_layers:]
+    input_shape = _single_sample_shape(model.input.shape)
+    model_dtype = model.input.dtype
+
+    @tf.function(input_signature=[tf.TensorSpec([None] + input_shape[2:], tf.float32)])
+    def features(images):
+        output = tf.cast(images, model_dtype)
+        for layer in frame_layers:
+            output = layer(output, training=False)
+        return output
+
+    feature_shape = features(tf.zeros([1] + input_shape[2:])).shape[1:]
+
+    @tf.function(input_signature=[tf.TensorSpec([1, input_shape[1]] + list(feature_shape), tf.float32)])
+    def head(feature_sequence):
+        output = feature_sequence
+        for layer in head_layers:
+            output = layer(output, training=False)
+        return output
+
+    return StreamingSequenceModel(features.get_concrete_function(), head.get_concrete_function(),
+                                  input_shape, tuple(feature_shape))
+
+
+def streaming_error(streaming_model: StreamingSequenceModel, reference_model, steps: int = 8) -> float:
+    """
+      Largest difference between the incremental and the windowed outputs, over consecutive
+      sequences of random images followed by a sequence that skips images, (so that the
+      cached, the shifted and the recomputed paths are all compared).
+
+    Parameters
+    ----------
+    streaming_model: (StreamingSequenceModel) incremental call path
+    reference_model: (CompiledModel) windowed call path of the same model
+    steps: (int) number of consecutive sequences
+
+    Returns
+    -------
+    error: (float) largest absolute output difference
+    """
+    rng = np.random.default_rng(0)
+    length = streaming_model.sequence_length
+    images = rng.uniform(0, 255, (length + steps + 2,) + streaming_model.input_shape[2:]).astype(np.float32)
+    streaming_model.reset()
+    error = 0.0
+    for end in list(range(length, length + steps)) + [length + steps + 2]:
+        sequence = images[end - length:end][np.newaxis]
+        error = max(error, float(np.abs(streaming_model(sequence) - reference_model(sequence)).max()))
+    streaming_model.reset()
+    return error
+
+
+def streaming_prediction(model, windowed_prediction: CompiledModel, tolerance: float = 1e-2):
+    """
+      Incremental call path of a recurrent Keras model, used only if its outputs match the
+      windowed ones.
+
+    Parameters
+    ----------
+    model: (tf.keras.Model) loaded model with a 5-D input
+    windowed_prediction: (CompiledModel) call path running the whole sequence
+    tolerance: (float) largest accepted output difference
+
+    Returns
+    -------
+    prediction: (StreamingSequenceModel or CompiledModel) the incremental call path, or the
+                windowed one if the model cannot be split or the outputs differ
+    """
+    try:
+        streaming_model = compile_streaming_model(model)
+    except (ValueError, TypeError):
+        # The layers do not form a single chain
+        streaming_model = None
+    if streaming_model is None:
+        print('Model cannot be split into a TimeDistributed front-end and a head, '
+              'running the whole sequence at every frame.')
+        return windowed_prediction
+    error = streaming_error(streaming_model, windowed_prediction)
+    if error > tolerance:
+        print(f'Incremental inference differs from the windowed one by {error:.3g}, not used.')
+        return windowed_prediction
+    print(f'Incremental inference enabled, (largest difference {error:.3g}).')
+    return streaming_model
+
+
+def load_inference_model(model_path: str,
+                         backend: str = 'saved_model',
+                         tflite_threads: int = None,
+                         streaming: bool = True,
+                         streaming_tolerance: float = 1e-2,
+                         cache: ModelCache = None) -> tuple:
+    """
+      Load a model through one of the inference backends, with a float32 input.
+
+    Parameters
+    ----------
+    model_path: (str) SavedModel folder, Keras model file or .tflite file, (see the backends)
+    backend: (str) 'saved_model', (e.g. TensorRT converted), 'keras' or 'tflite'
+    tflite_threads: (int) number of CPU threads of the TFLite interpreter
+    streaming: (bool) use the incremental call path for recurrent Keras models, (see
+               StreamingSequenceModel)
+    streaming_tolerance: (float) largest accepted difference of the incremental outputs
+    cache: (ModelCache) artifact cache of the TFLite conversions and of the traced Keras models,
+           None to prepare the model at every load, (see load_cached_model)
+
+    Returns
+    -------
+    prediction: (CompiledModel, TFLiteModel or StreamingSequenceModel) call path of the model
+    model: (object) loaded Keras model or SavedModel, None for TFLite
+    """
+    if cache is not None and backend != 'saved_model' and not model_path.endswith('.tflite'):
+        # The SavedModel and .tflite files are loaded as they are, nothing to prepare
+        return load_cached_model(cache, model_path, backend, tflite_threads, streaming, streaming_tolerance)
+    if backend == 'tflite':
+        # Converted to TFLite first if needed, then run by the interpreter, (XNNPACK)
+        return load_tflite_model(model_path, tflite_threads), None
+    if backend == 'saved_model':
+        model = tf.saved_model.load(model_path)
+        # Traced single-sample call path of the signature
+        return compile_saved_model(model.signatures['serving_default'], np.float32), model
+    if backend == 'keras':
+        model = keras.models.load_model(model_path)
+        # Traced single-sample call path, instead of the batching machinery of 'predict'
+        prediction = compile_keras_model(model, np.float32)
+        if streaming and len(prediction.input_shape) == 5:
+            prediction = streaming_prediction(model, prediction, streaming_tolerance)
+        return prediction, model
+    raise ValueError('Unknown inference backend ',
+                     'function: load_inference_model')
+
+
+TFLITE_FILE = 'model.tflite'
+TRACED_FOLDER = 'traced'
+
+
+def model_metadata(prediction, model_path: str, backend: str) -> dict:
+    """
+      Input metadata of a loaded model, saved with its cache entry.
+
+    Parameters
+    ----------
+    prediction: (CompiledModel, TFLiteModel or StreamingSequenceModel) call path of the model
+    model_path: (str) source model file or folder
+    backend: (str) inference backend, (see load_inference_model)
+
+    Returns
+    -------
+    metadata: (dict) JSON serializable metadata
+    """
+    sequence_length, height, width = input_dimensions(prediction.input_shape)
+    metadata = {'source': os.path.abspath(model_path),
+                'backend': backend,
+                'call_path': type(prediction).__name__,
+                'input_shape': [int(dimension) for dimension in prediction.input_shape],
+                'sequence_length': sequence_length,
+                'nn_image_height': height,
+                'nn_image_width': width}
+    if isinstance(prediction, StreamingSequenceModel):
+        metadata['feature_shape'] = list(prediction.feature_shape)
+    return metadata
+
+
+def _signature_output(signature):
+    # Signatures of a loaded SavedModel take keyword arguments and return a dictionary
+    input_name = next(iter(signature.structured_input_signature[1]))
+    output_name = next(iter(signature.structured_outputs))
+    return lambda input_tensor: signature(**{input_name: input_tensor})[output_name]
+
+
+def save_traced_model(prediction, model, export_path: str):
+    """
+      Save the traced call path of a Keras model as a SavedModel, (its functions and
+      variables only, without the Keras layers), so that it loads without rebuilding the
+      model nor re-tracing it.
+
+    Parameters
+    ----------
+    prediction: (CompiledModel or StreamingSequenceModel) traced call path of the model
+    model: (tf.keras.Model) model the call path was traced from
+    export_path: (str) SavedModel folder
+    """
+    root = tf.Module()
+    root.model_variables = list(model.variables)
+    if isinstance(prediction, StreamingSequenceModel):
+        signatures = {'features': prediction.feature_function, 'head': prediction.head_function}
+    else:
+        signatures = {'serving_default': prediction.function}
+    tf.saved_model.save(root, export_path, signatures=signatures)
+
+
+def load_traced_model(export_path: str, metadata: dict) -> tuple:
+    """
+    Parameters
+    ----------
+    export_path: (str) SavedModel folder written by save_traced_model
+    metadata: (dict) metadata of the cache entry, (see model_metadata)
+
+    Returns
+    -------
+    prediction: (CompiledModel or StreamingSequenceModel) call path of the model
+    model: (object) loaded SavedModel, (the call path holds references to it)
+    """
+    model = tf.saved_model.load(export_path)
+    if metadata['call_path'] == StreamingSequenceModel.__name__:
+        prediction = StreamingSequenceModel(_signature_output(model.signatures['features']),
+                                            _signature_output(model.signatures['head']),
+                                            metadata['input_shape'],
+                                            metadata['feature_shape'])
+    else:
+        prediction = compile_saved_model(model.signatures['serving_default'], np.float32)
+    return prediction, model
+
+
+def load_cached_model(cache: ModelCache,
+                      model_path: str,
+                      backend: str,
+                      tflite_threads: int = None,
+                      streaming: bool = True,
+                      streaming_tolerance: float = 1e-2) -> tuple:
+    """
+      Load a model through the artifact cache, the artifacts are prepared and cached on the
+      first load of the model, (see load_inference_model for the parameters):
+
+        - tflite: the converted .tflite file, (see convert_to_tflite)
+        - keras: the traced call path, (see save_traced_model), the incremental one for the
+                 recurrent models that passed the equivalence check
+
+    Parameters
+    ----------
+    cache: (ModelCache) artifact cache
+
+    Returns
+    -------
+    prediction: (CompiledModel, TFLiteModel or StreamingSequenceModel) call path of the model
+    model: (object) loaded Keras model or SavedModel, None for TFLite
+    """
+    # A SavedModel picked through its 'saved_model.pb' file is keyed on the whole folder
+    model_path = model_source_path(model_path)
+    options = {'backend': backend}
+    if backend == 'keras':
+        options.update(streaming=streaming, streaming_tolerance=streaming_tolerance)
+    key = cache.key(model_path, **options)
+    entry_path, metadata = cache.get(key)
+
+    if entry_path is not None:
+        print(f'Model loaded from the cache, ({entry_path}).')
+        if backend == 'tflite':
+            return TFLiteModel(os.path.join(entry_path, TFLITE_FILE), tflite_threads), None
+        return load_traced_model(os.path.join(entry_path, TRACED_FOLDER), metadata)
+
+    if backend == 'tflite':
+        def write_artifacts(staging_path: str) -> dict:
+            tflite_path = convert_to_tflite(model_path, os.path.join(staging_path, TFLITE_FILE))
+            return model_metadata(TFLiteModel(tflite_path), model_path, backend)
+        entry_path, _ = cache.put(key, write_artifacts)
+        return TFLiteModel(os.path.join(entry_path, TFLITE_FILE), tflite_threads), None
+
+    prediction, model = load_inference_model(model_path, backend, tflite_threads, streaming, streaming_tolerance)
+
+    def write_artifacts(staging_path: str) -> dict:
+        save_traced_model(prediction, model, os.path.join(staging_path, TRACED_FOLDER))
+        return model_metadata(prediction, model_path, backend)
+    try:
+        cache.put(key, write_artifacts)
+    except Exception as error:
+        # The model runs all the same, it is only prepared again at the next load
+        print(f'Model could not be cached, ({error}).')
+    return prediction, model
+
+
+def input_dimensions(input_shape: tuple) -> tuple:
+    """
+      Image sequence length and size of a model input.
+
+    Parameters
+    ----------
+    input_shape: (tuple) model input shape, batch dimension included
+
+    Returns
+    -------
+    sequence_length: (int) number of images in the sequence, 1 for a model with no memory
+    height: (int) image height
+    width: (int) image width
+    """
+    # We have a model with state memory (i.e. contains an LSTM, GRU, etc.)
+    if len(input_shape) == 5:
+        return int(input_shape[1]), int(input_shape[2]), int(input_shape[3])
+    # Model requires no sequence
+    return 1, int(input_shape[1]), int(input_shape[2])
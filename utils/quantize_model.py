@@ -0,0 +1,187 @@
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+from .data_functions import DataUtils, ModelInputBuffer
+from .image_functions import resize_images
+from .model_functions import TFLiteModel, convert_to_tflite
+from .read_hdf5 import HDF5Recording
+
+"""
+  Description:
+
+    Post-training int8 quantization of a driving model, calibrated on our own recordings.
+
+    A random subset of the frames, (or frame sequences for recurrent models), of the given
+    StreamToHDF5 recordings is the representative dataset of the full integer quantization.
+    The int8 model is a .tflite file the engine loads with the TFLite backend.
+
+    The float and int8 models are then both run on a held-out recording, and a report of
+    their latency, size and steering error, (against each other and against the driver),
+    is printed and saved next to the int8 model.
+
+    Usage (from the repository root):
+        python -m utils.quantize_model model.h5 --recordings data/ --held-out data/session.hdf5
+"""
+
+
+def recording_paths(paths: list) -> list:
+    """
+    Parameters
+    ----------
+    paths: (list) HDF5 files and folders holding HDF5 files
+
+    Returns
+    -------
+    file_paths: (list) sorted HDF5 file paths
+    """
+    file_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            file_paths.extend(glob.glob(os.path.join(path, '*.hdf5')))
+        else:
+            file_paths.append(path)
+    return sorted(set(file_paths))
+
+
+def representative_dataset(recordings: list, input_shape: tuple, number_samples: int, seed: int = 0):
+    """
+      Sampled model inputs for the quantization calibration.
+
+    Parameters
+    ----------
+    recordings: (list) HDF5Recording objects to sample from
+    input_shape: (tuple) model input shape, (see ModelInputBuffer)
+    number_samples: (int) number of model inputs
+    seed: (int) seed of the random sampling
+
+    Returns
+    -------
+    generator: (callable) generator function of single-input lists, as the TFLite converter expects
+    """
+    sequence_length = input_shape[1] if len(input_shape) == 5 else 1
+    recordings = [recording for recording in recordings if len(recording) >= sequence_length]
+    if not recordings:
+        raise ValueError('No recording long enough to sample from ',
+                         'function: representative_dataset')
+
+    # Draw the samples up front, every pass over the dataset then sees the same inputs
+    rng = np.random.default_rng(seed)
+    samples = []
+    for _ in range(number_samples):
+        recording = recordings[rng.integers(len(recordings))]
+        samples.append((recording, int(rng.integers(len(recording) - sequence_length + 1))))
+
+    def generator():
+        for recording, start in samples:
+            images = resize_images(recording.images(start, start + sequence_length), input_shape[-3:])
+            yield [images.reshape(input_shape).astype(np.float32)]
+    return generator
+
+
+def evaluate(model: TFLiteModel, recording: HDF5Recording, max_frames: int = None) -> tuple:
+    """
+      Run a model on a recording, frame by frame, through the same input buffer as the engine.
+
+    Parameters
+    ----------
+    model: (TFLiteModel) model to run
+    recording: (HDF5Recording) recording to run the model on
+    max_frames: (int) number of frames to use, all if None
+
+    Returns
+    -------
+    steering: (np.ndarray) steering output per frame, (from the first full sequence on)
+    timings: (np.ndarray) inference time per frame in seconds
+    """
+    model_input = ModelInputBuffer(model.input_shape)
+    number_frames = len(recording) if max_frames is None else min(max_frames, len(recording))
+    steering, timings = [], []
+    for index in range(number_frames):
+        model_input.write(resize_images(recording.image(index)[np.newaxis], model.input_shape[-3:])[0])
+        if index < model_input.sequence_length - 1:
+            continue
+        start = time.perf_counter()
+        output = model(model_input.sequence())[0]
+        timings.append(time.perf_counter() - start)
+        steering.append(output[-1][0] if model_input.has_sequence else output[0])
+    return np.array(steering), np.array(timings)
+
+
+def latency_summary(timings: np.ndarray) -> dict:
+    timings = timings * 1000
+    return {'p50': float(np.percentile(timings, 50)),
+            'p99': float(np.percentile(timings, 99)),
+            'mean': float(timings.mean())}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Int8 quantization of a driving model from recorded sessions.')
+    parser.add_argument('model', help='Keras model file or SavedModel folder, (not TensorRT converted)')
+    parser.add_argument('--recordings', nargs='+', required=True, help='HDF5 recordings or folders of them')
+    parser.add_argument('--held-out', required=True, help='HDF5 recording used only for the report')
+    parser.add_argument('--samples', type=int, default=500, help='number of calibration samples')
+    parser.add_argument('--output', default=None, help='int8 model path, <model>_int8.tflite by default')
+    parser.add_argument('--threads', type=int, default=4, help='TFLite interpreter threads for the report')
+    parser.add_argument('--max-frames', type=int, default=None, help='held-out frames used for the report')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the calibration sampling')
+    args = parser.parse_args()
+
+    model_path = os.path.normpath(args.model)
+    if os.path.basename(model_path) == 'saved_model.pb':
+        model_path = os.path.dirname(model_path)
+    int8_path = args.output or os.path.splitext(model_path)[0] + '_int8.tflite'
+
+    # The float reference goes through the same runtime as the int8 model
+    float_path = convert_to_tflite(model_path)
+    float_model = TFLiteModel(float_path, args.threads)
+
+    held_out_path = os.path.abspath(args.held_out)
+    calibration_paths = [path for path in recording_paths(args.recordings) if os.path.abspath(path) != held_out_path]
+    print(f'Calibrating on {args.samples} samples from {len(calibration_paths)} recordings ...')
+    calibration_recordings = [HDF5Recording(path) for path in calibration_paths]
+    convert_to_tflite(model_path, int8_path,
+                      representative_dataset(calibration_recordings, float_model.input_shape, args.samples, args.seed))
+    for recording in calibration_recordings:
+        recording.close()
+    int8_model = TFLiteModel(int8_path, args.threads)
+
+    with HDF5Recording(args.held_out) as held_out:
+        float_steering, float_timings = evaluate(float_model, held_out, args.max_frames)
+        int8_steering, int8_timings = evaluate(int8_model, held_out, args.max_frames)
+        # Driver steering in model units, (the engine maps -100, 100 to the PWM range)
+        steering_range = [float(held_out.attribute('steerMin')), float(held_out.attribute('steerMax')), -100, 100]
+        driver_steering = DataUtils.map_function(held_out.steering.astype(float), steering_range)
+        # The outputs start with the first full sequence
+        first_frame = len(held_out) - len(float_steering) if args.max_frames is None else \
+            min(args.max_frames, len(held_out)) - len(float_steering)
+        driver_steering = driver_steering[first_frame:first_frame + len(float_steering)]
+
+    report = {'float_model': float_path,
+              'int8_model': int8_path,
+              'held_out': args.held_out,
+              'frames': len(float_steering),
+              'calibration_samples': args.samples,
+              'threads': args.threads,
+              'size_bytes': {'float': os.path.getsize(float_path), 'int8': os.path.getsize(int8_path)},
+              'latency_ms': {'float': latency_summary(float_timings), 'int8': latency_summary(int8_timings)},
+              'steering_error': {'int8_vs_float_mae': float(np.abs(int8_steering - float_steering).mean()),
+                                 'int8_vs_float_max': float(np.abs(int8_steering - float_steering).max()),
+                                 'float_vs_driver_mae': float(np.abs(float_steering - driver_steering).mean()),
+                                 'int8_vs_driver_mae': float(np.abs(int8_steering - driver_steering).mean())}}
+    report_path = os.path.splitext(int8_path)[0] + '_report.json'
+    with open(report_path, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+
+    print(f'{"model size":>24}: float {report["size_bytes"]["float"] / 1024:8.1f} KiB, '
+          f'int8 {report["size_bytes"]["int8"] / 1024:8.1f} KiB')
+    for name in ('float', 'int8'):
+        latency = report['latency_ms'][name]
+        print(f'{name + " latency":>24}: p50 {latency["p50"]:7.3f} ms, p99 {latency["p99"]:7.3f} ms')
+    for name, value in report['steering_error'].items():
+        print(f'{name:>24}: {value:7.3f}')
+    print(f'Report saved to {report_path}')
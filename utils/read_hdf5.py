@@ -0,0 +1,130 @@
+import h5py
+import numpy as np
+
+from .write_hdf5 import COLUMNAR_VERSIONS, codec_plugin
+
+
+class HDF5Recording:
+    def __init__(self, file_path: str):
+        """
+          Read access to a log file written by StreamToHDF5, in either format, (see FILE_VERSIONS
+          in write_hdf5.py), detected from the 'fileVersion' attribute:
+
+            - up to V1.1: one group per frame, 'frame_XXXXXX', holding the 'image', 'steering',
+              'throttle', 'frame' and 'loop_frame_rate' datasets.
+            - V2.0: one dataset per field, 'images', 'steering', 'throttle', 'frame' and
+              'loop_frame_rate', with the frames along the first dimension.
+
+          Frames are addressed by their position in the file, (0 to len - 1), in recording order.
+
+        Parameters
+        ----------
+        file_path: (str) path to the HDF5 file
+        """
+        self.file_path = file_path
+        self.log_file = h5py.File(file_path, 'r')
+        self.file_version = self.attribute('fileVersion')
+        # Compression of the images, the filter plugins it needs are loaded before any read
+        self.image_codec = self.attribute('imageCodec') or 'none'
+        codec_plugin(self.image_codec)
+        # Frames the recording queue dropped, (missing frame indices), none for files without the attribute
+        self.dropped_frames = int(self.attribute('droppedFrames') or 0)
+        self.columnar = self.file_version in COLUMNAR_VERSIONS
+        if self.columnar:
+            self.frame_names = None
+            frame_count = self.attribute('frameCount')
+            if frame_count is None:
+                # The file was never closed, the rows allocated ahead of the frames have a frame index of -1
+                frame_count = np.count_nonzero(self.log_file['frame'][()] >= 0)
+            self.frame_count = int(frame_count)
+        else:
+            # Zero-padded frame numbers, the alphabetical order is the recording order
+            self.frame_names = sorted(name for name in self.log_file.keys() if name.startswith('frame_'))
+            self.frame_count = len(self.frame_names)
+        self._steering = None
+        self._throttle = None
+
+    def __len__(self) -> int:
+        return self.frame_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self.log_file.close()
+
+    def attribute(self, name: str) -> str:
+        """
+        Parameters
+        ----------
+        name: (str) file attribute name, (e.g. 'imgHeight', 'steerMax')
+
+        Returns
+        -------
+        value: (str) attribute value as stored, (attributes are saved as strings), None if missing
+        """
+        value = self.log_file.attrs.get(name)
+        if isinstance(value, bytes):
+            value = value.decode()
+        return value
+
+    def image(self, index: int) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        index: (int) frame position in the file
+
+        Returns
+        -------
+        image: (np.ndarray) recorded uint8 image, (height, width, channels)
+        """
+        if self.columnar:
+            return self.log_file['images'][index]
+        return self.log_file[self.frame_names[index] + '/image'][()]
+
+    def images(self, start: int, stop: int) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        start: (int) first frame position
+        stop: (int) frame position after the last one
+
+        Returns
+        -------
+        images: (np.ndarray) recorded images stacked along the first dimension
+        """
+        if self.columnar:
+            # A single read of whole chunks
+            return self.log_file['images'][start:stop]
+        return np.stack([self.image(index) for index in range(start, stop)])
+
+    @property
+    def steering(self) -> np.ndarray:
+        """ Recorded steering PWM of every frame. """
+        if self._steering is None:
+            self._steering = self.column('steering')
+        return self._steering
+
+    @property
+    def throttle(self) -> np.ndarray:
+        """ Recorded throttle PWM of every frame. """
+        if self._throttle is None:
+            self._throttle = self.column('throttle')
+        return self._throttle
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        name: (str) scalar recorded with every frame, ('steering', 'throttle', 'frame' or 'loop_frame_rate')
+
+        Returns
+        -------
+        values: (np.ndarray) value of every frame
+        """
+        if self.columnar:
+            return self.log_file[name][:self.frame_count]
+        return np.array([self.log_file[frame_name + '/' + name][()] for frame_name in self.frame_names])
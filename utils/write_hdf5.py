@@ -1,11 +1,113 @@
 import threading
-import queue
+import collections
 import h5py
 import time
 import os
 
+import numpy as np
+
 from .folder_functions import UserPath
 
+# Sentinels of the writer queue, everything queued before them is written first, (they
+# are queued along with the index of the next frame, see close_log_file)
+CLOSE_LOG_FILE = object()
+STOP_WRITER = object()
+
+# What 'record' does with a frame when the queue is full, (see make_room)
+"""
+    Please note:
+    'block' makes the drive loop wait for the disk, it is meant for benchmarks, not for driving.
+    'drop-oldest' and 'drop-newest' drop whole frames at one end of the queue. 'decimate' only
+    queues every Nth incoming frame, N doubling every time the queue is full again, and halving
+    every time the writer takes frames out of it and leaves it under half the budget, (see
+    next_batch), so the whole stretch of the run is kept at a lower rate. Every recording
+    starts with every frame queued.
+    Dropped frames leave gaps in the frame indices, their count is saved in the
+    'droppedFrames' attribute of every log file.
+"""
+QUEUE_POLICIES = ('block', 'drop-oldest', 'drop-newest', 'decimate')
+
+# File format versions, (version number: 'fileVersion' attribute)
+"""
+    Please note:
+    Up to 1.1, every frame is a group holding five datasets, ('frame_XXXXXX'). From 2.0 on,
+    the file is columnar: one resizable, chunked dataset per field, (see COLUMNS), with
+    the frames along the first dimension.
+"""
+FILE_VERSIONS = {1.0: 'miniCarDataV1.0', 1.1: 'miniCarDataV1.1', 2.0: 'miniCarDataV2.0'}
+COLUMNAR_VERSIONS = ('miniCarDataV2.0',)
+# Datasets of the columnar format and their data types, in the order of the queued frames
+COLUMNS = (('frame', np.int32), ('loop_frame_rate', np.float32), ('steering', np.int32),
+           ('throttle', np.int32), ('images', np.uint8))
+# Size of the image chunks, a whole number of frames read back in one go during training
+IMAGE_CHUNK_BYTES = 1 << 20
+# Frames added to the datasets every time they are full, (trimmed when the file is closed)
+GROWTH_FRAMES = 1024
+# Frames saved to each log file
+FRAMES_PER_FILE = 20000
+# Compression of the recorded images, (see image_codec_options)
+"""
+    Please note:
+    The images are compressed by the HDF5 filters, on the writer thread, the drive loop only
+    queues raw frames. 'blosc-lz4' needs the hdf5plugin package, to write and to read the files.
+"""
+IMAGE_CODECS = ('none', 'lzf', 'gzip-1', 'gzip-4', 'gzip-9', 'blosc-lz4')
+
+
+def codec_plugin(codec: str):
+    """
+        Import the filter plugins a codec needs, (they are registered with HDF5 on import).
+
+    Parameters
+    ----------
+    codec: (str) image codec, (see IMAGE_CODECS)
+
+    Returns
+    -------
+    plugin: (module) hdf5plugin for the Blosc codecs, None for the codecs built into h5py
+    """
+    if not codec.startswith('blosc'):
+        return None
+    try:
+        import hdf5plugin
+    except ImportError:
+        raise ValueError(f'The {codec} codec needs the hdf5plugin package')
+    return hdf5plugin
+
+
+def image_codec_options(codec: str) -> dict:
+    """
+    Parameters
+    ----------
+    codec: (str) image codec, (see IMAGE_CODECS), 'gzip-1' to 'gzip-9' for the gzip levels
+
+    Returns
+    -------
+    options: (dict) h5py dataset options of the image dataset
+    """
+    if codec == 'none':
+        return {}
+    if codec == 'lzf':
+        return {'compression': 'lzf'}
+    if codec in [f'gzip-{level}' for level in range(1, 10)]:
+        return {'compression': 'gzip', 'compression_opts': int(codec[5:])}
+    if codec == 'blosc-lz4':
+        hdf5plugin = codec_plugin(codec)
+        return dict(hdf5plugin.Blosc(cname='lz4', clevel=5, shuffle=hdf5plugin.Blosc.SHUFFLE))
+    raise ValueError(f'Unknown image codec {codec}, options are {IMAGE_CODECS}')
+
+
+def available_image_codecs() -> list:
+    """ Image codecs usable with the installed packages. """
+    codecs = []
+    for codec in IMAGE_CODECS:
+        try:
+            image_codec_options(codec)
+            codecs.append(codec)
+        except ValueError:
+            pass
+    return codecs
+
 
 class StreamToHDF5(UserPath):
     def __init__(self,
@@ -16,10 +118,25 @@ class StreamToHDF5(UserPath):
                  throttle_neutral: int,
                  throttle_max: int,
                  throttle_min: int,
-                 file_version_number: int=1.0,
-                 f_name_suffix: str= '_'):
+                 file_version_number: float=1.0,
+                 f_name_suffix: str= '_',
+                 batch_size: int = 32,
+                 image_codec: str = 'none',
+                 queue_budget: int = 256 * 2 ** 20,
+                 queue_policy: str = 'decimate'):
         """
-          This class stream to disk "frames" (i.e., groups) of data sets using a queue.
+          This class stream to disk "frames" of data using a queue, either as groups of data
+          sets or as rows of columnar data sets, (see FILE_VERSIONS).
+
+          A single writer thread, (see start), empties the queue for the whole session. The
+          drive loop only queues frames, (see record), and the sentinels that close the log
+          file or stop the writer, so it never waits on the disk.
+
+          The writer takes every frame already queued, up to 'batch_size', and writes them
+          together: in the columnar format, a batch is a single slab per data set.
+
+          The queue holds at most 'queue_budget' bytes of images, when the disk cannot keep up,
+          frames are dropped or the drive loop waits, according to 'queue_policy'.
 
         Parameters
         ----------
@@ -32,6 +149,10 @@ class StreamToHDF5(UserPath):
         throttle_min: (int) minimum throttle value
         file_version_number: (float) version of the file format
         f_name_suffix: (str) suffix of file name
+        batch_size: (int) most frames written at once by the writer thread
+        image_codec: (str) compression of the recorded images, (see IMAGE_CODECS)
+        queue_budget: (int) most bytes of images waiting in the queue
+        queue_policy: (str) what to do with a frame when the queue is full, (see QUEUE_POLICIES)
         """
         UserPath.__init__(self, 'miniCar.py')
         # Make sure to have a valid value
@@ -43,6 +164,25 @@ class StreamToHDF5(UserPath):
 
         # Set the current file version
         self.fileVersionNum = file_version_number
+        if file_version_number not in FILE_VERSIONS:
+            raise ValueError(f'Unknown HDF5 file version {file_version_number}, options are {list(FILE_VERSIONS)}')
+        self.columnar = FILE_VERSIONS[file_version_number] in COLUMNAR_VERSIONS
+        # Frames written to the current file, and room for them in the columnar datasets
+        self.file_frames = 0
+        self.file_capacity = 0
+        # Frame indices the current file accounts for, (from the end of the previous file of the
+        # recording), and index at which the next file starts
+        self.file_start = 0
+        self.file_end = 0
+        # Compression of the images, (see set_image_codec), and dataset options of the current file
+        self.image_codec = None
+        self.image_options = {}
+        self.set_image_codec(image_codec)
+        # Columnar datasets of the current file, kept open so that their chunk cache lives as long as the file
+        self.datasets = {}
+        # Images of a batch are gathered in this buffer, (allocated on the first batch)
+        self.batch_size = batch_size
+        self.image_slab = None
 
         # Suffix added at the end of the file name
         self.fNameSuffix = f_name_suffix
@@ -55,57 +195,295 @@ class StreamToHDF5(UserPath):
         self.throttle_max = throttle_max
         self.throttle_min = throttle_min
 
-        # Set a lock for control of write function
-        self.lock = threading.Lock()
+        # Writer thread, started once and kept for the whole session, (see start and stop)
+        self.thread_write = None
 
-        # Log file
+        # Log file, only ever touched by the writer thread
         self.log_file = None
 
-        # Do we have a thread actively running
-        self.thread_running = False
-
         # Frame indexing within queue
         self.frame_index = 0
-        # Create a queue for storing images and driver input
-        self.log_queue = queue.Queue()
+        # Create a queue for storing images and driver input, bounded by the bytes of the queued images
+        if queue_policy not in QUEUE_POLICIES:
+            raise ValueError(f'Unknown queue policy {queue_policy}, options are {QUEUE_POLICIES}')
+        self.log_queue = collections.deque()
+        self.queue_condition = threading.Condition()
+        self.queue_budget = queue_budget
+        self.queue_policy = queue_policy
+        self.queued_bytes = 0
+        # Only every 'decimation'-th incoming frame is queued, (see make_room and next_batch), counted by
+        # 'decimation_phase'
+        self.decimation = 1
+        self.decimation_phase = 0
 
-    def initiate_stream(self):
+        # Statistics
+        self.frames_written = 0
+        self.files_written = 0
+        # Write time per frame, longest write of a batch and frames per batch
+        self.write_time = 0
+        self.max_write_time = 0
+        self.batch_frames = 0
+        # Time from the frame being queued to it being on disk
+        self.write_latency = 0
+        # Last write error, and whether the writer thread died, (the frames are then dropped)
+        self.error = None
+        self.writer_failed = False
+        # Frames dropped since the start, and in the current recording
+        self.dropped_frames = 0
+        self.recording_dropped_frames = 0
+
+    def set_image_codec(self, codec: str):
+        """
+            Select the compression of the recorded images, used from the next log file on.
+
+        Parameters
+        ----------
+        codec: (str) image codec, (see IMAGE_CODECS), a ValueError is raised if it is not available
         """
-            Initiate a thread to stream data to a file.
+        image_codec_options(codec)
+        self.image_codec = codec
+
+    def start(self):
         """
-        # Create a thread to do actual writing
-        self.thread_write = threading.Thread(name='WriteHDF5',
-                                             target=self.write_queue_threading, args=( ))
-        self.thread_write.setDaemon(True)
+            Start the writer thread, (once, the same thread writes every log file).
+        """
+        if self.thread_write is not None and self.thread_write.is_alive():
+            return
+        self.thread_write = threading.Thread(name='WriteHDF5', target=self.write_queue_threading, daemon=True)
         self.thread_write.start()
-        self.thread_running = True
+
+    def record(self, loop_frame_rate: float, steering: int, throttle: int, image: np.ndarray):
+        """
+            Queue a frame for the writer thread, returns immediately, (unless the queue is full
+            with the 'block' policy).
+
+        Parameters
+        ----------
+        loop_frame_rate: (float) drive loop frame rate
+        steering: (int) steering PWM
+        throttle: (int) throttle PWM
+        image: (np.ndarray) recorded image, kept by the queue so it must not be reused by the caller
+        """
+        item = ((self.frame_index, loop_frame_rate, steering, throttle, image), time.perf_counter())
+        self.frame_index += 1
+        with self.queue_condition:
+            # Nothing would take the frame out of the queue anymore
+            if self.writer_failed or not self.make_room(image.nbytes):
+                self.dropped_frames += 1
+                self.recording_dropped_frames += 1
+                return
+            self.log_queue.append(item)
+            self.queued_bytes += image.nbytes
+            self.queue_condition.notify_all()
+
+    def make_room(self, image_bytes: int) -> bool:
+        """
+            Make room in the queue for a new frame, according to the queue policy, (with the queue
+            condition held).
+
+        Parameters
+        ----------
+        image_bytes: (int) size of the image of the new frame
+
+        Returns
+        -------
+        room: (bool) False if the new frame is dropped
+        """
+        def full() -> bool:
+            # A frame larger than the budget still goes through an empty queue
+            return self.queued_bytes > 0 and self.queued_bytes + image_bytes > self.queue_budget
+
+        if self.queue_policy == 'decimate':
+            self.decimation_phase = (self.decimation_phase + 1) % self.decimation
+            if self.decimation_phase:
+                return False
+            if full():
+                self.decimation *= 2
+                return False
+            return True
+
+        if not full():
+            return True
+        if self.queue_policy == 'block':
+            while full() and not self.writer_failed:
+                self.queue_condition.wait()
+            return not self.writer_failed
+        if self.queue_policy == 'drop-newest':
+            return False
+
+        # 'drop-oldest', the frames ahead of the first sentinel, (if any), are dropped
+        dropped = 0
+        while full() and self.log_queue[0][0] is not CLOSE_LOG_FILE and self.log_queue[0][0] is not STOP_WRITER:
+            self.queued_bytes -= self.log_queue.popleft()[0][4].nbytes
+            dropped += 1
+        self.dropped_frames += dropped
+        self.recording_dropped_frames += dropped
+        return not full()
+
+    def next_batch(self) -> list:
+        """
+            Wait for a frame, then take the ones already queued behind it, up to 'batch_size',
+            (a batch ends with the first sentinel).
+
+        Returns
+        -------
+        batch: (list) queued frames, and sentinels, in queue order
+        """
+        batch = []
+        with self.queue_condition:
+            while not self.log_queue:
+                self.queue_condition.wait()
+            while self.log_queue and len(batch) < self.batch_size:
+                item = self.log_queue.popleft()
+                batch.append(item)
+                if item[0] is CLOSE_LOG_FILE or item[0] is STOP_WRITER:
+                    break
+                self.queued_bytes -= item[0][4].nbytes
+            if self.decimation > 1 and self.queued_bytes <= self.queue_budget // 2:
+                # The writer is catching up, twice as many frames are queued from now on
+                self.decimation //= 2
+            # Room for the frames of a blocked 'record'
+            self.queue_condition.notify_all()
+        return batch
 
     def write_queue_threading(self):
         """
-            Threaded method that de-queue data and saves it to disk.
+            Threaded method that de-queue data and saves it to disk, until the STOP_WRITER sentinel.
+        """
+        try:
+            while True:
+                batch = self.next_batch()
+                sentinel = batch.pop() if batch[-1][0] is CLOSE_LOG_FILE or batch[-1][0] is STOP_WRITER else None
+
+                if batch:
+                    self.write_batch(batch)
+                if sentinel is not None:
+                    # Everything queued before the sentinel is already written
+                    self.close_file(end_index=sentinel[1])
+                    # The next recording starts from frame 0
+                    self.file_end = 0
+                    if sentinel[0] is STOP_WRITER:
+                        break
+        except Exception as error:
+            # The queue is no longer drained: the frames are dropped from now on, (see record),
+            # and a blocked 'record' is released
+            print(f'HDF5 writer stopped: {error}')
+            with self.queue_condition:
+                self.error = error
+                self.writer_failed = True
+                lost_frames = len([item for item in self.log_queue
+                                   if item[0] is not CLOSE_LOG_FILE and item[0] is not STOP_WRITER])
+                self.dropped_frames += lost_frames
+                self.recording_dropped_frames += lost_frames
+                self.log_queue.clear()
+                self.queued_bytes = 0
+                self.queue_condition.notify_all()
+
+    def write_batch(self, batch: list):
+        """
+            Write a batch of de-queued frames, (writer thread only).
+
+        Parameters
+        ----------
+        batch: (list) frame data and time it was queued, (see record), in recording order
         """
-        # Acquire a lock
-        self.lock.acquire()
-        print('We are about to start the threading!')
-        # @TODO: Let's keep an eye on this threading stuff: might not work on Jetson
+        start = time.perf_counter()
+        frames_written = self.frames_written
         try:
-            while self.thread_running:
-                # Get the current data frame from the queue
-                log_data = self.log_queue.get()
-                # Each frame of data is a separate group
-                current_frame = str(log_data[0]).zfill(6)
-                # Save every 20000 frames to a separate file
-                if not (log_data[0]%20000) == 0:
-                    self.write_data(current_frame,  log_data)
-                # Create a new file
-                else:
+            frames = []
+            for log_data, _ in batch:
+                # Save every FRAMES_PER_FILE frames to a separate file, (the first frames of a
+                # file may have been dropped)
+                if self.log_file is None or log_data[0] >= self.file_end:
+                    self.write_frames(frames)
+                    frames = []
+                    self.close_file(end_index=self.file_end)
                     self.create_new_file()
-                    # Write the first frame of the new log file
-                    self.write_data(current_frame,  log_data)
-        finally:
-            # Release the lock
-            self.lock.release()
-            print('Thread lock released.')
+                    # The frames dropped since the previous file, if any, count against this one
+                    self.file_start = self.file_end
+                    self.file_end = log_data[0] - log_data[0] % FRAMES_PER_FILE + FRAMES_PER_FILE
+                frames.append(log_data)
+            self.write_frames(frames)
+        except Exception as error:
+            # Surface the failure to the drive loop, (e.g. full disk), and keep draining the queue,
+            # the frames of the batch that did not make it to the file are counted as dropped
+            print(f'HDF5 write failed: {error}')
+            self.error = error
+            with self.queue_condition:
+                lost_frames = len(batch) - (self.frames_written - frames_written)
+                self.dropped_frames += lost_frames
+                self.recording_dropped_frames += lost_frames
+            return
+        end = time.perf_counter()
+
+        frame_time = (end - start) / len(batch)
+        self.write_time = frame_time if self.write_time == 0 else 0.9 * self.write_time + 0.1 * frame_time
+        self.batch_frames = len(batch) if self.batch_frames == 0 else 0.9 * self.batch_frames + 0.1 * len(batch)
+        self.max_write_time = max(self.max_write_time, end - start)
+        # Age of the oldest frame of the batch
+        self.write_latency = end - batch[0][1]
+
+    def write_frames(self, frames: list):
+        """
+            Write frames to the current log file.
+
+        Parameters
+        ----------
+        frames: (list) frame index, loop frame rate, steering, throttle and image of each frame
+        """
+        if not frames:
+            return
+        if self.columnar:
+            self.append_data(frames)
+        else:
+            # Each frame of data is a separate group
+            for log_data in frames:
+                self.write_data(str(log_data[0]).zfill(6), log_data)
+        self.file_frames += len(frames)
+        self.frames_written += len(frames)
+
+    def close_file(self, end_index: int):
+        """
+            Close the current log file, (writer thread only).
+
+        Parameters
+        ----------
+        end_index: (int) index of the frame after the last one of the file, the frames missing
+                   before it were dropped
+        """
+        if self.log_file is not None:
+            self.log_file.attrs['droppedFrames'] = str(end_index - self.file_start - self.file_frames)
+            if self.columnar:
+                # Drop the rows allocated ahead of the frames
+                for dataset in self.datasets.values():
+                    dataset.resize(self.file_frames, axis=0)
+                self.log_file.attrs['frameCount'] = str(self.file_frames)
+            self.datasets = {}
+            self.log_file.close()
+            self.log_file = None
+            self.files_written += 1
+
+    @property
+    def queue_depth(self) -> int:
+        """ Frames waiting to be written. """
+        return len(self.log_queue)
+
+    def summary(self) -> str:
+        """
+            One line summary of the writer, (queue depth, frames written, frames per batch, write time
+            per frame, longest batch write and latency in ms, frames dropped in the current recording).
+        """
+        text = f'queue {self.queue_depth}, written {self.frames_written}, batch {self.batch_frames:.0f}, ' \
+               f'write {self.write_time * 1000:.1f}/{self.max_write_time * 1000:.1f} ms, ' \
+               f'latency {self.write_latency * 1000:.0f} ms, ' \
+               f'dropped {self.recording_dropped_frames} ({self.queue_policy})'
+        if self.decimation > 1:
+            text += f', queuing 1/{self.decimation} frames'
+        if self.writer_failed:
+            text += f', writer stopped: {self.error}'
+        elif self.error is not None:
+            text += f', error: {self.error}'
+        return text
 
     def create_new_file(self):
         """
@@ -118,19 +496,17 @@ class StreamToHDF5(UserPath):
         descriptor = '_miniCar'
         file_path = os.path.join(self.user_data_folder, date + '_' + clock + descriptor + \
                                  self.fNameSuffix + '.hdf5')
-        # Open up an HDF5 to store data
-        self.log_file = h5py.File(file_path, 'w')
+        # Open up an HDF5 to store data, the chunk cache holds the image chunks being filled
+        image_shape = (self.image_height, self.image_width, 3)
+        frames_per_chunk = max(1, IMAGE_CHUNK_BYTES // int(np.prod(image_shape)))
+        self.log_file = self.open_log_file(file_path,
+                                           rdcc_nbytes=4 * max(IMAGE_CHUNK_BYTES, int(np.prod(image_shape))))
         # Set storage attributes
-        if self.fileVersionNum == 1.0:
-            # This version is for miniCar
-            self.log_file.attrs['fileVersion'] = 'miniCarDataV1.0'
-        elif self.fileVersionNum == 1.1:
-            # This version is for miniCar
-            self.log_file.attrs['fileVersion'] = 'miniCarDataV1.1'
-        else:
-            raise ValueError('Unknown HDF5 file version? ',
-                             'method: create_new_file',
-                             'class: streamToDiskHDF5')
+        self.log_file.attrs['fileVersion'] = FILE_VERSIONS[self.fileVersionNum]
+        self.image_options = image_codec_options(self.image_codec)
+        self.log_file.attrs['imageCodec'] = self.image_codec
+        self.log_file.attrs['queuePolicy'] = self.queue_policy
+        self.log_file.attrs['queueBudget'] = str(self.queue_budget)
         self.log_file.attrs['imgHeight'] = str(self.image_height)
         self.log_file.attrs['imgWidth'] = str(self.image_width)
         self.log_file.attrs['steerMax'] = str(self.steerMax)
@@ -139,6 +515,36 @@ class StreamToHDF5(UserPath):
         self.log_file.attrs['throttleMin'] = str(self.throttle_min)
         self.log_file.attrs['throttleNeutral'] = str(self.throttle_neutral)
 
+        self.file_frames = 0
+        self.file_capacity = 0
+        if self.columnar:
+            for name, dtype in COLUMNS:
+                frame_shape = image_shape if name == 'images' else ()
+                # Unwritten rows have a frame index of -1, (e.g. the file was never closed)
+                self.datasets[name] = self.log_file.create_dataset(
+                    name,
+                    shape=(0,) + frame_shape,
+                    maxshape=(None,) + frame_shape,
+                    dtype=dtype,
+                    chunks=(frames_per_chunk if name == 'images' else 4096,) + frame_shape,
+                    fillvalue=-1 if name == 'frame' else 0,
+                    **(self.image_options if name == 'images' else {}))
+
+    def open_log_file(self, file_path: str, **kwargs) -> h5py.File:
+        """
+            Open a new log file for writing, (override to write somewhere else than a local file).
+
+        Parameters
+        ----------
+        file_path: (str) path to the new file
+        kwargs: (dict) file options, (e.g. chunk cache size)
+
+        Returns
+        -------
+        log_file: (h5py.File) file opened for writing
+        """
+        return h5py.File(file_path, 'w', **kwargs)
+
     def write_data(self,  current_frame: int,  log_data: list):
         """
             Method that writes the de-queued "frame" data to an HDF5
@@ -157,11 +563,65 @@ class StreamToHDF5(UserPath):
         self.log_file.create_dataset(frame_name+'/loop_frame_rate', data=log_data[1])
         self.log_file.create_dataset(frame_name+'/steering', data=log_data[2])
         self.log_file.create_dataset(frame_name+'/throttle', data=log_data[3])
-        self.log_file.create_dataset(frame_name+'/image', data=log_data[4])
+        self.log_file.create_dataset(frame_name+'/image', data=log_data[4], **self.image_options)
+
+    def append_data(self, frames: list):
+        """
+            Method that appends the de-queued "frames" data to the columnar datasets of the file,
+            as a single slab per data set.
+
+        Parameters
+        ----------
+        frames: (list) frame index, loop frame rate, steering, throttle and image of each frame
+        """
+        number_frames = len(frames)
+        while self.file_frames + number_frames > self.file_capacity:
+            # Grow all the datasets at once, a resize every GROWTH_FRAMES frames only
+            self.file_capacity += GROWTH_FRAMES
+            for dataset in self.datasets.values():
+                dataset.resize(self.file_capacity, axis=0)
+
+        rows = slice(self.file_frames, self.file_frames + number_frames)
+        for column, (name, dtype) in enumerate(COLUMNS):
+            if name == 'images':
+                if self.image_slab is None:
+                    self.image_slab = np.empty((self.batch_size, self.image_height, self.image_width, 3), np.uint8)
+                values = np.stack([log_data[column] for log_data in frames], out=self.image_slab[:number_frames])
+            else:
+                values = np.array([log_data[column] for log_data in frames], dtype)
+            self.datasets[name][rows] = values
 
     def close_log_file(self):
         """
-          Method that stops the threading and close the file.
+          Close the current log file once the frames queued so far are written, returns
+          immediately, (the file is closed by the writer thread). The next frame recorded
+          starts a new file.
+        """
+        self.queue_sentinel(CLOSE_LOG_FILE)
+        # Reset the frame index to zero in case the user wants to restart recording
+        self.frame_index = 0
+        self.recording_dropped_frames = 0
+        # The next recording starts queuing every frame
+        with self.queue_condition:
+            self.decimation = 1
+            self.decimation_phase = 0
+
+    def stop(self):
+        """
+          Write the frames still queued, close the log file and stop the writer thread.
+        """
+        if self.thread_write is None:
+            return
+        self.queue_sentinel(STOP_WRITER)
+        self.thread_write.join()
+        self.thread_write = None
+
+    def queue_sentinel(self, sentinel):
+        """
+            Queue a sentinel, (never dropped), along with the index of the next frame.
         """
-        self.thread_running = False
-        self.log_file.close()
+        with self.queue_condition:
+            if self.writer_failed:
+                return
+            self.log_queue.append((sentinel, self.frame_index))
+            self.queue_condition.notify_all()